@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends
+
+from app.api.shopify_webhooks import register_order_webhooks
+from app.common.decorators.retry_policy import retry_budgets
+from app.common.utils.circuit_breaker import circuit_breakers
+from app.db.merchant import merchant_repository
+from app.dependencies import check_admin_api_key
+from app.environment import env
+from app.external.ship24_client import ship24_retry_policy
+from app.external.shopify_client import ShopifyClient
+from app.external.shopify_transport import shopify_retry_policy
+from app.model.merchant import CreateMerchantRequest, CreateMerchantResponse
+
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["admin"],
+    dependencies=[Depends(check_admin_api_key)],
+)
+
+
+def _rejected_retries(upstream: str):
+    return retry_budgets[upstream].rejected if upstream in retry_budgets else None
+
+
+@router.get("/circuit-breakers")
+async def get_circuit_breakers():
+    """
+    State of the circuit breaker of every upstream of this instance, and the retries its budget turned down. Shopify
+    has one breaker per shop, named "shopify:<shop>", which share the Shopify retry budget.
+    """
+    return {
+        name: {
+            **breaker.snapshot(),
+            "rejected_retries": _rejected_retries(name.split(":", 1)[0]),
+        }
+        for name, breaker in circuit_breakers.items()
+    }
+
+
+@router.get("/retry-policies")
+async def get_retry_policies():
+    """
+    Calls, retries and failures of the retry policy of every upstream of this instance since it started.
+    """
+    return {policy.name: policy.stats() for policy in (shopify_retry_policy, ship24_retry_policy)}
+
+
+@router.post("/merchants", response_model=CreateMerchantResponse)
+async def create_merchant(req: CreateMerchantRequest, shopify_client: ShopifyClient = Depends(ShopifyClient)):
+    """
+    Sets up a merchant: stores its configuration and subscribes its shop to the order webhooks that keep the order
+    projection current.
+    """
+    await merchant_repository.create(req)
+    await register_order_webhooks(shopify_client, req.store_url, env.SHOPIFY_WEBHOOK_CALLBACK_URL)
+    return CreateMerchantResponse(status="success")
@@ -78,11 +78,11 @@ async def send_otp_api(
     error_form.tags = tags
     try:
         if requests.email:
-            order = shopify_client.get_order_by_email(
+            order = await shopify_client.get_order_by_email(
                 store_info.store_url, requests.email
             )
         else:
-            order = shopify_client.get_order_by_number(
+            order = await shopify_client.get_order_by_number(
                 store_info.store_url, requests.order_number
             )
 
@@ -104,7 +104,7 @@ async def send_otp_api(
                     message=message, error_form=error_form
                 )
 
-        otp = db_otp.get_by_email(email)
+        otp = await db_otp.otp_repository.get_by_email(email)
         store_name = store_info.name
         generic_template = store_info.email_templates.generic
         customer_support_email = store_info.email
@@ -116,9 +116,13 @@ async def send_otp_api(
 
         if otp:
             code = otp.code
-            otp.send_count += 1
-            otp.updated_at = datetime.now(pytz.timezone("UTC"))
-            otp.update()
+            await db_otp.otp_repository.update(
+                otp,
+                {
+                    "send_count": otp.send_count + 1,
+                    "updated_at": datetime.now(pytz.timezone("UTC")),
+                },
+            )
         else:
             code = db_otp.get_random_otp()
             otp = db_otp.DBOtp.from_dict(
@@ -127,7 +131,7 @@ async def send_otp_api(
                     "code": code,
                 }
             )
-            otp.save()
+            await db_otp.otp_repository.save(otp)
 
         body = f"Your verification code is: <b>{code}</b"
 
@@ -188,7 +192,9 @@ async def verify_otp_api(
     try:
         order_id = None
         if requests.order_number:
-            order = shopify_client.get_order_by_number(shop_url, requests.order_number)
+            order = await shopify_client.get_order_by_number(
+                shop_url, requests.order_number
+            )
             edges = order.get("data", {}).get("orders", {}).get("edges", [])
             if len(edges) == 0:
                 message = "No orders with the provided data"
@@ -208,7 +214,7 @@ async def verify_otp_api(
         else:
             email = requests.email
 
-        is_verified = db_otp.verify(email, requests.code)
+        is_verified = await db_otp.otp_repository.verify(email, requests.code)
         if is_verified:
             response = create_tokens(email, shop_url, Method.EMAIL)
             response.order_id = order_id
@@ -282,7 +288,7 @@ async def auth_me(
     error_form.tags = tags
     try:
         email = current_user.email
-        customer_graph = shopify_client.get_customer_by_email(
+        customer_graph = await shopify_client.get_customer_by_email(
             current_user.store_url, email
         )
         customer_node = (
@@ -298,7 +304,7 @@ async def auth_me(
             error_form.error = InvalidRequestException(message)
             raise InvalidRequestException(message=message, error_form=error_form)
 
-        user_id = create_or_update_user(email, shopify_customer_id)
+        user_id = await create_or_update_user(email, shopify_customer_id)
 
         return AuthMeResponseModel(
             valid=True,
@@ -0,0 +1,48 @@
+import hmac
+from typing import Optional
+
+from app.service_container import ServiceContainer
+from dependency_injector.wiring import Provide, inject
+from fastapi import APIRouter, Depends, Header, HTTPException
+from starlette.status import HTTP_403_FORBIDDEN
+
+from app.common.logger.log import log_info
+from app.external.ship24_client import Ship24WebhookPayload
+from app.secret_loader import init_setting
+from app.secrets import Secrets
+from app.services.tracking_service import TrackingService
+
+router = APIRouter(
+    prefix="/api/ship24",
+    tags=["ship24"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+def verify_ship24_webhook(
+    authorization: Optional[str] = Header(default=None),
+    settings: Secrets = Depends(init_setting),
+):
+    # Ship24 sends the webhook secret configured in its dashboard as a bearer token.
+    expected = f"Bearer {settings.ship24_webhook_secret}"
+    if not settings.ship24_webhook_secret or not authorization or not hmac.compare_digest(authorization, expected):
+        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Could not validate webhook credentials")
+
+
+"""
+Receives tracker updates pushed by Ship24.
+
+Every tracking in the payload is normalised into TrackingDetails and stored as the latest result for its tracking
+number, so order reads are served from the tracking result cache instead of polling Ship24.
+"""
+
+
+@router.post("/webhook", dependencies=[Depends(verify_ship24_webhook)])
+@inject
+async def ship24_webhook(
+    payload: Ship24WebhookPayload,
+    tracking_service: TrackingService = Depends(Provide[ServiceContainer.tracking_service]),
+):
+    stored = await tracking_service.store_tracking_updates(payload.trackings)
+    log_info("Stored Ship24 webhook tracking updates.", received=len(payload.trackings), stored=stored)
+    return {"status": "success"}
@@ -1,16 +1,14 @@
-from datetime import datetime, timedelta
-from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
 
 import app.db.edit_order as db_edit_order
-import validators
 from app.service_container import ServiceContainer
 from dependency_injector.wiring import Provide, inject
-from fastapi import APIRouter, Depends
-from fastapi.templating import Jinja2Templates
-from starlette.responses import JSONResponse
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import StreamingResponse
 
 from app.api.utils import (
-    check_permission,
+    check_order_ownership,
     get_chad_status,
 )
 from app.auth.authentication import get_current_user, get_store_info
@@ -19,21 +17,27 @@ from app.common.exceptions.exceptions import (
     GetOrdersByEmailException,
     OrderDoesNotExistsException,
     InvalidEmailException,
+    InvalidRequestException,
     ServerException,
 )
+from app.common.logger.log import log_warning
 from app.common.monitoring.sentry import ErrorForm
 from app.common.utils.common_functions import float_to_str_with_2_decimals
-from app.common.utils.order_utils import (
-    extract_order_id,
-    shopify_date_str_to_datetime,
-    get_amount_from_shopify_price_set,
-)
+from app.common.utils import json_codec
+from app.common.utils.concurrency import as_completed_bounded
+from app.common.utils.order_utils import get_amount_from_shopify_price_set
+from app.common.utils.json_codec import CodecJSONResponse
+from app.common.utils.validators import is_valid_email
 from app.constants import ADMIN_EMAIL, ChadStatus
 from app.dependencies import check_api_key, check_shop_url
-from app.external.shopify_client import ShopifyClient
+from app.db.order import DBOrder, order_repository
+from app.environment import env
+from app.external import shopify_queries as queries
+from app.external.shopify_client import ORDERS_PAGE_SIZE, ShopifyClient
 from app.model.merchant import RetrieveMerchantResponse, LateFromDateType
+from app.model.order import Order
 from app.model.user import User
-from app.services.tracking_service import TrackingService
+from app.services.tracking_service import GetTrackingDetailsRequest, TrackingDetails, TrackingService
 
 router = APIRouter(
     prefix="/api/shopify",
@@ -42,19 +46,24 @@ router = APIRouter(
     dependencies=[Depends(check_api_key), Depends(check_shop_url)],
 )
 
-templates_directory_path = Path(__file__).parent.parent.joinpath("templates")
-templates = Jinja2Templates(directory=templates_directory_path)
+MAX_ORDERS_PAGE_SIZE = 50
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 
 """
 Retrieves a list of orders from a Shopify store by the associated email.
 
 Args:
     email (str): This is the email of the customer. It is provided as a URL path parameter.
+    cursor (Optional[str]): orders.pageInfo.endCursor of the previous page, omitted for the first page.
+    limit (int): The number of orders per page, at most 50.
     current_user (User): The currently authenticated user. It defaults to the value returned by the dependency get_current_user.
     shopify_client (ShopifyClient): An instance of ShopifyClient. It defaults to the value returned by the dependency ShopifyClient.
 
 Returns:
     dict: orders and customers which are dictionaries themselves
+    With `Accept: application/x-ndjson` the response is streamed instead: one {"order": ...} line per order as soon as
+    its tracking is known, then a {"customers": ..., "pageInfo": ...} line.
 
 Raises:
     InvalidEmailException: Raised when the provided email fails validation.
@@ -67,88 +76,59 @@ Raises:
 @inject
 async def get_orders_by_email(
     email: str,
+    request: Request,
+    cursor: Optional[str] = None,
+    limit: int = Query(ORDERS_PAGE_SIZE, ge=1, le=MAX_ORDERS_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
     shopify_client: ShopifyClient = Depends(ShopifyClient),
     tracking_service: TrackingService = Depends(Provide[ServiceContainer.tracking_service]),
 ):
-    if not validators.email(email):
+    if not is_valid_email(email):
         raise InvalidEmailException()
     try:
-        # Gets all customers that match the provided email from the given Shopify store
-        customers = shopify_client.get_customer_by_email(current_user.store_url, email)
-
-        # Extracts the customer id from the response
-        # Note: customer id is globally unique across all Shopify stores
-        customer_id = customers.get("data", {}).get("customers", {}).get("edges", [])[0].get("node", {}).get("id")
-
-        # Uses the customer id to fetch the orders from the current user's Shopify store
-        result = shopify_client.get_orders_by_customer_id(current_user.store_url, customer_id)
-
-        orders = result.get("data", {}).get("customer", {}).get("orders", {}).get("edges", [])
-        for index, order in enumerate(orders):
-            line_items = []
-            node = order.get("node", {})
-            for edge in node.get("lineItems", {}).get("edges", []):
-                node_edge = edge.get("node", {})
-                current_quantity = node_edge.get("currentQuantity", 0)
-                refundable_quantity = node_edge.get("refundableQuantity", 0)
-                if current_quantity == refundable_quantity == 0:
-                    continue
-                line_items.append(edge)
-
-            chad_status, order_details, is_cancelation_failed = get_chad_status(node, extract_order_id(node.get("id")))
-            result["data"]["customer"]["orders"]["edges"][index]["node"]["chadFulfillmentStatus"] = chad_status
-
-            result["data"]["customer"]["orders"]["edges"][index]["node"]["lineItems"]["edges"] = line_items
-
-            fulfillments = node.get("fulfillments", [])
-            if len(fulfillments) > 0:
-                shipped_date = fulfillments[0].get("createdAt")
-                delivered_date = fulfillments[0].get("deliveredAt")
-                result["data"]["customer"]["orders"]["edges"][index]["node"]["shippedAt"] = shipped_date
-                result["data"]["customer"]["orders"]["edges"][index]["node"]["deliveredAt"] = delivered_date
-
-                tracking_info_elem = next(
-                    filter(
-                        lambda item: item.get("requiresShipping") and item.get("trackingInfo"),
-                        fulfillments,
-                    ),
-                    None,
-                )
-                if tracking_info_elem:
-                    tracking_info = tracking_info_elem.get("trackingInfo")[0]
-                    courier = tracking_info.get("company")
-                    tracking_number = tracking_info.get("number")
-                    if courier and tracking_number:
-                        tracking_details = await tracking_service.get_tracking_details(courier, tracking_number)
-                        if tracking_details:
-                            chad_status = tracking_details.chad_status
-                            result["data"]["customer"]["orders"]["edges"][index]["node"][
-                                "chadFulfillmentStatus"
-                            ] = chad_status
-                            result["data"]["customer"]["orders"]["edges"][index]["node"][
-                                "trackingDetails"
-                            ] = tracking_details.dict()
-                        else:
-                            result["data"]["customer"]["orders"]["edges"][index]["node"][
-                                "trackingInfoErrorMessage"
-                            ] = "Status not available"
-
-            if is_cancelation_failed:
-                result["data"]["customer"]["orders"]["edges"][index]["node"]["cancelationRequest"] = {
-                    "isFailed": True,
-                    "reason": "The order is already fulfilled",
-                }
-            if order_details is not None:
-                result["data"]["customer"]["orders"]["edges"][index]["node"] = {
-                    **result["data"]["customer"]["orders"]["edges"][index]["node"],
-                    **order_details,
-                }
+        # Resolves the customer by email and fetches their orders in one Shopify call,
+        # or only the orders when the customer of this email is already known.
+        result = await shopify_client.get_customer_orders_by_email(
+            current_user.store_url, email, first=limit, after=cursor
+        )
+        customers = result.get("data", {}).get("customers", {})
+        if not customers.get("edges"):
+            raise ValueError("No customer matches the email.")
+
+        edges = result.get("data", {}).get("orders", {}).get("edges", [])
+        orders = [Order.parse(edge.get("node", {})) for edge in edges]
+        # One batched Firestore read for the stored orders of the whole page.
+        db_orders = await order_repository.get_by_order_ids([order.order_id for order in orders])
+        await _prepare_orders(orders, db_orders)
+
+        if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+            return StreamingResponse(
+                _stream_orders(
+                    tracking_service,
+                    edges,
+                    orders,
+                    {"customers": customers, "pageInfo": result.get("data", {}).get("orders", {}).get("pageInfo")},
+                ),
+                media_type=NDJSON_MEDIA_TYPE,
+            )
+
+        # One batched lookup for the whole page instead of a Firestore read and Ship24 call per order.
+        tracking_by_number = await tracking_service.get_tracking_details_many(
+            [
+                GetTrackingDetailsRequest(courier=order.courier, tracking_number=order.tracking_number)
+                for order in orders
+                if order.tracking_number
+            ]
+        )
+        for edge, order in zip(edges, orders):
+            if order.tracking_number:
+                order.apply_tracking_details(tracking_by_number.get(order.tracking_number))
+            edge["node"] = order.serialize()
 
         response = {
             "data": {
-                "orders": result.get("data", {}).get("customer", {}).get("orders", {}),
-                "customers": customers.get("data", {}).get("customers", {}),
+                "orders": result.get("data", {}).get("orders", {}),
+                "customers": customers,
             }
         }
         return response
@@ -165,11 +145,93 @@ async def get_orders_by_email(
         raise GetOrdersByEmailException(error_form=error_form)
 
 
+async def _prepare_orders(orders: List[Order], db_orders: Dict[str, DBOrder]):
+    """
+    Sets everything that does not need a tracking lookup on the orders.
+    """
+    for order in orders:
+        chad_status, order_details, is_cancelation_failed = await get_chad_status(order.node, order.order_id, db_orders)
+        order.chad_fulfillment_status = chad_status
+        order.cancelation_failed = is_cancelation_failed
+        order.stored_details = order_details
+
+
+def _ndjson_line(value: dict) -> bytes:
+    return json_codec.dumps(jsonable_encoder(value)) + b"\n"
+
+
+def _order_line(edge: dict, order: Order) -> bytes:
+    edge["node"] = order.serialize()
+    return _ndjson_line({"order": edge})
+
+
+async def _stream_orders(
+    tracking_service: TrackingService,
+    edges: List[dict],
+    orders: List[Order],
+    trailer: dict,
+) -> AsyncIterator[bytes]:
+    """
+    Yields one {"order": edge} line per order as soon as it is complete, then the trailer line with the customers
+    and the orders pageInfo. Orders without a shipment to track and orders with a cached tracking result are sent
+    first, the cache is read once for the page. The others follow in the order their Ship24 lookups finish, each
+    lookup has its own timeout so a slow one only holds back its own order.
+    """
+    indexes_by_number: Dict[str, List[int]] = {}
+    couriers = {}
+    for index, order in enumerate(orders):
+        if order.tracking_number:
+            indexes_by_number.setdefault(order.tracking_number, []).append(index)
+            couriers.setdefault(order.tracking_number, order.courier)
+        else:
+            yield _order_line(edges[index], order)
+
+    try:
+        cached = await tracking_service.get_cached_tracking_details_many(
+            [
+                GetTrackingDetailsRequest(courier=courier, tracking_number=tracking_number)
+                for tracking_number, courier in couriers.items()
+            ]
+        )
+    except Exception as e:
+        log_warning("Streaming tracking cache read failed.", exception=e)
+        cached = {}
+    for tracking_number, tracking_details in cached.items():
+        for index in indexes_by_number[tracking_number]:
+            orders[index].apply_tracking_details(tracking_details)
+            yield _order_line(edges[index], orders[index])
+
+    async def lookup(courier: str, tracking_number: str) -> Optional[TrackingDetails]:
+        try:
+            return await tracking_service.fetch_tracking_details(courier, tracking_number)
+        except Exception as e:
+            # The response has already started, a failed lookup can only be reported on the order itself.
+            log_warning("Streaming tracking lookup failed.", exception=e, tracking_number=tracking_number)
+            return None
+
+    tracking_numbers = [tracking_number for tracking_number in indexes_by_number if tracking_number not in cached]
+    async for position, tracking_details in as_completed_bounded(
+        [
+            lambda tracking_number=tracking_number: lookup(couriers[tracking_number], tracking_number)
+            for tracking_number in tracking_numbers
+        ],
+        limit=env.TRACKING_CONCURRENCY_LIMIT,
+        timeout=env.TRACKING_TIMEOUT_SECONDS,
+    ):
+        for index in indexes_by_number[tracking_numbers[position]]:
+            orders[index].apply_tracking_details(tracking_details)
+            yield _order_line(edges[index], orders[index])
+
+    yield _ndjson_line(trailer)
+
+
 """
 Retrieves order information by order ID.
 
 Parameters:
     order_id (str): The ID of the order to retrieve.
+    fields (Optional[str]): Comma separated profiles (summary, detail, edit) and top-level order fields to return,
+        e.g. "summary,shippingAddress". The whole order when omitted.
     current_user (User): The current user object. (Dependency)
     store_info (RetrieveMerchantResponse): Store information. (Dependency)
     shopify_client (ShopifyClient): Shopify API client. (Dependency)
@@ -178,6 +240,7 @@ Returns:
     dict: The order information.
 
 Raises:
+    InvalidRequestException: If fields names an unknown profile or field.
     OrderDoesNotExistsException: If the order is not found.
     GetOrderByIdException: If an error occurs while retrieving the order.
 """
@@ -187,6 +250,7 @@ Raises:
 @inject
 async def get_order_by_id(
     order_id: str,
+    fields: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     store_info: RetrieveMerchantResponse = Depends(get_store_info),
     shopify_client: ShopifyClient = Depends(ShopifyClient),  # An instance of the Shopify client
@@ -204,76 +268,48 @@ async def get_order_by_id(
     error_form.tags = tags
     is_admin = current_user.email == ADMIN_EMAIL
     try:
-        if not is_admin:
-            check_permission(shopify_client, current_user, order_id)
-        order = shopify_client.get_order_by_id(current_user.store_url, order_id)
-        order_details = order.get("data", {}).get("order", {})
+        selected_fields = queries.parse_order_fields(fields)
+    except ValueError as e:
+        raise InvalidRequestException(str(e))
+    try:
+        result = await shopify_client.get_order_by_id(current_user.store_url, order_id, fields=selected_fields)
+        order_details = result.get("data", {}).get("order", {})
+        # The order payload already carries the customer email, so ownership is checked against it
+        # instead of a separate Shopify call. Nothing from the order is returned when the check fails.
+        if order_details and not is_admin:
+            check_order_ownership(order_details, current_user)
         # if the order is not found, order_details will be Null
         if order_details:
+            order = Order.parse(order_details, order_id)
+            refunds = order_details.get("refunds", [])
             # Fetches the order's chad_status
             # chad_status represents the latest order status as presented to the shopper (end user)
             # Examples include: Ordered, Shipped, Delivered, Refund requested etc.
-            fulfillments = order_details.get("fulfillments", [])
-            refunds = order_details.get("refunds", [])
             (
-                chad_status,
+                order.chad_fulfillment_status,
                 original_order_details,
-                is_cancelation_failed,
-            ) = get_chad_status(order_details, order_id)
+                order.cancelation_failed,
+            ) = await get_chad_status(order_details, order_id)
 
             if original_order_details is not None:
-                order_details = original_order_details
-
-            order_details["chadFulfillmentStatus"] = chad_status
-
-            # If cancelation has failed, provide the reason
-            if is_cancelation_failed:
-                order_details["cancelationRequest"] = {
-                    "isFailed": True,
-                    "reason": "The order is already fulfilled",
-                }
-
-            # If there is at least on fulfillment in this order, obtain the
-            # created and delivered date of the first fulfilment
-            # This section of the code will eventually have to be improved to account for
-            # the scenario that the first fulfilmment created is not necessarily the first to be delivered
-            if len(fulfillments) > 0:
-                shipped_date = fulfillments[0].get("createdAt")
-                delivered_date = fulfillments[0].get("deliveredAt")
-                order_details["shippedAt"] = shipped_date
-                order_details["deliveredAt"] = delivered_date
-
-                tracking_info_elem = next(
-                    filter(
-                        lambda item: item.get("requiresShipping") and item.get("trackingInfo"),
-                        fulfillments,
-                    ),
-                    None,
+                order.use_stored_order(original_order_details)
+
+            # The shipped and delivered dates are those of the first fulfilment.
+            # This will eventually have to be improved to account for the scenario that the first
+            # fulfilmment created is not necessarily the first to be delivered
+            if order.tracking_number:
+                order.apply_tracking_details(
+                    await tracking_service.get_tracking_details(order.courier, order.tracking_number)
                 )
-                if tracking_info_elem:
-                    tracking_info = tracking_info_elem.get("trackingInfo")[0]
-                    courier = tracking_info.get("company")
-                    tracking_number = tracking_info.get("number")
-                    if courier and tracking_number:
-                        tracking_details = await tracking_service.get_tracking_details(courier, tracking_number)
-                        if tracking_details:
-                            chad_status = tracking_details.chad_status
-                            order_details["chadFulfillmentStatus"] = chad_status
-                            order_details["trackingDetails"] = tracking_details.dict()
-                        else:
-                            order_details["trackingInfoErrorMessage"] = "Status not available"
 
             # Check that the customer's name matches the shipping address name
-            customer_name = order_details.get("customer", {})
-            shipping_address_name = order_details.get("shippingAddress", {})
-
-            if customer_name and shipping_address_name:
-                order_details["isMatchShopperAndShippingName"] = customer_name == shipping_address_name
-            else:
-                order_details["isMatchShopperAndShippingName"] = False
-
-            order["data"]["order"] = order_details
+            customer_name = order.node.get("customer", {})
+            shipping_address_name = order.node.get("shippingAddress", {})
+            order.is_match_shopper_and_shipping_name = bool(customer_name and shipping_address_name) and (
+                customer_name == shipping_address_name
+            )
 
+            chad_status = order.chad_fulfillment_status
             # If an order has been edited to include more expensive items that
             # require a top up payment which has yet to be paid by the shopper
             # Retrieve the original order from the database
@@ -281,7 +317,7 @@ async def get_order_by_id(
                 edit_order_obj = db_edit_order.get_by_order_id(order_id)
 
                 if edit_order_obj:
-                    order["data"]["order"]["originalOrder"] = {
+                    order.original_order = {
                         "totalShippingPriceSet": edit_order_obj.totalShippingPriceSet,
                         "currentTotalTaxSet": edit_order_obj.currentTotalTaxSet,
                         "currentTotalPriceSet": edit_order_obj.currentTotalPriceSet,
@@ -298,44 +334,21 @@ async def get_order_by_id(
                     refund_amount += get_amount_from_shopify_price_set(refund_item, "totalRefundedSet")
                     currency_code = refund_item.get("totalRefundedSet", {}).get("shopMoney", {}).get("currencyCode")
                 if refund_items:
-                    order["data"]["order"]["refundedPriceSet"] = {
+                    order.refunded_price_set = {
                         "shopMoney": {
                             "amount": float_to_str_with_2_decimals(refund_amount),
                             "currencyCode": currency_code,
                         }
                     }
 
-            # Sets the threshold for determining when an order is considered late
-            order["data"]["order"]["isLate"] = False
-            order["data"]["order"]["lateThreshold"] = None
-
-            lateness_threshold = store_info.order_config.lateness_threshold or 14
-            order_late_pick_field = store_info.order_config.order_late_pick_field or LateFromDateType.PLACED
-
             # Determines whether an order is late based on the lateness_threshold
-            if order_late_pick_field == LateFromDateType.PLACED:
-                order_date_str = order_details.get("createdAt", "")
-                order_date = shopify_date_str_to_datetime(order_date_str)
-                if datetime.now() - order_date > timedelta(days=lateness_threshold):
-                    order["data"]["order"]["isLate"] = True
-                late_threshold = order_date + timedelta(days=lateness_threshold)
-                order["data"]["order"]["lateThreshold"] = late_threshold.strftime("%Y-%m-%dT%H:%M:%SZ")
-            else:  # shipped
-                if chad_status != ChadStatus.SHIPPED.value:
-                    return order
-
-                if len(fulfillments) > 0:
-                    shipped_date_str = fulfillments[0].get("updatedAt")
-                    shipped_date = shopify_date_str_to_datetime(shipped_date_str)
-                else:
-                    shipped_date_str = order_details.get("updatedAt")
-                    shipped_date = shopify_date_str_to_datetime(shipped_date_str)
-
-                if datetime.now() - shipped_date > timedelta(days=lateness_threshold):
-                    order["data"]["order"]["isLate"] = True
-                late_threshold = shipped_date + timedelta(days=lateness_threshold)
-                order["data"]["order"]["lateThreshold"] = late_threshold.strftime("%Y-%m-%dT%H:%M:%SZ")
-            return JSONResponse(content=order)  # TODO: Change this to OrderResponseModel eventually.
+            order.set_lateness(
+                store_info.order_config.lateness_threshold or 14,
+                store_info.order_config.order_late_pick_field or LateFromDateType.PLACED,
+            )
+
+            result["data"]["order"] = order.serialize()
+            return CodecJSONResponse(content=result)
         else:
             raise OrderDoesNotExistsException(error_form=error_form)
     except Exception as error:
@@ -0,0 +1,161 @@
+import base64
+import hashlib
+import hmac
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request
+from starlette.status import HTTP_403_FORBIDDEN
+
+from app.common.cache.lru_ttl_cache import LRUTTLCache
+from app.common.logger.log import log_info, log_warning
+from app.db.order_projection import OrderProjectionModelContext
+from app.db.shopify_webhook_event import ShopifyWebhookEventModelContext
+from app.external.shopify_client import ShopifyClient
+from app.external.shopify_rate_limiter import background_priority
+from app.external.shopify_transport import _normalize_shop_url
+from app.secret_loader import init_setting
+from app.secrets import Secrets
+
+router = APIRouter(
+    prefix="/api/shopify/webhooks",
+    tags=["shopify-webhooks"],
+    responses={404: {"description": "Not found"}},
+)
+
+# Webhook topic -> WebhookSubscriptionTopic used to subscribe to it. orders/create is included so that a new order
+# drops the projected order list of its customer, which is indexed again with the new order by the next read.
+ORDER_WEBHOOK_TOPICS = {
+    "orders/create": "ORDERS_CREATE",
+    "orders/updated": "ORDERS_UPDATED",
+    "orders/cancelled": "ORDERS_CANCELLED",
+    "fulfillments/create": "FULFILLMENTS_CREATE",
+    "fulfillments/update": "FULFILLMENTS_UPDATE",
+}
+
+# Shopify retries a delivery for up to 48 hours.
+WEBHOOK_ID_TTL_SECONDS = 48 * 60 * 60.0
+seen_webhook_ids: LRUTTLCache[bool] = LRUTTLCache(max_size=8192)
+
+
+async def verify_shopify_webhook(
+    request: Request,
+    x_shopify_hmac_sha256: Optional[str] = Header(default=None),
+    settings: Secrets = Depends(init_setting),
+):
+    # Shopify signs the raw body with the app's client secret, base64 encoded HMAC-SHA256.
+    body = await request.body()
+    expected = base64.b64encode(
+        hmac.new(settings.shopify_client_secret.encode(), body, hashlib.sha256).digest()
+    ).decode()
+    if not x_shopify_hmac_sha256 or not hmac.compare_digest(x_shopify_hmac_sha256, expected):
+        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Could not validate webhook credentials")
+
+
+async def register_order_webhooks(shopify_client: ShopifyClient, shop_url: str, callback_url: str):
+    """
+    Subscribes the shop to every topic that keeps the order projection current, called when a merchant is set up.
+    Subscribing a shop again is harmless, Shopify reports the existing subscription as a user error.
+    """
+    if not callback_url:
+        log_warning("No Shopify webhook callback URL is configured, the order projection is not kept current.")
+        return
+    for topic in ORDER_WEBHOOK_TOPICS.values():
+        data = await shopify_client.create_webhook(shop_url, topic, callback_url)
+        user_errors = ((data.get("data") or {}).get("webhookSubscriptionCreate") or {}).get("userErrors") or []
+        user_errors = [error for error in user_errors if "already been taken" not in (error.get("message") or "")]
+        if user_errors:
+            log_warning("Subscribing to a Shopify webhook failed.", shop_url=shop_url, topic=topic, errors=user_errors)
+
+
+def _order_id(topic: str, payload: dict) -> Optional[str]:
+    order_id = payload.get("order_id") if topic.startswith("fulfillments/") else payload.get("id")
+    return str(order_id) if order_id else None
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    # REST payloads carry a local offset, GraphQL returns UTC with a Z suffix.
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+    except ValueError:
+        return None
+
+
+async def refresh_order(shopify_client: ShopifyClient, shop_url: str, order_id: str, updated_at: Optional[str]):
+    """
+    Reads the order again through GraphQL rather than mapping the REST payload, so the projection has exactly the
+    shape the read paths return. Skipped when the projection is already as recent as the webhook.
+    """
+    with background_priority():
+        received_at = _parse_datetime(updated_at)
+        if received_at:
+            stored_at = _parse_datetime(await OrderProjectionModelContext.get_shopify_updated_at(shop_url, order_id))
+            if stored_at and stored_at >= received_at:
+                return
+        await shopify_client.refresh_order_projection(shop_url, order_id)
+
+
+async def process_order_webhook(
+    shopify_client: ShopifyClient,
+    webhook_id: str,
+    topic: str,
+    shop_url: str,
+    order_id: str,
+    updated_at: Optional[str],
+):
+    """
+    Refreshes the order and only then records the delivery, a delivery whose refresh failed is processed again when
+    Shopify redelivers it.
+    """
+    try:
+        await refresh_order(shopify_client, shop_url, order_id, updated_at)
+    except Exception as e:
+        log_warning("Refreshing the order projection failed.", exception=e, shop_url=shop_url, order_id=order_id)
+        return
+    seen_webhook_ids.set(webhook_id, True, WEBHOOK_ID_TTL_SECONDS)
+    try:
+        await ShopifyWebhookEventModelContext.register(webhook_id, topic, shop_url)
+    except Exception as e:
+        log_warning("Recording the Shopify webhook failed.", exception=e, webhook_id=webhook_id)
+
+
+"""
+Receives the Shopify order and fulfillment webhooks (see ORDER_WEBHOOK_TOPICS).
+
+Each delivery is acknowledged right away and the order is refreshed in its projection in the background. Deliveries
+are deduplicated by X-Shopify-Webhook-Id, Shopify delivers at least once.
+"""
+
+
+@router.post("", dependencies=[Depends(verify_shopify_webhook)])
+async def shopify_webhook(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    x_shopify_topic: str = Header(),
+    x_shopify_shop_domain: str = Header(),
+    x_shopify_webhook_id: str = Header(),
+    shopify_client: ShopifyClient = Depends(ShopifyClient),
+):
+    if x_shopify_topic not in ORDER_WEBHOOK_TOPICS:
+        log_warning("Ignoring unexpected Shopify webhook topic.", topic=x_shopify_topic)
+        return {"status": "ignored"}
+
+    if seen_webhook_ids.get(x_shopify_webhook_id) or await ShopifyWebhookEventModelContext.is_registered(
+        x_shopify_webhook_id
+    ):
+        return {"status": "duplicate"}
+    shop_url = _normalize_shop_url(x_shopify_shop_domain)
+
+    payload = await request.json()
+    order_id = _order_id(x_shopify_topic, payload)
+    if not order_id:
+        log_warning("Shopify webhook without an order id.", topic=x_shopify_topic, webhook_id=x_shopify_webhook_id)
+        return {"status": "ignored"}
+
+    # Fulfillment payloads carry the fulfillment's updated_at, which says nothing about the stored order.
+    updated_at = payload.get("updated_at") if x_shopify_topic.startswith("orders/") else None
+    background_tasks.add_task(
+        process_order_webhook, shopify_client, x_shopify_webhook_id, x_shopify_topic, shop_url, order_id, updated_at
+    )
+    log_info("Received Shopify webhook.", topic=x_shopify_topic, shop_url=shop_url, order_id=order_id)
+    return {"status": "success"}
@@ -1,7 +1,7 @@
 import logging
 import uuid
 from datetime import datetime
-from typing import Union
+from typing import Dict, Optional, Union
 
 import pytz
 
@@ -11,21 +11,30 @@ from app.common.exceptions.exceptions import PermissionDenied
 from app.common.monitoring.sentry import report_exception
 from app.common.utils.order_utils import get_amount_from_shopify_price_set
 from app.constants import ChadStatus
-from app.external.shopify_client import ShopifyClient
 from app.model.user import User
 
 logger = logging.getLogger(__name__)
 
 
-def check_permission(shopify_client: ShopifyClient, user: User, order_id: str):
-    response = shopify_client.get_customer_by_order_id(user.store_url, order_id)
-    if response.data.order.customer.email != user.email:
+def check_order_ownership(order_details: dict, user: User):
+    """
+    Raises PermissionDenied unless the order belongs to the user. Checked against
+    an order payload that was already fetched, it must include customer.email.
+    """
+    customer = order_details.get("customer") or {}
+    if not customer.get("email") or customer.get("email") != user.email:
         raise PermissionDenied()
 
 
-def get_chad_status(
-    order_details: dict, order_id: str
+async def get_chad_status(
+    order_details: dict,
+    order_id: str,
+    db_orders: Optional[Dict[str, db_order.DBOrder]] = None,
 ) -> (str, Union[dict, None], bool):
+    """
+    db_orders are the stored orders of the page, prefetched with
+    order_repository.get_by_order_ids. Without them the order is read on its own.
+    """
     chad_status = ChadStatus.ORDERED.value
 
     is_cancelation_failed = False
@@ -44,21 +53,30 @@ def get_chad_status(
         fulfillments_statuses = [
             fulfillment.get("displayStatus", "") for fulfillment in fulfillments
         ]
-        try:
-            order_obj = db_order.get_by_order_id(order_id)
-            chad_status = order_obj.status
+        if db_orders is not None:
+            order_obj = db_orders.get(order_id)
+        else:
+            try:
+                order_obj = await db_order.order_repository.get_by_order_id(order_id)
+            except Exception as e:
+                # Falls back to the status derived from Shopify below
+                report_exception(
+                    e,
+                    context_name="Retrieve Stored Order",
+                    context_content={"order_id": order_id},
+                )
+                order_obj = None
 
-            if chad_status == "CANCELATION_FAILED":
+        chad_status = None
+        if order_obj is not None:
+            if order_obj.status == "CANCELATION_FAILED":
                 is_cancelation_failed = True
-                chad_status = None
             else:
                 return (
-                    chad_status,
+                    order_obj.status,
                     order_obj.original_order_details,
                     is_cancelation_failed,
                 )
-        except:
-            chad_status = None
 
         if chad_status is None:
             if (
@@ -116,9 +134,9 @@ def get_chad_status(
     return chad_status, None, is_cancelation_failed
 
 
-def create_or_update_user(email: str, shopify_customer_id: str) -> str:
+async def create_or_update_user(email: str, shopify_customer_id: str) -> str:
     try:
-        user = db_user.get_by_email(email)
+        user = await db_user.user_repository.get_by_email(email)
         if user is None:
             user_id = str(uuid.uuid4())
             user = db_user.DBUser.from_dict(
@@ -128,10 +146,11 @@ def create_or_update_user(email: str, shopify_customer_id: str) -> str:
                     "email": email,
                 }
             )
-            user.save()
+            await db_user.user_repository.save(user)
         else:
-            user.last_login_at = datetime.now(pytz.timezone("UTC"))
-            user.update()
+            await db_user.user_repository.update(
+                user, {"last_login_at": datetime.now(pytz.timezone("UTC"))}
+            )
 
         return user.user_id
     except Exception as e:
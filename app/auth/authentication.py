@@ -60,10 +60,10 @@ def get_current_user(
     return user
 
 
-def get_store_info(
+async def get_store_info(
     shop_url: Union[str, None] = Header(default=None),
 ):
-    store_info = db_merchant.retrieve_by_store_url(shop_url)
+    store_info = await db_merchant.retrieve_cached_by_store_url(shop_url)
     if not store_info:
         raise InvalidStoreUrlException(f"Store url [{shop_url}] does not exist")
     return store_info
@@ -0,0 +1,55 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+from app.common.cache.lru_ttl_cache import LRUTTLCache
+
+V = TypeVar("V")
+
+
+class AsyncLoadingCache(Generic[V]):
+    """
+    TTL cache that loads missing entries itself and collapses concurrent misses for the same key into one load.
+
+    Every caller waiting on a load gets its result or its exception. A key invalidated while its load is in flight is
+    not cached with the (possibly stale) result of that load. None results are returned but never cached.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 1024):
+        self.ttl = ttl
+        self._cache: LRUTTLCache[V] = LRUTTLCache(max_size=max_size)
+        self._loading: Dict[Hashable, "asyncio.Task[Optional[V]]"] = {}
+        self._generations: Dict[Hashable, int] = {}
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Optional[V]]]) -> Optional[V]:
+        value = self._cache.get(key)
+        if value is not None:
+            return value
+
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._loading[key] = task
+        # Shielded so a caller that goes away does not cancel the load the other callers are waiting on.
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Optional[V]]]) -> Optional[V]:
+        generation = self._generations.get(key, 0)
+        try:
+            value = await loader()
+        finally:
+            if self._loading.get(key) is asyncio.current_task():
+                del self._loading[key]
+        if value is not None and self._generations.get(key, 0) == generation:
+            self._cache.set(key, value, self.ttl)
+        return value
+
+    def invalidate(self, key: Hashable):
+        self._cache.delete(key)
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._loading.pop(key, None)
+
+    def clear(self):
+        for key in set(self._loading) | set(self._generations):
+            self._generations[key] = self._generations.get(key, 0) + 1
+        self._cache.clear()
+        self._loading.clear()
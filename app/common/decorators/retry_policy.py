@@ -0,0 +1,188 @@
+import asyncio
+import functools
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Type, TypeVar
+
+from app.common.logger.log import log_warning
+
+T = TypeVar("T")
+
+ExceptionTypes = Tuple[Type[BaseException], ...]
+
+
+class RetryBudget:
+    """
+    Caps retries to a share of the calls made to one upstream over a sliding window, e.g. 10%, so an outage does not
+    multiply the load on it. `min_retries` are always allowed per window so a quiet upstream can still retry.
+
+    Shared by every policy calling the same upstream, see retry_budget.
+    """
+
+    def __init__(self, name: str, ratio: float = 0.1, min_retries: int = 10, window_seconds: int = 10):
+        self.name = name
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window_seconds = window_seconds
+        # [second, calls, retries], oldest first.
+        self._buckets: Deque[List[int]] = deque()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _bucket(self, now: float) -> List[int]:
+        second = int(now)
+        while self._buckets and self._buckets[0][0] <= second - self.window_seconds:
+            self._buckets.popleft()
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+        return self._buckets[-1]
+
+    def record_call(self, now: Optional[float] = None):
+        with self._lock:
+            self._bucket(time.monotonic() if now is None else now)[1] += 1
+
+    def try_acquire_retry(self, now: Optional[float] = None) -> bool:
+        with self._lock:
+            bucket = self._bucket(time.monotonic() if now is None else now)
+            calls = sum(b[1] for b in self._buckets)
+            retries = sum(b[2] for b in self._buckets)
+            if retries >= max(self.min_retries, self.ratio * calls):
+                self.rejected += 1
+                return False
+            bucket[2] += 1
+            return True
+
+
+# One budget per upstream, shared by every policy calling it.
+retry_budgets: Dict[str, RetryBudget] = {}
+
+
+def retry_budget(upstream: str, **kwargs) -> RetryBudget:
+    budget = retry_budgets.get(upstream)
+    if budget is None:
+        budget = retry_budgets[upstream] = RetryBudget(upstream, **kwargs)
+    return budget
+
+
+class RetryPolicy:
+    """
+    Retries sync and async callables with exponential backoff and full jitter, the n-th retry waits a random time
+    between 0 and min(max_delay, base_delay * 2 ** n). Async callables sleep with asyncio.sleep and never block the
+    event loop.
+
+    Exceptions are retried when they are one of `retry_on` and not one of `give_up_on`, and `retry_if` (if given)
+    accepts them. Every retry also needs room in the upstream's budget, otherwise the last exception is raised.
+
+    Counters are kept per policy, see stats.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        attempts: int = 3,
+        base_delay: float = 0.1,
+        max_delay: float = 2.0,
+        retry_on: ExceptionTypes = (Exception,),
+        give_up_on: ExceptionTypes = (),
+        retry_if: Optional[Callable[[BaseException], bool]] = None,
+        budget: Optional[RetryBudget] = None,
+        sleep: bool = True,
+    ):
+        self.name = name
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+        self.give_up_on = give_up_on
+        self.retry_if = retry_if
+        self.budget = budget
+        self.sleep = sleep
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.budget_exhausted = 0
+
+    def should_retry(self, exception: BaseException) -> bool:
+        if isinstance(exception, self.give_up_on) or not isinstance(exception, self.retry_on):
+            return False
+        return self.retry_if is None or self.retry_if(exception)
+
+    def delay(self, retry: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**retry))
+
+    def _next_delay(self, attempt: int, exception: BaseException) -> Optional[float]:
+        """
+        Seconds to wait before the next attempt, None when the exception has to be raised.
+        """
+        if attempt >= self.attempts or not self.should_retry(exception):
+            self.failures += 1
+            return None
+        if self.budget is not None and not self.budget.try_acquire_retry():
+            self.failures += 1
+            self.budget_exhausted += 1
+            log_warning("Retry budget exhausted.", policy=self.name, exception=repr(exception))
+            return None
+        self.retries += 1
+        delay = self.delay(attempt - 1) if self.sleep else 0
+        log_warning(
+            "Retrying call.", policy=self.name, attempt=attempt, delay=round(delay, 3), exception=repr(exception)
+        )
+        return delay
+
+    def _record_call(self):
+        self.calls += 1
+        if self.budget is not None:
+            self.budget.record_call()
+
+    def call(self, function: Callable[..., T], *args, **kwargs) -> T:
+        self._record_call()
+        attempt = 1
+        while True:
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(attempt, e)
+                if delay is None:
+                    raise
+            if delay:
+                time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, function: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        self._record_call()
+        attempt = 1
+        while True:
+            try:
+                return await function(*args, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(attempt, e)
+                if delay is None:
+                    raise
+            if delay:
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    def __call__(self, function: Callable[..., Any]) -> Callable[..., Any]:
+        if asyncio.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                return await self.call_async(function, *args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            return self.call(function, *args, **kwargs)
+
+        return wrapper
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "budget_exhausted": self.budget_exhausted,
+        }
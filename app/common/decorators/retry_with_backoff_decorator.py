@@ -1,8 +1,9 @@
+import asyncio
+import functools
 import logging
-import random
-
 import sys
-import time
+
+from app.common.decorators.retry_policy import RetryPolicy
 
 logger = logging.getLogger(__name__)
 
@@ -10,24 +11,45 @@ logger = logging.getLogger(__name__)
 def retry_with_backoff(
     retries: int = 3, backoff_in_secs: float = 1, fail_open=False, test_mode=False
 ):
+    """
+    Works on sync and async functions, async ones sleep without blocking the event loop.
+    See RetryPolicy for retry budgets and per exception rules.
+    """
+
     def fn(f):
-        def wrapper(*args, **kwargs):
-            attempt = 1
-            while True:
+        policy = RetryPolicy(
+            f.__qualname__,
+            attempts=retries,
+            base_delay=backoff_in_secs,
+            max_delay=backoff_in_secs * 2**retries,
+            sleep=not test_mode,
+        )
+
+        def give_up():
+            logger.warning("failed execution", exc_info=sys.exc_info())
+            logger.info(f"max retries ({retries}) reached")
+            if not fail_open:
+                raise
+
+        if asyncio.iscoroutinefunction(f):
+
+            @functools.wraps(f)
+            async def async_wrapper(*args, **kwargs):
                 try:
-                    x = f(*args, **kwargs)
-                    return x
-                except:
-                    logger.warning("failed execution", exc_info=sys.exc_info())
-                    if attempt >= retries:
-                        logger.info(f"max retries ({retries}) reached")
-                        if not fail_open:
-                            raise
-                        return None
-
-                    sleep = backoff_in_secs * 2 ** attempt + random.uniform(0, 1)
-                    time.sleep(sleep) if not test_mode else None
-                    attempt += 1
+                    return await policy.call_async(f, *args, **kwargs)
+                except Exception:
+                    give_up()
+                    return None
+
+            return async_wrapper
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            try:
+                return policy.call(f, *args, **kwargs)
+            except Exception:
+                give_up()
+                return None
 
         return wrapper
 
@@ -0,0 +1,145 @@
+import zlib
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Optional, see the speedups extra. Without it only gzip is offered.
+    brotli = None
+
+# Moderate levels, the responses are compressed on every request.
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+
+class _Gzip:
+    def __init__(self):
+        # wbits 31 writes the gzip header and trailer.
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    encodings = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            encodings[name.strip().lower()] = quality
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    The encoding to use for a request's Accept-Encoding header, br over gzip when the client accepts both equally.
+    """
+    encodings = _accepted_encodings(accept_encoding)
+    available = ["br", "gzip"] if brotli is not None else ["gzip"]
+    candidates = [(encodings.get(name, encodings.get("*", 0.0)), -index, name) for index, name in enumerate(available)]
+    quality, _, name = max(candidates)
+    return name if quality > 0 else None
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses of at least `minimum_size` bytes with brotli or gzip, whichever the client prefers.
+
+    Unlike starlette's GZipMiddleware every chunk of a streaming response is flushed as it is sent, so NDJSON order
+    lines still reach the client one by one.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            encoding = negotiate_encoding(Headers(scope=scope).get("Accept-Encoding", ""))
+            if encoding is not None:
+                await _CompressionResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Optional[Send] = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.compressor = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message):
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk tells whether to compress.
+            self.initial_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            if "content-encoding" in headers or (len(body) < self.minimum_size and not more_body):
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+            self.compressor = _Brotli() if self.encoding == "br" else _Gzip()
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+            await self._send_body(body, more_body, headers)
+            return
+
+        if self.compressor is None:
+            await self.send(message)
+            return
+        await self._send_body(body, more_body)
+
+    async def _send_body(self, body: bytes, more_body: bool, headers: Optional[MutableHeaders] = None):
+        data = self.compressor.compress(body) + (self.compressor.flush() if more_body else self.compressor.finish())
+        if headers is not None:
+            if not more_body:
+                headers["Content-Length"] = str(len(data))
+            await self.send(self.initial_message)
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -0,0 +1,228 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+from app.common.exceptions.exceptions import ErrorCodes, ServerException
+from app.common.logger.log import log_info, log_warning
+from app.environment import env
+
+T = TypeVar("T")
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenException(ServerException):
+    def __init__(self, name: str):
+        super().__init__(
+            ErrorCodes.SERVER_ERROR,
+            f"{name} is unavailable.",
+            503,
+            data={"circuit_breaker": name},
+            log_level=logging.WARNING,
+        )
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that is failing or slow, so requests fail (or degrade) at once instead of waiting on it.
+
+    Closed: calls go through. The breaker opens once at least `minimum_calls` were made in the last `window_seconds`
+    and either the share of failed calls reaches `failure_rate_threshold` or the share of calls slower than
+    `slow_call_seconds` reaches `slow_call_rate_threshold`.
+    Open: calls are rejected with CircuitOpenException for `open_seconds`.
+    Half open: up to `half_open_max_calls` trial calls go through. The breaker closes when they all succeed in time and
+    opens again on the first failed or slow one.
+
+    Every state change starts a new generation. A call is only recorded against the generation that admitted it, so a
+    call let through while closed that ends after the breaker opened counts neither towards the next window nor as a
+    trial call.
+
+    Only exceptions accepted by `failure_if` count as failures, e.g. a 404 says nothing about the upstream's health.
+    A call cancelled by its caller, usually on a timeout, counts as failed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        slow_call_seconds: float,
+        failure_rate_threshold: Optional[float] = None,
+        slow_call_rate_threshold: Optional[float] = None,
+        minimum_calls: Optional[int] = None,
+        window_seconds: int = 30,
+        open_seconds: Optional[float] = None,
+        half_open_max_calls: int = 3,
+        failure_if: Optional[Callable[[BaseException], bool]] = None,
+    ):
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds
+        self.failure_rate_threshold = failure_rate_threshold or env.CIRCUIT_BREAKER_FAILURE_RATE
+        self.slow_call_rate_threshold = slow_call_rate_threshold or env.CIRCUIT_BREAKER_SLOW_CALL_RATE
+        self.minimum_calls = minimum_calls or env.CIRCUIT_BREAKER_MINIMUM_CALLS
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds or env.CIRCUIT_BREAKER_OPEN_SECONDS
+        self.half_open_max_calls = half_open_max_calls
+        self.failure_if = failure_if
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.state = CircuitState.CLOSED
+        self.generation = 0
+        self.opened_at: Optional[float] = None
+        # [second, calls, failures, slow calls], oldest first.
+        self._buckets: Deque[List[int]] = deque()
+        self._half_open_calls = 0
+        self._half_open_successes = 0
+        self.rejected = 0
+
+    def _update_state(self, now: float):
+        if self.state == CircuitState.OPEN and now - self.opened_at >= self.open_seconds:
+            self.state = CircuitState.HALF_OPEN
+            self.generation += 1
+            self._half_open_calls = 0
+            self._half_open_successes = 0
+            log_info("Circuit breaker half open.", circuit_breaker=self.name)
+
+    def _open(self, now: float, **kwargs):
+        self.state = CircuitState.OPEN
+        self.generation += 1
+        self.opened_at = now
+        self._buckets.clear()
+        log_warning("Circuit breaker opened.", circuit_breaker=self.name, **kwargs)
+
+    def _close(self):
+        self.state = CircuitState.CLOSED
+        self.generation += 1
+        self.opened_at = None
+        self._buckets.clear()
+        log_info("Circuit breaker closed.", circuit_breaker=self.name)
+
+    def _totals(self, now: float) -> List[int]:
+        second = int(now)
+        while self._buckets and self._buckets[0][0] <= second - self.window_seconds:
+            self._buckets.popleft()
+        return [sum(bucket[field] for bucket in self._buckets) for field in (1, 2, 3)]
+
+    @property
+    def is_open(self) -> bool:
+        """
+        True while calls are rejected, a half open breaker lets trial calls through.
+        """
+        with self._lock:
+            self._update_state(time.monotonic())
+            return self.state == CircuitState.OPEN
+
+    def admit(self, now: Optional[float] = None) -> Optional[int]:
+        """
+        Returns the generation the call is admitted in, to be passed to record, or None when it is rejected.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._update_state(now)
+            if self.state == CircuitState.CLOSED:
+                return self.generation
+            if self.state == CircuitState.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return self.generation
+            self.rejected += 1
+            return None
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        return self.admit(now) is not None
+
+    def record(self, duration: float, failed: bool, now: Optional[float] = None, generation: Optional[int] = None):
+        """
+        Records a call admitted in `generation`. Without one the call counts towards the window of a closed breaker
+        only, never as a trial call.
+        """
+        now = time.monotonic() if now is None else now
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if self.state == CircuitState.HALF_OPEN:
+                if generation is None:
+                    return
+                if failed or slow:
+                    self._open(now, trial_failed=failed, trial_slow=slow)
+                else:
+                    self._half_open_successes += 1
+                    if self._half_open_successes >= self.half_open_max_calls:
+                        self._close()
+                return
+            if self.state == CircuitState.OPEN:
+                return
+
+            second = int(now)
+            if not self._buckets or self._buckets[-1][0] != second:
+                self._buckets.append([second, 0, 0, 0])
+            bucket = self._buckets[-1]
+            bucket[1] += 1
+            bucket[2] += failed
+            bucket[3] += slow
+
+            calls, failures, slow_calls = self._totals(now)
+            if calls < self.minimum_calls:
+                return
+            if failures / calls >= self.failure_rate_threshold or slow_calls / calls >= self.slow_call_rate_threshold:
+                self._open(now, calls=calls, failures=failures, slow_calls=slow_calls)
+
+    def _is_failure(self, exception: BaseException) -> bool:
+        return self.failure_if is None or self.failure_if(exception)
+
+    async def call_async(self, function: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        generation = self.admit()
+        if generation is None:
+            raise CircuitOpenException(self.name)
+        started_at = time.monotonic()
+        try:
+            result = await function(*args, **kwargs)
+        except asyncio.CancelledError:
+            self.record(time.monotonic() - started_at, failed=True, generation=generation)
+            raise
+        except Exception as e:
+            self.record(time.monotonic() - started_at, failed=self._is_failure(e), generation=generation)
+            raise
+        self.record(time.monotonic() - started_at, failed=False, generation=generation)
+        return result
+
+    def __call__(self, function: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            return await self.call_async(function, *args, **kwargs)
+
+        return wrapper
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            self._update_state(now)
+            calls, failures, slow_calls = self._totals(now)
+            return {
+                "state": self.state.value,
+                "calls": calls,
+                "failures": failures,
+                "slow_calls": slow_calls,
+                "rejected": self.rejected,
+                "open_for_seconds": round(now - self.opened_at, 1) if self.state == CircuitState.OPEN else None,
+            }
+
+
+# One breaker per upstream, see the admin endpoint.
+circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def circuit_breaker(upstream: str, **kwargs) -> CircuitBreaker:
+    breaker = circuit_breakers.get(upstream)
+    if breaker is None:
+        breaker = circuit_breakers[upstream] = CircuitBreaker(upstream, **kwargs)
+    return breaker
@@ -0,0 +1,54 @@
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _InFlight:
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.callers = 1
+
+
+class RequestCoalescer:
+    """
+    Shares one in-flight upstream call between concurrent callers asking for the same key, e.g. several tabs opening
+    the same order. Every caller gets the call's result or its exception.
+
+    Only calls that overlap in time are collapsed, a call that already finished is never reused, so this is not a
+    cache. Callers tend to modify the payloads they get, so when a call had several callers each one receives its own
+    deep copy of the result.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, _InFlight] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        entry = self._in_flight.get(key)
+        if entry is None:
+            entry = _InFlight(asyncio.ensure_future(call()))
+            self._in_flight[key] = entry
+            # Runs before any caller resumes, so no caller can join a call that already finished.
+            entry.task.add_done_callback(lambda _, key=key, entry=entry: self._finish(key, entry))
+        else:
+            entry.callers += 1
+            self.coalesced += 1
+        # Shielded so a caller that goes away does not cancel the call the other callers are waiting on.
+        result = await asyncio.shield(entry.task)
+        return result if entry.callers == 1 else copy.deepcopy(result)
+
+    def _finish(self, key: Hashable, entry: _InFlight):
+        if self._in_flight.get(key) is entry:
+            del self._in_flight[key]
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": self.in_flight}
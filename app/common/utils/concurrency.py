@@ -0,0 +1,70 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Sequence, Tuple, TypeVar
+
+from app.common.logger.log import log_warning
+
+T = TypeVar("T")
+
+
+async def gather_bounded(
+    factories: Sequence[Callable[[], Awaitable[T]]],
+    limit: int,
+    timeout: Optional[float] = None,
+) -> List[Optional[T]]:
+    """
+    Runs the awaitables produced by the given factories concurrently, with at most `limit` in flight.
+
+    Args:
+        factories (Sequence[Callable]): Zero-argument callables returning the awaitable to run. The awaitable is only
+            created once a slot is free, so queued calls do not start their timeout early.
+        limit (int): Maximum number of awaitables running at the same time.
+        timeout (Optional[float]): Per-call timeout in seconds. A call that times out resolves to None.
+
+    Returns:
+        list: The results in the same order as the factories, regardless of completion order.
+    """
+    semaphore = asyncio.Semaphore(max(limit, 1))
+    return list(
+        await asyncio.gather(
+            *(_run_bounded(semaphore, index, factory, timeout) for index, factory in enumerate(factories))
+        )
+    )
+
+
+async def as_completed_bounded(
+    factories: Sequence[Callable[[], Awaitable[T]]],
+    limit: int,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[Tuple[int, Optional[T]]]:
+    """
+    Same as gather_bounded, but yields (index, result) as soon as each call finishes instead of waiting for all of
+    them. Calls still running when the iteration is stopped are cancelled.
+    """
+    semaphore = asyncio.Semaphore(max(limit, 1))
+
+    async def run(index: int, factory: Callable[[], Awaitable[T]]) -> Tuple[int, Optional[T]]:
+        return index, await _run_bounded(semaphore, index, factory, timeout)
+
+    tasks = [asyncio.ensure_future(run(index, factory)) for index, factory in enumerate(factories)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _run_bounded(
+    semaphore: asyncio.Semaphore,
+    index: int,
+    factory: Callable[[], Awaitable[T]],
+    timeout: Optional[float],
+) -> Optional[T]:
+    async with semaphore:
+        if timeout is None:
+            return await factory()
+        try:
+            return await asyncio.wait_for(factory(), timeout)
+        except asyncio.TimeoutError:
+            log_warning("Bounded call timed out.", index=index, timeout=timeout)
+            return None
@@ -0,0 +1,73 @@
+import argparse
+import re
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import List
+
+# import time:       123 |        456 |   package.module
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+@dataclass
+class ModuleImportTime:
+    module: str
+    self_us: int
+    cumulative_us: int
+    # Nesting level in the import tree, 0 for modules imported by the measured import itself.
+    depth: int
+
+
+class ImportFailed(Exception):
+    pass
+
+
+def parse_import_times(output: str) -> List[ModuleImportTime]:
+    """
+    Parses the stderr of `python -X importtime`, in the order the imports finished.
+    """
+    times = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            times.append(ModuleImportTime(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return times
+
+
+def measure_import(module: str = "app.main") -> List[ModuleImportTime]:
+    """
+    Imports the module in a fresh interpreter, so modules already imported by the caller do not hide their cost.
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True
+    )
+    if process.returncode != 0:
+        raise ImportFailed(process.stderr.strip().splitlines()[-1] if process.stderr.strip() else module)
+    return parse_import_times(process.stderr)
+
+
+def total_import_us(times: List[ModuleImportTime], module: str) -> int:
+    """
+    Cumulative import time of the module and everything it imported, without the interpreter's own startup imports.
+    """
+    return next((entry.cumulative_us for entry in times if entry.depth == 0 and entry.module == module), 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reports the slowest imports of a module.")
+    parser.add_argument("module", nargs="?", default="app.main")
+    parser.add_argument("--top", type=int, default=25, help="Number of modules to list.")
+    parser.add_argument("--self", action="store_true", help="Sort by own time instead of including submodules.")
+    args = parser.parse_args()
+
+    times = measure_import(args.module)
+    key = (lambda entry: entry.self_us) if args.self else (lambda entry: entry.cumulative_us)
+    print(f"import {args.module}: {total_import_us(times, args.module) / 1000:.1f} ms")
+    print(f"{'self ms':>10} {'cumulative ms':>14}  module")
+    for entry in sorted(times, key=key, reverse=True)[: args.top]:
+        print(f"{entry.self_us / 1000:>10.1f} {entry.cumulative_us / 1000:>14.1f}  {entry.module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import datetime
+import json
+from decimal import Decimal
+from typing import Any, Union
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Optional, see the speedups extra.
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # What orjson serializes natively and the stdlib does not.
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Compact UTF-8 JSON. Uses orjson when it is installed, which is several times faster on the large order payloads.
+    """
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class CodecJSONResponse(JSONResponse):
+    """
+    Default response class of the app, renders with the codec above instead of the stdlib json.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
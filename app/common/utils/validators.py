@@ -5,6 +5,13 @@ from boltons.iterutils import remap
 from app.common.exceptions.exceptions import ValidationError
 
 
+def is_valid_email(email: str) -> bool:
+    # validators takes close to 100ms to import, only requests taking an email need it.
+    import validators
+
+    return bool(validators.email(email))
+
+
 def remove_none_values(d: Union[dict, list], ignore_keys: set = None) -> dict:
     """
     Return Dict that has the none values removed except ignoring certain keys.
@@ -0,0 +1,41 @@
+import hashlib
+import os
+from typing import Optional
+
+from google.cloud.firestore import AsyncClient
+
+# Firestore caps the number of values in an `in` filter.
+FIRESTORE_IN_QUERY_MAX_VALUES = 10
+FIRESTORE_BATCH_MAX_WRITES = 500
+
+_async_client: Optional[AsyncClient] = None
+
+
+def natural_key_id(*parts: str) -> str:
+    """
+    Document id derived from the natural key of a document, e.g. the email of an otp. Hashed because natural keys
+    may contain "/" and to keep ids of a fixed length.
+    """
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+def async_client() -> AsyncClient:
+    """
+    Process wide Firestore AsyncClient. Uses the same service account file as the fireo connection, or the local
+    emulator when FIRESTORE_EMULATOR_HOST is set.
+    """
+    global _async_client
+    if _async_client is None:
+        credentials_file = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+        if credentials_file and not os.getenv("FIRESTORE_EMULATOR_HOST"):
+            _async_client = AsyncClient.from_service_account_json(credentials_file)
+        else:
+            _async_client = AsyncClient(project=os.getenv("GOOGLE_CLOUD_PROJECT"))
+    return _async_client
+
+
+def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        _async_client.close()
+        _async_client = None
@@ -1,13 +1,22 @@
-from typing import Union
+from typing import Optional
 
 from fireo.models import Model
 from fireo.fields import TextField, IDField, MapField
 
+from app.common.cache.loading_cache import AsyncLoadingCache
+from app.db.repository import AsyncRepository
+from app.environment import env
 from app.model.merchant import CreateMerchantRequest, RetrieveMerchantResponse
 
 
 COLLECTION_NAME = "merchant"
 
+# Merchant configuration changes a few times a month but is read on nearly every request.
+# The cache is per process, other workers pick up a change once their entry expires.
+merchant_cache: AsyncLoadingCache[RetrieveMerchantResponse] = AsyncLoadingCache(
+    ttl=env.MERCHANT_CACHE_TTL_SECONDS
+)
+
 
 class DBMerchant(Model):
     id = IDField()
@@ -69,18 +78,42 @@ class DBMerchant(Model):
         collection_name = COLLECTION_NAME
 
 
-def create(req_obj: CreateMerchantRequest):
-    merchant = DBMerchant.from_dict(req_obj.dict())
-    merchant.save()
+async def retrieve_cached_by_store_url(
+    store_url: str,
+) -> Optional[RetrieveMerchantResponse]:
+    """
+    Cached version of MerchantRepository.retrieve_by_store_url. The returned object is shared between
+    requests and must not be modified.
+    """
+    return await merchant_cache.get(
+        store_url, lambda: merchant_repository.retrieve_by_store_url(store_url)
+    )
+
+
+def invalidate_cached_store_url(store_url: str):
+    """
+    Must be called whenever the configuration of a merchant is updated.
+    """
+    merchant_cache.invalidate(store_url)
+
+
+class MerchantRepository(AsyncRepository[DBMerchant]):
+    key_fields = ("store_url",)
+
+    async def get_by_store_url(self, store_url: str) -> Optional[DBMerchant]:
+        return await self.find_by_key(store_url)
+
+    async def retrieve_by_store_url(
+        self, store_url: str
+    ) -> Optional[RetrieveMerchantResponse]:
+        merchant_db_obj = await self.get_by_store_url(store_url)
+        if merchant_db_obj is None:
+            return None
+        return RetrieveMerchantResponse(**merchant_db_obj.to_dict())
 
+    async def create(self, req_obj: CreateMerchantRequest):
+        await self.save(DBMerchant.from_dict(req_obj.dict()))
+        invalidate_cached_store_url(req_obj.store_url)
 
-def retrieve_by_store_url(
-    store_url: str, return_db_object: bool = False
-) -> Union[RetrieveMerchantResponse, DBMerchant, None]:
-    merchant_db_obj = DBMerchant.collection.filter("store_url", "==", store_url).get()
-    if merchant_db_obj is None:
-        return None
-    if return_db_object:
-        return merchant_db_obj
 
-    return RetrieveMerchantResponse(**merchant_db_obj.to_dict())
+merchant_repository = MerchantRepository(DBMerchant)
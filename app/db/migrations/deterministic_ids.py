@@ -0,0 +1,118 @@
+"""
+Moves the documents written before ids were derived from their natural key (see AsyncRepository.key_fields) to that
+id, so they are found by a single document read.
+
+    python -m app.db.migrations.deterministic_ids [--dry-run] [--collection otp]
+
+Safe to re-run and to run while the app serves traffic: documents already under their natural key id are skipped,
+and a document is moved in a transaction that also deletes the old one. When two documents share a natural key the
+most recently updated one is kept. Set FIRESTORE_LEGACY_KEY_LOOKUPS=false once every collection is migrated.
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass
+from typing import List, Optional
+
+from google.cloud.firestore import AsyncDocumentReference, AsyncTransaction, async_transactional
+
+from app.common.logger.log import log_info, log_warning
+from app.db.merchant import merchant_repository
+from app.db.order import order_repository
+from app.db.otp import otp_repository
+from app.db.repository import AsyncRepository
+from app.db.ship24_batch import ship24_tracker_repository
+from app.db.tracking_result import tracking_result_repository
+from app.db.user import user_repository
+
+REPOSITORIES: List[AsyncRepository] = [
+    user_repository,
+    otp_repository,
+    merchant_repository,
+    order_repository,
+    ship24_tracker_repository,
+    tracking_result_repository,
+]
+
+
+@dataclass
+class MigrationResult:
+    collection: str
+    moved: int = 0
+    dropped: int = 0
+    skipped: int = 0
+    invalid: int = 0
+
+
+def _last_written(data: dict):
+    return data.get("updated_at") or data.get("created_at")
+
+
+@async_transactional
+async def _move(
+    transaction: AsyncTransaction, source: AsyncDocumentReference, target: AsyncDocumentReference
+) -> Optional[bool]:
+    """
+    Returns:
+        bool: True when the document was moved, False when a newer document already had its id and the old one was
+            only deleted. None when the source is gone, another run moved it.
+    """
+    source_snapshot = await source.get(transaction=transaction)
+    if not source_snapshot.exists:
+        return None
+    target_snapshot = await target.get(transaction=transaction)
+    data = source_snapshot.to_dict()
+    if target_snapshot.exists:
+        kept_at, moved_at = _last_written(target_snapshot.to_dict()), _last_written(data)
+        if not kept_at or not moved_at or kept_at >= moved_at:
+            transaction.delete(source)
+            return False
+    transaction.set(target, data)
+    transaction.delete(source)
+    return True
+
+
+async def migrate(repository: AsyncRepository, dry_run: bool = False) -> MigrationResult:
+    result = MigrationResult(collection=repository.model.collection_name)
+    async for snapshot in repository.collection.stream():
+        data = snapshot.to_dict()
+        key = tuple(data.get(field) for field in repository.key_fields)
+        if any(not value for value in key):
+            log_warning(
+                "Document without a natural key, left in place.",
+                collection=result.collection,
+                document_id=snapshot.id,
+            )
+            result.invalid += 1
+            continue
+        target_id = repository.id_for(*key)
+        if snapshot.id == target_id:
+            result.skipped += 1
+            continue
+        if dry_run:
+            result.moved += 1
+            continue
+
+        moved = await _move(
+            repository._client().transaction(), snapshot.reference, repository.collection.document(target_id)
+        )
+        if moved:
+            result.moved += 1
+        elif moved is False:
+            result.dropped += 1
+    return result
+
+
+async def main(dry_run: bool, collections: Optional[List[str]] = None):
+    for repository in REPOSITORIES:
+        if collections and repository.model.collection_name not in collections:
+            continue
+        result = await migrate(repository, dry_run)
+        log_info("Migrated to natural key document ids.", dry_run=dry_run, **result.__dict__)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Only count the documents that would be moved.")
+    parser.add_argument("--collection", action="append", help="Limit the migration to this collection.")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run, args.collection))
@@ -1,11 +1,10 @@
-from asyncio import Task
-
-from typing import Coroutine
+from typing import Dict, List, Optional
 
 from fireo.fields import TextField, IDField, DateTime, MapField
-import asyncio
 from fireo.models import Model
 
+from app.db.repository import AsyncRepository
+
 
 class DBOrder(Model):
     id = IDField()
@@ -19,20 +18,19 @@ class DBOrder(Model):
         collection_name = "order"
 
 
-class OrderModelContext:
-    @staticmethod
-    async def get_order_by_id(order_id: str) -> DBOrder:
-        return await asyncio.to_thread(OrderModelContext._get_order_by_id, order_id)
-
-    @staticmethod
-    def _get_order_by_id(order_id: str) -> DBOrder:
-        return DBOrder.collection.filter("order_id", "==", order_id).get()
+class OrderRepository(AsyncRepository[DBOrder]):
+    key_fields = ("order_id",)
 
+    async def get_by_order_id(self, order_id: str) -> Optional[DBOrder]:
+        return await self.find_by_key(order_id)
 
-def get_by_order_id(order_id: str) -> DBOrder:
-    order = DBOrder.collection.filter("order_id", "==", order_id).get()
-    return order
+    async def get_by_order_ids(self, order_ids: List[str]) -> Dict[str, DBOrder]:
+        """
+        Loads the orders of all given ids, keyed by order_id. Ids without a stored
+        order are missing from the result.
+        """
+        orders = await self.find_many_by_key([(order_id,) for order_id in order_ids])
+        return {order_id: order for (order_id,), order in orders.items()}
 
 
-def delete_order(order: DBOrder):
-    DBOrder.collection.delete(order.key)
+order_repository = OrderRepository(DBOrder)
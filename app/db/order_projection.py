@@ -0,0 +1,180 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from fireo.fields import DateTime, IDField, ListField, MapField, TextField
+from fireo.models import Model
+
+from app.db.firestore import FIRESTORE_IN_QUERY_MAX_VALUES
+
+
+def gid_to_id(gid: str) -> str:
+    # gid://shopify/Order/1 -> 1
+    return gid.rsplit("/", 1)[-1]
+
+
+class OrderProjectionModel(Model):
+    """
+    Latest GetOrderById payload of an order, kept current by the Shopify order and fulfillment webhooks.
+    """
+
+    id = IDField()
+    order_id = TextField()
+    shop_url = TextField()
+    customer_id = TextField()
+    shopify_updated_at = TextField()
+    order = MapField()
+    synced_at = DateTime()
+
+    class Meta:
+        collection_name = "order_projection"
+
+
+class CustomerOrderIndexModel(Model):
+    """
+    Ids and GraphQL cursors of all orders of a customer, newest first, as of the last complete GraphQL read of their
+    order list.
+    """
+
+    id = IDField()
+    customer_id = TextField()
+    shop_url = TextField()
+    # id, firstName and lastName, as returned next to the orders.
+    customer = MapField()
+    order_ids = ListField()
+    # Cursor of each order in order_ids, as returned by the orders connection.
+    cursors = ListField()
+    synced_at = DateTime()
+
+    class Meta:
+        collection_name = "customer_order_index"
+
+
+def _is_fresh(synced_at: Optional[datetime], max_age: timedelta) -> bool:
+    if synced_at is None:
+        return False
+    synced_at = synced_at if synced_at.tzinfo else synced_at.replace(tzinfo=timezone.utc)
+    return datetime.now(timezone.utc) - synced_at < max_age
+
+
+def _is_servable(model: Optional[OrderProjectionModel], shop_url: str, max_age: timedelta) -> bool:
+    # Projections are keyed by order id only, one of another shop must never be served.
+    return (
+        model is not None and model.shop_url == shop_url and bool(model.order) and _is_fresh(model.synced_at, max_age)
+    )
+
+
+class OrderProjectionModelContext:
+    @staticmethod
+    async def get_order(shop_url: str, order_id: str, max_age: timedelta) -> Optional[dict]:
+        return await asyncio.to_thread(OrderProjectionModelContext._get_order, shop_url, order_id, max_age)
+
+    @staticmethod
+    def _get_order(shop_url: str, order_id: str, max_age: timedelta) -> Optional[dict]:
+        model = OrderProjectionModel.collection.get(f"{OrderProjectionModel.collection_name}/{order_id}")
+        if not _is_servable(model, shop_url, max_age):
+            return None
+        return model.order
+
+    @staticmethod
+    async def get_customer_orders(
+        shop_url: str, customer_id: str, max_age: timedelta
+    ) -> Optional[Tuple[dict, List[Tuple[str, dict]]]]:
+        return await asyncio.to_thread(OrderProjectionModelContext._get_customer_orders, shop_url, customer_id, max_age)
+
+    @staticmethod
+    def _get_customer_orders(
+        shop_url: str, customer_id: str, max_age: timedelta
+    ) -> Optional[Tuple[dict, List[Tuple[str, dict]]]]:
+        """
+        Returns the customer and the (cursor, order) of their orders newest first, or None unless the customer's order
+        list and every order in it are fresh and belong to the shop.
+        """
+        index = CustomerOrderIndexModel.collection.get(
+            f"{CustomerOrderIndexModel.collection_name}/{gid_to_id(customer_id)}"
+        )
+        if index is None or index.shop_url != shop_url or not _is_fresh(index.synced_at, max_age):
+            return None
+        order_ids = list(index.order_ids or [])
+        cursors = list(index.cursors or [])
+        if len(cursors) != len(order_ids):
+            return None
+        projections: Dict[str, OrderProjectionModel] = {}
+        for start in range(0, len(order_ids), FIRESTORE_IN_QUERY_MAX_VALUES):
+            chunk = order_ids[start : start + FIRESTORE_IN_QUERY_MAX_VALUES]
+            for model in OrderProjectionModel.collection.filter("order_id", "in", chunk).fetch():
+                projections[model.order_id] = model
+        orders = []
+        for order_id, cursor in zip(order_ids, cursors):
+            model = projections.get(order_id)
+            if not _is_servable(model, shop_url, max_age):
+                return None
+            orders.append((cursor, model.order))
+        return index.customer, orders
+
+    @staticmethod
+    async def upsert_order(shop_url: str, order: dict):
+        await asyncio.to_thread(OrderProjectionModelContext._upsert_order, shop_url, order)
+
+    @staticmethod
+    def _upsert_order(shop_url: str, order: dict):
+        order_id = gid_to_id(order["id"])
+        customer_id = (order.get("customer") or {}).get("id")
+        OrderProjectionModel.from_dict(
+            {
+                "id": order_id,
+                "order_id": order_id,
+                "shop_url": shop_url,
+                "customer_id": customer_id,
+                "shopify_updated_at": order.get("updatedAt"),
+                "order": order,
+                "synced_at": datetime.now(timezone.utc),
+            }
+        ).save()
+
+        if not customer_id:
+            return
+        # The cursor of a new order is only known from a GraphQL read, the customer's list is indexed again by the
+        # next one.
+        index = CustomerOrderIndexModel.collection.get(
+            f"{CustomerOrderIndexModel.collection_name}/{gid_to_id(customer_id)}"
+        )
+        if index is not None and index.shop_url == shop_url and order_id not in (index.order_ids or []):
+            CustomerOrderIndexModel.collection.delete(index.key)
+
+    @staticmethod
+    async def invalidate_order(order_id: str):
+        await asyncio.to_thread(OrderProjectionModelContext._invalidate_order, order_id)
+
+    @staticmethod
+    def _invalidate_order(order_id: str):
+        OrderProjectionModel.collection.delete(f"{OrderProjectionModel.collection_name}/{order_id}")
+
+    @staticmethod
+    async def get_shopify_updated_at(shop_url: str, order_id: str) -> Optional[str]:
+        return await asyncio.to_thread(OrderProjectionModelContext._get_shopify_updated_at, shop_url, order_id)
+
+    @staticmethod
+    def _get_shopify_updated_at(shop_url: str, order_id: str) -> Optional[str]:
+        model = OrderProjectionModel.collection.get(f"{OrderProjectionModel.collection_name}/{order_id}")
+        return model.shopify_updated_at if model and model.shop_url == shop_url else None
+
+    @staticmethod
+    async def set_customer_order_ids(shop_url: str, customer: dict, order_ids: List[str], cursors: List[str]):
+        await asyncio.to_thread(
+            OrderProjectionModelContext._set_customer_order_ids, shop_url, customer, order_ids, cursors
+        )
+
+    @staticmethod
+    def _set_customer_order_ids(shop_url: str, customer: dict, order_ids: List[str], cursors: List[str]):
+        CustomerOrderIndexModel.from_dict(
+            {
+                "id": gid_to_id(customer["id"]),
+                "customer_id": customer["id"],
+                "shop_url": shop_url,
+                "customer": {key: customer.get(key) for key in ("id", "firstName", "lastName")},
+                "order_ids": order_ids,
+                "cursors": cursors,
+                "synced_at": datetime.now(timezone.utc),
+            }
+        ).save()
@@ -4,8 +4,18 @@ import pytz
 
 from asyncio.log import logger
 from datetime import datetime
+from typing import Optional
+
 from fireo.fields import IDField, TextField, DateTime, NumberField
 from fireo.models import Model
+from google.cloud.firestore import (
+    AsyncDocumentReference,
+    AsyncTransaction,
+    async_transactional,
+)
+
+from app.db.repository import AsyncRepository
+from app.environment import env
 
 MAX_TRY_COUNT = 3
 
@@ -23,35 +33,58 @@ class DBOtp(Model):
         collection_name = "otp"
 
 
-def update(email: str, otp: DBOtp):
-    otp.update(email)
-
-
-def get_by_email(email: str) -> DBOtp:
-    otp = DBOtp.collection.filter("email", "==", email).get()
-    return otp
-
-
 def get_random_otp(k=4) -> str:
     return "".join(random.choices(string.digits, k=k))
 
 
-def verify(email, code) -> bool:
-
-    try:
-        otp = get_by_email(email)
+@async_transactional
+async def _verify_in_transaction(
+    transaction: AsyncTransaction, reference: AsyncDocumentReference, code: str
+) -> Optional[bool]:
+    # The read and the delete or try_count update commit together, two concurrent
+    # attempts can not both use the last try. None when there is no otp.
+    snapshot = await reference.get(transaction=transaction)
+    if not snapshot.exists:
+        return None
+    otp = snapshot.to_dict()
+    if otp.get("code") == code or otp.get("try_count", 0) >= MAX_TRY_COUNT:
+        transaction.delete(reference)
+        return otp.get("code") == code
+    transaction.update(
+        reference,
+        {
+            "try_count": otp.get("try_count", 0) + 1,
+            "updated_at": datetime.now(pytz.timezone("UTC")),
+        },
+    )
+    return False
+
+
+class OtpRepository(AsyncRepository[DBOtp]):
+    key_fields = ("email",)
+
+    async def get_by_email(self, email: str) -> Optional[DBOtp]:
+        return await self.find_by_key(email)
+
+    async def verify(self, email: str, code: str) -> bool:
+        try:
+            verified = await _verify_in_transaction(
+                self._client().transaction(),
+                self.collection.document(self.id_for(email)),
+                code,
+            )
+            if verified is None and env.FIRESTORE_LEGACY_KEY_LOOKUPS:
+                legacy = await self.find_one("email", email)
+                if legacy is not None:
+                    verified = await _verify_in_transaction(
+                        self._client().transaction(),
+                        self.collection.document(legacy.id),
+                        code,
+                    )
+            return bool(verified)
+        except Exception as e:
+            logger.error(e)
+            return False
 
-        if otp.code == code:
-            DBOtp.collection.delete(otp.key)
-            return True
 
-        if otp.try_count >= MAX_TRY_COUNT:
-            DBOtp.collection.delete(otp.key)
-            return False
-        otp.try_count += 1
-        otp.updated_at = datetime.now(pytz.timezone("UTC"))
-        otp.update()
-        return False
-    except Exception as e:
-        logger.error(e)
-        return False
+otp_repository = OtpRepository(DBOtp)
@@ -0,0 +1,185 @@
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, Type, TypeVar, Union
+
+from fireo.fields import IDField
+from fireo.models import Model
+from fireo.queries.query_wrapper import ModelWrapper
+from google.api_core.exceptions import ResourceExhausted, RetryError, ServerError
+from google.cloud.firestore import AsyncClient, AsyncCollectionReference, AsyncQuery
+
+from app.common.utils.circuit_breaker import circuit_breaker
+from app.db.firestore import (
+    FIRESTORE_BATCH_MAX_WRITES,
+    FIRESTORE_IN_QUERY_MAX_VALUES,
+    async_client,
+    natural_key_id,
+)
+from app.environment import env
+
+M = TypeVar("M", bound=Model)
+
+# Shared by every repository. Only errors of Firestore itself count, e.g. updating a missing document does not.
+firestore_circuit_breaker = circuit_breaker(
+    "firestore",
+    slow_call_seconds=2.0,
+    failure_if=lambda e: isinstance(e, (ServerError, ResourceExhausted, RetryError)),
+)
+
+
+def to_document(model: Model) -> dict:
+    """
+    The document fireo would write for the model: values by column name, with field defaults and auto timestamps
+    applied and None values left out unless the model keeps them.
+    """
+    document = {}
+    for field in model._meta.field_list.values():
+        if isinstance(field, IDField):
+            continue
+        value = field.get_value(getattr(model, field.name))
+        if value is not None or not model._meta.ignore_none_field:
+            document[field.db_column_name] = value
+    return document
+
+
+class AsyncRepository(Generic[M]):
+    """
+    Non-blocking access to the documents of one fireo model through Firestore's native AsyncClient.
+
+    Documents are still read into and written from the fireo model, so field definitions, defaults and auto
+    timestamps stay in one place and the synchronous fireo code keeps working on the same collections.
+
+    Repositories with key_fields store new documents under an id derived from those fields, so a lookup by natural
+    key is a single document read instead of a query.
+    """
+
+    # Fields whose values make up the document id, see natural_key_id. Empty for random ids.
+    key_fields: Tuple[str, ...] = ()
+
+    def __init__(self, model: Type[M], client: Callable[[], AsyncClient] = async_client):
+        self.model = model
+        self._client = client
+
+    @property
+    def collection(self) -> AsyncCollectionReference:
+        return self._client().collection(self.model.collection_name)
+
+    def id_for(self, *values: str) -> str:
+        return natural_key_id(*values)
+
+    def key_of(self, model: M) -> Tuple[str, ...]:
+        return tuple(getattr(model, field) for field in self.key_fields)
+
+    def document_id(self, model: M) -> str:
+        # Loaded models keep the id they were stored under, legacy documents included.
+        if model.id:
+            return model.id
+        if self.key_fields:
+            return self.id_for(*self.key_of(model))
+        return self.collection.document().id
+
+    def to_model(self, snapshot) -> Optional[M]:
+        if snapshot is None or not snapshot.exists:
+            return None
+        # The same conversion fireo applies to the documents it reads itself.
+        return ModelWrapper.from_query_result(self.model(), snapshot)
+
+    @firestore_circuit_breaker
+    async def get(self, doc_id: str) -> Optional[M]:
+        return self.to_model(await self.collection.document(doc_id).get())
+
+    @firestore_circuit_breaker
+    async def get_many(self, doc_ids: List[str]) -> Dict[str, M]:
+        """
+        Reads the given documents in one batched get, keyed by document id. Missing documents are left out.
+        """
+        found = {}
+        references = [self.collection.document(doc_id) for doc_id in dict.fromkeys(doc_ids)]
+        if not references:
+            return found
+        async for snapshot in self._client().get_all(references):
+            model = self.to_model(snapshot)
+            if model is not None:
+                found[snapshot.id] = model
+        return found
+
+    async def find_by_key(self, *values: str) -> Optional[M]:
+        model = await self.get(self.id_for(*values))
+        if model is None and env.FIRESTORE_LEGACY_KEY_LOOKUPS:
+            model = await self._first(self._key_query(values))
+        return model
+
+    async def find_many_by_key(self, keys: List[Tuple[str, ...]]) -> Dict[Tuple[str, ...], M]:
+        """
+        Point reads for every natural key. Legacy documents are looked up with chunked `in` queries on the last key
+        field, which should be the most selective one.
+        """
+        ids = {self.id_for(*key): key for key in dict.fromkeys(keys)}
+        found = {ids[doc_id]: model for doc_id, model in (await self.get_many(list(ids))).items()}
+        missing = [key for key in ids.values() if key not in found]
+        if missing and env.FIRESTORE_LEGACY_KEY_LOOKUPS:
+            wanted = set(missing)
+            for model in await self.find_in(self.key_fields[-1], [key[-1] for key in missing]):
+                key = self.key_of(model)
+                if key in wanted:
+                    found.setdefault(key, model)
+        return found
+
+    def _key_query(self, values: Tuple[str, ...]) -> AsyncQuery:
+        query = self.collection
+        for field, value in zip(self.key_fields, values):
+            query = query.where(field, "==", value)
+        return query
+
+    @firestore_circuit_breaker
+    async def _first(self, query: AsyncQuery) -> Optional[M]:
+        async for snapshot in query.limit(1).stream():
+            return self.to_model(snapshot)
+        return None
+
+    async def find_one(self, field: str, value: Any) -> Optional[M]:
+        return await self._first(self.collection.where(field, "==", value))
+
+    @firestore_circuit_breaker
+    async def find_in(self, field: str, values: List[Any]) -> List[M]:
+        """
+        Loads every document whose `field` is one of `values`, with chunked `in` queries.
+        """
+        values = list(dict.fromkeys(values))
+        models = []
+        for start in range(0, len(values), FIRESTORE_IN_QUERY_MAX_VALUES):
+            chunk = values[start : start + FIRESTORE_IN_QUERY_MAX_VALUES]
+            async for snapshot in self.collection.where(field, "in", chunk).stream():
+                models.append(self.to_model(snapshot))
+        return models
+
+    @firestore_circuit_breaker
+    async def save(self, model: M) -> M:
+        """
+        Writes the whole document, creating it when it does not exist.
+        """
+        model.id = self.document_id(model)
+        await self.collection.document(model.id).set(to_document(model))
+        return model
+
+    @firestore_circuit_breaker
+    async def save_many(self, models: List[M]):
+        for start in range(0, len(models), FIRESTORE_BATCH_MAX_WRITES):
+            batch = self._client().batch()
+            for model in models[start : start + FIRESTORE_BATCH_MAX_WRITES]:
+                model.id = self.document_id(model)
+                batch.set(self.collection.document(model.id), to_document(model))
+            await batch.commit()
+
+    @firestore_circuit_breaker
+    async def update(self, model: M, fields: Dict[str, Any]) -> M:
+        """
+        Writes only the given fields and applies them to the model.
+        """
+        for name, value in fields.items():
+            setattr(model, name, value)
+        await self.collection.document(self.document_id(model)).update(fields)
+        return model
+
+    @firestore_circuit_breaker
+    async def delete(self, model: Union[M, str]):
+        doc_id = model if isinstance(model, str) else self.document_id(model)
+        await self.collection.document(doc_id).delete()
@@ -0,0 +1,47 @@
+from typing import Dict, List, Optional, Tuple
+
+from app.db.repository import AsyncRepository
+from app.db.ship24 import Ship24Model
+
+
+class Ship24TrackerRepository(AsyncRepository[Ship24Model]):
+    """
+    Cache of the Ship24 tracker id of every (courier, tracking number), it halves the Ship24 calls of a lookup.
+    """
+
+    key_fields = ("courier", "tracking_number")
+
+    async def get_by_courier_and_tracking_number(self, courier: str, tracking_number: str) -> Optional[Ship24Model]:
+        return await self.find_by_key(courier, tracking_number)
+
+    async def get_by_courier_and_tracking_numbers(
+        self, keys: List[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], Ship24Model]:
+        return await self.find_many_by_key(keys)
+
+    async def get_by_tracker_ids(self, tracker_ids: List[str]) -> Dict[str, Ship24Model]:
+        return {model.ship24_tracker_id: model for model in await self.find_in("ship24_tracker_id", tracker_ids)}
+
+    async def insert(self, courier: str, tracking_number: str, ship24_tracker_id: str):
+        await self.insert_many([(courier, tracking_number, ship24_tracker_id)])
+
+    async def insert_many(self, records: List[Tuple[str, str, str]]):
+        """
+        Args:
+            records (list): (courier, tracking_number, ship24_tracker_id) tuples, written in batches.
+        """
+        await self.save_many(
+            [
+                Ship24Model.from_dict(
+                    {
+                        "courier": courier,
+                        "tracking_number": tracking_number,
+                        "ship24_tracker_id": ship24_tracker_id,
+                    }
+                )
+                for courier, tracking_number, ship24_tracker_id in records
+            ]
+        )
+
+
+ship24_tracker_repository = Ship24TrackerRepository(Ship24Model)
@@ -0,0 +1,42 @@
+import asyncio
+
+from fireo.fields import DateTime, IDField, TextField
+from fireo.models import Model
+
+
+class ShopifyWebhookEventModel(Model):
+    """
+    Shopify webhook deliveries already processed, keyed by X-Shopify-Webhook-Id.
+    """
+
+    id = IDField()
+    topic = TextField()
+    shop_url = TextField()
+    created_at = DateTime(auto=True)
+
+    class Meta:
+        collection_name = "shopify_webhook_event"
+
+
+class ShopifyWebhookEventModelContext:
+    @staticmethod
+    async def is_registered(webhook_id: str) -> bool:
+        return await asyncio.to_thread(ShopifyWebhookEventModelContext._is_registered, webhook_id)
+
+    @staticmethod
+    def _is_registered(webhook_id: str) -> bool:
+        return (
+            ShopifyWebhookEventModel.collection.get(f"{ShopifyWebhookEventModel.collection_name}/{webhook_id}")
+            is not None
+        )
+
+    @staticmethod
+    async def register(webhook_id: str, topic: str, shop_url: str):
+        await asyncio.to_thread(ShopifyWebhookEventModelContext._register, webhook_id, topic, shop_url)
+
+    @staticmethod
+    def _register(webhook_id: str, topic: str, shop_url: str):
+        """
+        Records the delivery once it is processed, Shopify delivers at least once.
+        """
+        ShopifyWebhookEventModel.from_dict({"id": webhook_id, "topic": topic, "shop_url": shop_url}).save()
@@ -0,0 +1,65 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fireo.fields import DateTime, IDField, MapField, TextField
+from fireo.models import Model
+
+from app.db.repository import AsyncRepository
+
+
+class TrackingResultModel(Model):
+    """
+    Latest normalised Ship24 tracking result per courier and tracking number, see TrackingDetails.
+    """
+
+    id = IDField()
+    tracking_number = TextField()
+    courier = TextField()
+    status_milestone = TextField()
+    details = MapField()
+    expires_at = DateTime()
+    created_at = DateTime(auto=True)
+    updated_at = DateTime(auto=True)
+
+    class Meta:
+        collection_name = "tracking_result"
+
+
+class TrackingResultRepository(AsyncRepository[TrackingResultModel]):
+    key_fields = ("courier", "tracking_number")
+
+    async def get_by_courier_and_tracking_number(
+        self, courier: str, tracking_number: str
+    ) -> Optional[TrackingResultModel]:
+        return await self.find_by_key(courier, tracking_number)
+
+    async def get_by_courier_and_tracking_numbers(
+        self, keys: List[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], TrackingResultModel]:
+        return await self.find_many_by_key(keys)
+
+    async def upsert_many(self, results: List[Tuple[str, str, dict, datetime]]):
+        """
+        Overwrites the stored result of every (courier, tracking number) in batched writes. Documents are keyed by
+        both, so there is no read before the write and concurrent writers cannot create duplicates, the last one wins.
+
+        Args:
+            results (list): (courier, tracking_number, details, expires_at) tuples.
+        """
+        await self.save_many(
+            [
+                TrackingResultModel.from_dict(
+                    {
+                        "tracking_number": tracking_number,
+                        "courier": courier,
+                        "status_milestone": details.get("status_milestone"),
+                        "details": details,
+                        "expires_at": expires_at,
+                    }
+                )
+                for courier, tracking_number, details, expires_at in results
+            ]
+        )
+
+
+tracking_result_repository = TrackingResultRepository(TrackingResultModel)
@@ -1,6 +1,10 @@
+from typing import Optional
+
 from fireo.models import Model
 from fireo.fields import TextField, IDField, DateTime
 
+from app.db.repository import AsyncRepository
+
 
 class DBUser(Model):
     id = IDField()
@@ -15,18 +19,19 @@ class DBUser(Model):
         collection_name = "user"
 
 
-def get_by_shopify_customer_id(shopify_customer_id: str) -> DBUser:
-    user = DBUser.collection.filter(
-        "shopify_customer_id", "==", shopify_customer_id
-    ).get()
-    return user
+class UserRepository(AsyncRepository[DBUser]):
+    key_fields = ("email",)
+
+    async def get_by_shopify_customer_id(
+        self, shopify_customer_id: str
+    ) -> Optional[DBUser]:
+        return await self.find_one("shopify_customer_id", shopify_customer_id)
 
+    async def get_by_email(self, email: str) -> Optional[DBUser]:
+        return await self.find_by_key(email)
 
-def get_by_email(email: str) -> DBUser:
-    user = DBUser.collection.filter("email", "==", email).get()
-    return user
+    async def get_by_user_id(self, user_id: str) -> Optional[DBUser]:
+        return await self.find_one("user_id", user_id)
 
 
-def get_by_user_id(user_id: str) -> DBUser:
-    user = DBUser.collection.filter("user_id", "==", user_id).get()
-    return user
+user_repository = UserRepository(DBUser)
@@ -23,6 +23,20 @@ class EnvironmentVariables:
     SECRET_MANAGER_PROJECT_ID: str
     SECRET_MANAGER_SECRET_ID: str
     SECRET_MANAGER_VERSION_ID: str
+    TRACKING_CONCURRENCY_LIMIT: int
+    TRACKING_TIMEOUT_SECONDS: float
+    MERCHANT_CACHE_TTL_SECONDS: float
+    CUSTOMER_CACHE_TTL_SECONDS: float
+    ORDER_PROJECTION_MAX_AGE_SECONDS: float
+    SHOPIFY_WEBHOOK_CALLBACK_URL: str
+    FIRESTORE_LEGACY_KEY_LOOKUPS: bool
+    SECRETS_SNAPSHOT_PATH: str
+    SECRETS_SNAPSHOT_MAX_AGE_SECONDS: float
+    CIRCUIT_BREAKER_FAILURE_RATE: float
+    CIRCUIT_BREAKER_SLOW_CALL_RATE: float
+    CIRCUIT_BREAKER_MINIMUM_CALLS: int
+    CIRCUIT_BREAKER_OPEN_SECONDS: float
+    RESPONSE_COMPRESSION_MINIMUM_SIZE: int
 
     def __init__(self):
         self.SUPPORT_EMAIL = os.environ.get("SUPPORT_EMAIL")
@@ -41,5 +55,56 @@ class EnvironmentVariables:
         self.SECRET_MANAGER_SECRET_ID = os.environ.get("SECRET_MANAGER_SECRET_ID")
         self.SECRET_MANAGER_VERSION_ID = os.environ.get("SECRET_MANAGER_VERSION_ID")
 
+        self.TRACKING_CONCURRENCY_LIMIT = int(
+            os.environ.get("TRACKING_CONCURRENCY_LIMIT", 5)
+        )
+        self.TRACKING_TIMEOUT_SECONDS = float(
+            os.environ.get("TRACKING_TIMEOUT_SECONDS", 5.0)
+        )
+        self.MERCHANT_CACHE_TTL_SECONDS = float(
+            os.environ.get("MERCHANT_CACHE_TTL_SECONDS", 300)
+        )
+        self.CUSTOMER_CACHE_TTL_SECONDS = float(
+            os.environ.get("CUSTOMER_CACHE_TTL_SECONDS", 3600)
+        )
+        # How long a webhook-maintained order projection answers reads on its own,
+        # bounds the damage of a missed webhook. 0 turns projection reads off.
+        self.ORDER_PROJECTION_MAX_AGE_SECONDS = float(
+            os.environ.get("ORDER_PROJECTION_MAX_AGE_SECONDS", 300)
+        )
+        # Address Shopify delivers the order webhooks to, see
+        # app.api.shopify_webhooks. Shops are subscribed when they are set up.
+        self.SHOPIFY_WEBHOOK_CALLBACK_URL = os.environ.get(
+            "SHOPIFY_WEBHOOK_CALLBACK_URL", ""
+        )
+        # Documents written before ids were derived from their natural key are only
+        # found by a field query. Turn off once app.db.migrations.deterministic_ids ran.
+        self.FIRESTORE_LEGACY_KEY_LOOKUPS = (
+            os.environ.get("FIRESTORE_LEGACY_KEY_LOOKUPS", "true").lower() == "true"
+        )
+        # Opt-in local copy of the Secret Manager payload for fast restarts during
+        # development. Empty turns it off.
+        self.SECRETS_SNAPSHOT_PATH = os.environ.get("SECRETS_SNAPSHOT_PATH", "")
+        self.SECRETS_SNAPSHOT_MAX_AGE_SECONDS = float(
+            os.environ.get("SECRETS_SNAPSHOT_MAX_AGE_SECONDS", 86400)
+        )
+        # Defaults of the per-upstream circuit breakers, see app.common.utils.circuit_breaker.
+        self.CIRCUIT_BREAKER_FAILURE_RATE = float(
+            os.environ.get("CIRCUIT_BREAKER_FAILURE_RATE", 0.5)
+        )
+        self.CIRCUIT_BREAKER_SLOW_CALL_RATE = float(
+            os.environ.get("CIRCUIT_BREAKER_SLOW_CALL_RATE", 0.5)
+        )
+        self.CIRCUIT_BREAKER_MINIMUM_CALLS = int(
+            os.environ.get("CIRCUIT_BREAKER_MINIMUM_CALLS", 20)
+        )
+        self.CIRCUIT_BREAKER_OPEN_SECONDS = float(
+            os.environ.get("CIRCUIT_BREAKER_OPEN_SECONDS", 30)
+        )
+        # Responses smaller than this are sent uncompressed.
+        self.RESPONSE_COMPRESSION_MINIMUM_SIZE = int(
+            os.environ.get("RESPONSE_COMPRESSION_MINIMUM_SIZE", 1024)
+        )
+
 
 env = EnvironmentVariables()
@@ -1,12 +1,25 @@
+import asyncio
+
+import aiohttp
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Dict, Optional, List
 
+from app.common.decorators.retry_policy import RetryPolicy, retry_budget
 from app.common.exceptions.exceptions import ServerException
 from app.common.logger.log import log_warning
+from app.common.utils import json_codec
+from app.common.utils.circuit_breaker import CircuitOpenException, circuit_breaker
+from app.common.utils.coalescing import RequestCoalescer
 from app.external.base_client import BaseClient
 from app.external.geocode_client import GeoCoordinates
 
 SHIP_24_API_BASE_URL = "https://api.ship24.com/public/v1/trackers"
+# https://docs.ship24.com/tracking-api-reference/#/operations/bulk-create-trackers
+SHIP_24_BULK_CREATE_MAX_ITEMS = 100
+
+TRANSIENT_STATUS_CODES = (429, 500, 502, 503, 504)
+
+ship24_coalescer = RequestCoalescer("ship24")
 
 
 class Ship24Exception(ServerException):
@@ -14,9 +27,23 @@ class Ship24Exception(ServerException):
         super().__init__(0, message, 500, data=kwargs)
 
 
+ship24_retry_policy = RetryPolicy(
+    "ship24",
+    attempts=3,
+    base_delay=0.2,
+    max_delay=2.0,
+    retry_on=(aiohttp.ClientError, asyncio.TimeoutError, Ship24Exception),
+    budget=retry_budget("ship24"),
+)
+# TrackingService skips Ship24 altogether while this is open. Tracker creations go through it too but are sent once,
+# like the Shopify mutations: a POST whose response got lost may already have created the tracker.
+ship24_circuit_breaker = circuit_breaker("ship24", slow_call_seconds=3.0)
+
+
 class _Ship24TrackerInfo(BaseModel):
     trackerId: str
     trackingNumber: Optional[str]
+    courierCode: Optional[List[str]]
     isSubscribed: Optional[bool]
     shipmentReference: Optional[str]
     createdAt: Optional[str]
@@ -91,6 +118,21 @@ class Ship24GetTrackerDetailResponse(BaseModel):
     trackings: List[Ship24TrackerDetails]
 
 
+class Ship24WebhookPayload(BaseModel):
+    # https://docs.ship24.com/webhooks/#webhook-payload
+    trackings: List[Ship24TrackerDetails]
+
+
+class _Ship24BulkCreateItem(BaseModel):
+    itemStatus: Optional[str]
+    tracker: Optional[_Ship24TrackerInfo]
+
+
+class Ship24BulkCreateTrackersResponse(BaseModel):
+    status: Optional[str]
+    items: List[_Ship24BulkCreateItem] = []
+
+
 class Ship24Client(BaseClient):
     # more information about the api docs
     # https://docs.ship24.com/tracking-api-reference/#/
@@ -105,31 +147,111 @@ class Ship24Client(BaseClient):
     async def initiate_tracker(self, courier: str, tracking_number: str) -> Optional[Ship24GetTrackerDetailResponse]:
         # https://docs.ship24.com/tracking-api-reference/#/operations/create-tracker-and-get-tracking-results
         url = f"{SHIP_24_API_BASE_URL}/track"
-        async with self.session.post(url, headers=self.headers, json={"trackingNumber": tracking_number}) as response:
+        body = {"trackingNumber": tracking_number, "courierName": courier}
+        try:
+            return await ship24_circuit_breaker.call_async(self._create_tracker, url, body)
+        except Ship24Exception as e:
+            log_warning(
+                "Could not initiate Ship24 tracker.",
+                exception=e,
+                courier=courier,
+                tracking_number=tracking_number,
+            )
+            return None
+
+    async def _create_tracker(self, url: str, body: dict) -> Optional[Ship24GetTrackerDetailResponse]:
+        async with self.session.post(url, headers=self.headers, json=body) as response:
             if response.status in [200, 201]:
-                response_json = await response.json()
+                response_json = await response.json(loads=json_codec.loads)
                 return Ship24GetTrackerDetailResponse(**response_json["data"])
-            else:
-                # log_warning(
-                #     "Could not initiate Ship24 tracker.",
-                #     courier=courier,
-                #     tracking_number=tracking_number,
-                # )
-                return None
+            if response.status in TRANSIENT_STATUS_CODES:
+                raise Ship24Exception("Ship24 request failed.", url=url, status_code=response.status)
+            log_warning(
+                "Could not initiate Ship24 tracker.",
+                status=response.status,
+                courier=body["courierName"],
+                tracking_number=body["trackingNumber"],
+            )
+            return None
 
     async def get_tracker_results(
         self, tracker_id: str, courier: str, tracking_number: str
+    ) -> Optional[Ship24GetTrackerDetailResponse]:
+        # Concurrent lookups of the same tracker share one request.
+        return await ship24_coalescer.run(
+            ("get_tracker_results", tracker_id),
+            lambda: self._get_tracker_results(tracker_id, courier, tracking_number),
+        )
+
+    async def _get_tracker_results(
+        self, tracker_id: str, courier: str, tracking_number: str
     ) -> Optional[Ship24GetTrackerDetailResponse]:
         url = f"{SHIP_24_API_BASE_URL}/{tracker_id}/results"
+        try:
+            tracking_details = await ship24_circuit_breaker.call_async(
+                ship24_retry_policy.call_async, self._fetch_tracker_results, url
+            )
+        except Ship24Exception:
+            tracking_details = None
+        if tracking_details is None:
+            log_warning(
+                "Could get Ship24 tracker results.",
+                courier=courier,
+                tracking_number=tracking_number,
+            )
+        return tracking_details
+
+    async def _fetch_tracker_results(self, url: str) -> Optional[Ship24GetTrackerDetailResponse]:
         async with self.session.get(url, headers=self.headers) as response:
             if response.status in [200, 201]:
-                response_json = await response.json()
-                tracking_details = Ship24GetTrackerDetailResponse(**response_json["data"])
-                return tracking_details
-            else:
-                log_warning(
-                    "Could get Ship24 tracker results.",
-                    courier=courier,
-                    tracking_number=tracking_number,
+                response_json = await response.json(loads=json_codec.loads)
+                return Ship24GetTrackerDetailResponse(**response_json["data"])
+            if response.status in TRANSIENT_STATUS_CODES:
+                raise Ship24Exception("Ship24 request failed.", url=url, status_code=response.status)
+            return None
+
+    async def bulk_create_trackers(self, couriers: Dict[str, str]) -> Dict[str, str]:
+        """
+        Creates trackers for many tracking numbers at once. `couriers` are keyed by tracking number and sent as
+        courierName, the same hint initiate_tracker sends.
+
+        Returns:
+            dict: tracker ids keyed by tracking number. Tracking numbers Ship24 rejected are left out.
+        """
+        url = f"{SHIP_24_API_BASE_URL}/bulk"
+        tracker_ids = {}
+        tracking_numbers = list(couriers)
+        for start in range(0, len(tracking_numbers), SHIP_24_BULK_CREATE_MAX_ITEMS):
+            chunk = tracking_numbers[start : start + SHIP_24_BULK_CREATE_MAX_ITEMS]
+            body = [
+                {"trackingNumber": tracking_number, "courierName": couriers[tracking_number]}
+                for tracking_number in chunk
+            ]
+            try:
+                bulk_response = await ship24_circuit_breaker.call_async(self._bulk_create_trackers, url, body)
+            except (Ship24Exception, CircuitOpenException) as e:
+                log_warning("Could not bulk create Ship24 trackers.", exception=e, tracking_numbers=chunk)
+                continue
+            if bulk_response is None:
+                continue
+            for item in bulk_response.items:
+                if item.tracker and item.tracker.trackingNumber:
+                    tracker_ids[item.tracker.trackingNumber] = item.tracker.trackerId
+        return tracker_ids
+
+    async def _bulk_create_trackers(self, url: str, body: List[dict]) -> Optional[Ship24BulkCreateTrackersResponse]:
+        async with self.session.post(url, headers=self.headers, json=body) as response:
+            if response.status in [200, 201, 207]:
+                response_json = await response.json(loads=json_codec.loads)
+                # {"status": ..., "data": [{"itemStatus": ..., "tracker": ...}]}, one item per tracking number.
+                return Ship24BulkCreateTrackersResponse(
+                    status=response_json.get("status"), items=response_json.get("data") or []
                 )
-                return None
+            if response.status in TRANSIENT_STATUS_CODES:
+                raise Ship24Exception("Ship24 request failed.", url=url, status_code=response.status)
+            log_warning(
+                "Could not bulk create Ship24 trackers.",
+                status=response.status,
+                tracking_numbers=[item["trackingNumber"] for item in body],
+            )
+            return None
@@ -1,558 +1,610 @@
+import functools
 import json
+from datetime import timedelta
+from typing import AsyncIterator, Callable, FrozenSet, List, Optional, Tuple
 
-import shopify
 from fastapi import Depends
 
+from app.common.cache.lru_ttl_cache import LRUTTLCache
+from app.common.decorators.retry_policy import RetryPolicy
+from app.common.logger.log import log_warning
+from app.common.utils.circuit_breaker import CircuitBreaker
+from app.common.utils.coalescing import RequestCoalescer
+from app.db.order_projection import OrderProjectionModelContext, gid_to_id
+from app.environment import env
+from app.external import shopify_queries as queries
 from app.external.shopify.responses import ShopifyGetCustomerByOrderIdResponse
+from app.external.shopify_queries import GraphQLQuery
+from app.external.shopify_rate_limiter import (
+    THROTTLE_RETRIES,
+    ShopifyRateLimiter,
+    shopify_rate_limiter,
+)
+from app.external.shopify_transport import (
+    SHOPIFY_API_VERSION,
+    ShopifyGraphQLTransport,
+    _normalize_shop_url,
+    shopify_circuit_breaker,
+    shopify_retry_policy,
+    shopify_transport,
+)
 from app.secret_loader import init_setting
 from app.secrets import Secrets
 
+# Orders shown per page on the order list.
+ORDERS_PAGE_SIZE = 10
+# Page size of the iter_* generators, Shopify accepts at most 250 per page.
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 250
+# (current total, original total) replaced by get_order_by_id(get_refunded_items=True),
+# so the refunded items count towards the totals.
+REFUNDED_ITEMS_TOTALS = (
+    ("currentSubtotalPriceSet", "subtotalPriceSet"),
+    ("currentTotalDiscountsSet", "totalDiscountsSet"),
+    ("currentTotalPriceSet", "totalPriceSet"),
+    ("currentTotalTaxSet", "totalTaxSet"),
+)
+
+# (shop, lowercased email) -> {"node": customer, "pageInfo": ...}
+customer_by_email_cache: LRUTTLCache[dict] = LRUTTLCache(max_size=4096)
+
+shopify_coalescer = RequestCoalescer("shopify")
+
+# The OrderListItem selection, order lists served from the projection are cut
+# down to it so they look exactly like the GraphQL ones.
+ORDER_LIST_ITEM_FIELDS = (
+    "id",
+    "name",
+    "createdAt",
+    "displayFinancialStatus",
+    "displayFulfillmentStatus",
+    "fulfillments",
+    "totalPriceSet",
+    "currentTotalPriceSet",
+    "totalOutstandingSet",
+    "refunds",
+)
+ORDER_LIST_LINE_ITEM_FIELDS = (
+    "id",
+    "name",
+    "image",
+    "currentQuantity",
+    "refundableQuantity",
+)
+
+
+def _order_list_item(order: dict) -> dict:
+    item = {key: order.get(key) for key in ORDER_LIST_ITEM_FIELDS}
+    item["lineItems"] = {
+        "edges": [
+            {
+                "node": {
+                    key: edge["node"].get(key) for key in ORDER_LIST_LINE_ITEM_FIELDS
+                }
+            }
+            for edge in (order.get("lineItems") or {}).get("edges", [])
+        ]
+    }
+    return item
+
 
 class ShopifyClient:
     def __init__(self, settings: Secrets = Depends(init_setting)):
-        self.api_version = "2022-07"
+        self.api_version = SHOPIFY_API_VERSION
         self.shopify_private_app_admin_api_access_token = (
             settings.shopify_private_app_admin_api_access_token
         )
+        self.transport: ShopifyGraphQLTransport = shopify_transport
+        self.rate_limiter: ShopifyRateLimiter = shopify_rate_limiter
+        self.order_projection = OrderProjectionModelContext
+        self.coalescer: RequestCoalescer = shopify_coalescer
+        self.retry_policy: RetryPolicy = shopify_retry_policy
+        # Returns the circuit breaker of a shop.
+        self.circuit_breaker: Callable[[str], CircuitBreaker] = shopify_circuit_breaker
+
+    async def _execute(
+        self, shop_url: str, query: GraphQLQuery, variables: Optional[dict] = None
+    ) -> dict:
+        # Identical reads in flight at the same time share one request, mutations
+        # are always sent.
+        if query.is_mutation:
+            return await self._send(shop_url, query, variables)
+        key = (
+            _normalize_shop_url(shop_url),
+            query.hash,
+            json.dumps(variables, sort_keys=True),
+        )
+        return await self.coalescer.run(
+            key, lambda: self._send(shop_url, query, variables)
+        )
+
+    async def _send(
+        self, shop_url: str, query: GraphQLQuery, variables: Optional[dict] = None
+    ) -> dict:
+        # Waits for room in the shop's cost bucket instead of failing with THROTTLED,
+        # a throttled request is sent again once the bucket has refilled. Queries
+        # failing with a transient error are retried, mutations are sent once. While
+        # Shopify keeps failing for the shop, its circuit breaker fails calls at once.
+        shop = _normalize_shop_url(shop_url)
+        execute = self.transport.execute
+        if not query.is_mutation:
+            execute = functools.partial(self.retry_policy.call_async, execute)
+        execute = functools.partial(self.circuit_breaker(shop).call_async, execute)
+        for _ in range(THROTTLE_RETRIES + 1):
+            await self.rate_limiter.acquire(shop, query.name)
+            data = await execute(
+                shop_url,
+                self.shopify_private_app_admin_api_access_token,
+                query.document,
+                variables,
+            )
+            if not await self.rate_limiter.record(shop, query.name, data):
+                break
+        return data
 
-    def initiate_session(self, shop_url: str):
-        return shopify.Session(
-            shop_url, self.api_version, self.shopify_private_app_admin_api_access_token
+    async def get_products(self, shop_url: str):
+        data = await self._execute(shop_url, queries.GET_PRODUCTS)
+        return data
+
+    async def get_coupon_by_title(self, shop_url: str, coupon_title):
+        data = await self._execute(
+            shop_url, queries.GET_COUPON_BY_TITLE, {"code": coupon_title}
         )
+        return data
 
-    def initiate_temporary_session(self, shop_url: str):
-        return shopify.Session.temp(
-            shop_url, self.api_version, self.shopify_private_app_admin_api_access_token
+    async def get_customer_by_order_id(
+        self, shop_url: str, order_id: str
+    ) -> ShopifyGetCustomerByOrderIdResponse:
+        json_dict = await self._execute(
+            shop_url,
+            queries.GET_CUSTOMER_BY_ORDER_ID,
+            {"id": f"gid://shopify/Order/{order_id}"},
         )
+        return ShopifyGetCustomerByOrderIdResponse(**json_dict)
 
-    def get_products(self, shop_url: str):
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """{
-                products(first:10) {
-                    edges {
-                        node {
-                            id
-                            title
-                        }
-                    }
-                }
-            }"""
+    async def get_order_by_id(
+        self,
+        shop_url: str,
+        order_id: str,
+        get_refunded_items: bool = False,
+        fields: Optional[FrozenSet[str]] = None,
+    ):
+        """
+        Served from the order projection while it is fresh, from GraphQL otherwise.
+        With `fields` (see queries.parse_order_fields) only those top-level fields
+        are queried and returned. Partial orders are not stored as the projection.
+        """
+        order = await self._get_projected_order(shop_url, order_id)
+        if order is not None:
+            result = {"data": {"order": queries.select_order_fields(order, fields)}}
+        elif fields is not None:
+            result = await self._execute(
+                shop_url,
+                queries.order_query(fields),
+                {"id": f"gid://shopify/Order/{order_id}"},
             )
-            return json.loads(data)
-
-    def get_coupon_by_title(self, shop_url: str, coupon_title):
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                '''{
-                codeDiscountNodeByCode(code: "'''
-                + coupon_title
-                + """") {
-                    id,
-                    codeDiscount {
-                        __typename
-                        ... on DiscountCodeApp {
-                            status
-                            title
-                        }
-                        ... on DiscountCodeBasic {
-                            status
-                            title
-                        }
-                        ... on DiscountCodeBxgy {
-                            status
-                            title
-                        }
-                        ... on DiscountCodeFreeShipping {
-                            status
-                            title
-                        }
-                    }
-                }
-            }"""
+            if not (result.get("data") or {}).get("order"):
+                return result
+            result["data"]["order"] = queries.select_order_fields(
+                result["data"]["order"], fields
             )
-            return json.loads(data)
+        else:
+            result = await self._fetch_order(shop_url, order_id)
+            if not (result.get("data") or {}).get("order"):
+                return result
+
+        order_details = result.get("data", {}).get("order", {})
+        line_items = []
+        for edge in (order_details.get("lineItems") or {}).get("edges", []):
+            node = edge.get("node", {})
+            if get_refunded_items:
+                edge["node"]["currentQuantity"] = node.get("quantity", 0)
+                line_items.append(edge)
+            else:
+                current_quantity = node.get("currentQuantity", 0)
+                refundable_quantity = node.get("refundableQuantity", 0)
+                if current_quantity == refundable_quantity == 0:
+                    continue
+                line_items.append(edge)
 
-    def get_customer_by_order_id(
-        self, shop_url: str, order_id: str
-    ) -> ShopifyGetCustomerByOrderIdResponse:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            json_str = shopify.GraphQL().execute(
-                f"""{{
-                    order(id: "gid://shopify/Order/{order_id}") {{
-                        customer {{
-                            id
-                            firstName
-                            lastName
-                            displayName
-                            email
-                            phone
-                        }}
-                    }}
-                }}"""
+        if get_refunded_items:
+            # Only the totals of the selected fields are replaced.
+            for current, total in REFUNDED_ITEMS_TOTALS:
+                if total in order_details:
+                    order_details[current] = order_details[total]
+
+        if order_details.get("lineItems") is not None:
+            order_details["lineItems"]["edges"] = line_items
+        return result
+
+    async def refresh_order_projection(self, shop_url: str, order_id: str) -> dict:
+        """
+        Reads the order from GraphQL and stores it as its projection, used by the
+        order and fulfillment webhooks. Unlike the read paths, a failed write raises
+        so the webhook is processed again.
+        """
+        data = await self._execute(
+            shop_url, queries.GET_ORDER_BY_ID, {"id": f"gid://shopify/Order/{order_id}"}
+        )
+        order = (data.get("data") or {}).get("order")
+        if order:
+            await self.order_projection.upsert_order(
+                _normalize_shop_url(shop_url), order
             )
-            json_dict = json.loads(json_str)
-            return ShopifyGetCustomerByOrderIdResponse(**json_dict)
+        return data
 
-    def get_order_by_id(
-        self, shop_url: str, order_id: str, get_refunded_items: bool = False
-    ):
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """{
-                order(id: "gid://shopify/Order/"""
-                + order_id
-                + """") {
-                    id
-                    name
-                    createdAt
-                    updatedAt
-                    processedAt
-                    displayFinancialStatus
-                    displayFulfillmentStatus
-                    location
-                    currencyCode
-                    customer {
-                        id
-                        firstName
-                        lastName
-                        displayName
-                        email
-                        phone
-                    }
-                    shippingAddress {
-                        id
-                        address1
-                        address2
-                        city
-                        company
-                        country
-                        countryCodeV2
-                        name
-                        firstName
-                        lastName
-                        phone
-                        province
-                        provinceCode
-                        zip
-                        latitude
-                        longitude
-                        coordinatesValidated
-                    }
-                    fulfillments {
-                        id
-                        name
-                        createdAt
-                        updatedAt
-                        deliveredAt
-                        status
-                        displayStatus
-                        estimatedDeliveryAt
-                        requiresShipping
-                        trackingInfo {
-                            number
-                            company
-                            url
-                        }
-                    }
-                    totalShippingPriceSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    totalTaxSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    currentTotalTaxSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    totalPriceSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    currentTotalPriceSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    subtotalPriceSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    currentSubtotalPriceSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    totalDiscountsSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    currentTotalDiscountsSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    totalOutstandingSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    transactions {
-                        gateway
-                        id
-                        kind
-                        amountSet {
-                            shopMoney {
-                                amount
-                                currencyCode
-                            }
-                        }
-                    }
-                    refunds(first: 10) {
-                        id
-                        totalRefundedSet {
-                            shopMoney {
-                                amount
-                                currencyCode
-                            }
-                        }
-                    }
-                    lineItems(first:10) {
-                        edges {
-                            node {
-                                id
-                                name
-                                image {
-                                    url
-                                }
-                                variant {
-                                    id
-                                    title
-                                    displayName
-                                    selectedOptions {
-                                        name
-                                        value
-                                    }
-                                }
-                                product {
-                                    id
-                                    totalVariants
-                                }
-                                quantity
-                                currentQuantity
-                                refundableQuantity
-                                originalUnitPriceSet {
-                                    shopMoney {
-                                        amount
-                                        currencyCode
-                                    }
-                                }
-                                discountedUnitPriceSet {
-                                    shopMoney {
-                                        amount
-                                        currencyCode
-                                    }
-                                }
-                                discountedTotalSet {
-                                    shopMoney {
-                                        amount
-                                        currencyCode
-                                    }
-                                }
-                                discountAllocations {
-                                    allocatedAmountSet {
-                                        shopMoney {
-                                            amount
-                                            currencyCode
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    }
+    async def _fetch_order(self, shop_url: str, order_id: str) -> dict:
+        data = await self._execute(
+            shop_url, queries.GET_ORDER_BY_ID, {"id": f"gid://shopify/Order/{order_id}"}
+        )
+        order = (data.get("data") or {}).get("order")
+        if order:
+            try:
+                await self.order_projection.upsert_order(
+                    _normalize_shop_url(shop_url), order
+                )
+            except Exception as e:
+                log_warning(
+                    "Storing the order projection failed.",
+                    exception=e,
+                    order_id=order_id,
+                )
+        return data
+
+    async def _get_projected_order(
+        self, shop_url: str, order_id: str
+    ) -> Optional[dict]:
+        if not env.ORDER_PROJECTION_MAX_AGE_SECONDS:
+            return None
+        try:
+            return await self.order_projection.get_order(
+                _normalize_shop_url(shop_url),
+                str(order_id),
+                timedelta(seconds=env.ORDER_PROJECTION_MAX_AGE_SECONDS),
+            )
+        except Exception as e:
+            log_warning(
+                "Reading the order projection failed.", exception=e, order_id=order_id
+            )
+            return None
+
+    async def _get_projected_customer_orders(
+        self, shop_url: str, customer_id: str, first: int
+    ) -> Optional[dict]:
+        if not env.ORDER_PROJECTION_MAX_AGE_SECONDS:
+            return None
+        try:
+            projected = await self.order_projection.get_customer_orders(
+                _normalize_shop_url(shop_url),
+                customer_id,
+                timedelta(seconds=env.ORDER_PROJECTION_MAX_AGE_SECONDS),
+            )
+        except Exception as e:
+            log_warning(
+                "Reading the customer order projection failed.",
+                exception=e,
+                customer_id=customer_id,
+            )
+            return None
+        # Only a list that fits on the first page is served, its cursors are the
+        # ones GraphQL returned when the list was indexed.
+        if projected is None or len(projected[1]) > first:
+            return None
+        customer, orders = projected
+        cursors = [cursor for cursor, _ in orders]
+        return {
+            "data": {
+                "customer": {
+                    **customer,
+                    "orders": {
+                        "edges": [
+                            {"cursor": cursor, "node": _order_list_item(order)}
+                            for cursor, order in orders
+                        ],
+                        "pageInfo": {
+                            "startCursor": cursors[0] if cursors else None,
+                            "endCursor": cursors[-1] if cursors else None,
+                            "hasNextPage": False,
+                            "hasPreviousPage": False,
+                        },
+                    },
                 }
-            }"""
+            }
+        }
+
+    async def _index_customer_orders(self, shop_url: str, customer: Optional[dict]):
+        # Only a complete first page tells which orders the customer has.
+        orders = (customer or {}).get("orders") or {}
+        if not env.ORDER_PROJECTION_MAX_AGE_SECONDS or (
+            orders.get("pageInfo") or {}
+        ).get("hasNextPage", True):
+            return
+        edges = orders.get("edges", [])
+        try:
+            await self.order_projection.set_customer_order_ids(
+                _normalize_shop_url(shop_url),
+                customer,
+                [gid_to_id(edge["node"]["id"]) for edge in edges],
+                [edge.get("cursor") for edge in edges],
+            )
+        except Exception as e:
+            log_warning(
+                "Storing the customer order index failed.",
+                exception=e,
+                customer_id=customer.get("id"),
             )
 
-            result = json.loads(data)
-            order_details = result.get("data", {}).get("order", {})
-            line_items = []
-            for edge in order_details.get("lineItems", {}).get("edges", []):
-                node = edge.get("node", {})
-                if get_refunded_items:
-                    edge["node"]["currentQuantity"] = node.get("quantity", 0)
-                    line_items.append(edge)
-                else:
-                    current_quantity = node.get("currentQuantity", 0)
-                    refundable_quantity = node.get("refundableQuantity", 0)
-                    if current_quantity == refundable_quantity == 0:
-                        continue
-                    line_items.append(edge)
+    async def _invalidate_projected_order(self, order_id: str):
+        # Called after a mutation of the order. Reads go to GraphQL until the
+        # order webhooks or the next read store it again.
+        try:
+            await self.order_projection.invalidate_order(str(order_id))
+        except Exception as e:
+            log_warning(
+                "Invalidating the order projection failed.",
+                exception=e,
+                order_id=order_id,
+            )
 
-            if get_refunded_items:
-                result["data"]["order"]["currentSubtotalPriceSet"] = result["data"][
-                    "order"
-                ]["subtotalPriceSet"]
-                result["data"]["order"]["currentTotalDiscountsSet"] = result["data"][
-                    "order"
-                ]["totalDiscountsSet"]
-                result["data"]["order"]["currentTotalPriceSet"] = result["data"][
-                    "order"
-                ]["totalPriceSet"]
-                result["data"]["order"]["currentTotalTaxSet"] = result["data"]["order"][
-                    "totalTaxSet"
-                ]
-
-            result["data"]["order"]["lineItems"]["edges"] = line_items
-            return result
-
-    def get_order_by_number(self, shop_url: str, order_name):
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """{
-                orders(first:10, query: "name:"""
-                + order_name
-                + """") {
-                    edges {
-                        node {
-                            id
-                            name
-                            createdAt
-                            email
-                            fulfillments {
-                                id
-                                displayStatus
-                            }
-                            customer {
-                                id
-                                email
-                           }
-                        }
-                    }
-                    pageInfo {
-                        startCursor
-                        endCursor
-                        hasNextPage
-                        hasPreviousPage
-                    }
-                }
-            }"""
+    async def get_order_by_number(self, shop_url: str, order_name):
+        data = await self._execute(
+            shop_url, queries.GET_ORDER_BY_NUMBER, {"query": f"name:{order_name}"}
+        )
+        return data
+
+    async def get_order_by_email(self, shop_url: str, email: str) -> dict:
+        data = await self._execute(
+            shop_url, queries.GET_ORDER_BY_EMAIL, {"query": f"email:{email}"}
+        )
+        return data
+
+    async def get_orders_by_customer_id(
+        self,
+        shop_url: str,
+        customer_id: str,
+        first: int = ORDERS_PAGE_SIZE,
+        after: Optional[str] = None,
+    ) -> dict:
+        """
+        The first page is served from the order projection when the customer's
+        whole order list is projected and fresh.
+        """
+        if after is None:
+            projected = await self._get_projected_customer_orders(
+                shop_url, customer_id, first
             )
-            return json.loads(data)
-
-    def get_order_by_email(self, shop_url: str, email: str) -> json:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """{
-                orders(first:10, query: "email:"""
-                + email
-                + """", sortKey:CREATED_AT, reverse:true) {
-                    edges {
-                        node {
-                            id
-                            name
-                            createdAt
-                            displayFinancialStatus
-                            displayFulfillmentStatus
-                            fulfillments {
-                                id
-                                name
-                                createdAt
-                                deliveredAt
-                                displayStatus
-                                estimatedDeliveryAt
-                            }
-                            totalPriceSet {
-                                shopMoney {
-                                    amount
-                                    currencyCode
-                                }
-                            }
-                            currentTotalPriceSet {
-                                shopMoney {
-                                    amount
-                                    currencyCode
-                                }
-                            }
-                            lineItems(first:10) {
-                                edges {
-                                    node {
-                                        id
-                                        name
-                                        image {
-                                            url
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    }
-                    pageInfo {
-                        startCursor
-                        endCursor
-                        hasNextPage
-                        hasPreviousPage
-                    }
-                },
-                customers(first:1, query: "email:"""
-                + email
-                + """") {
-                    edges {
-                        node {
-                            id
-                            firstName
-                            lastName
-                        }
-                    }
-                    pageInfo {
-                        startCursor
-                        endCursor
-                        hasNextPage
-                        hasPreviousPage
-                    }
-                }
-            }"""
+            if projected is not None:
+                return projected
+
+        data = await self._execute(
+            shop_url,
+            queries.GET_ORDERS_BY_CUSTOMER_ID,
+            {"id": customer_id, "first": first, "after": after},
+        )
+        if after is None:
+            await self._index_customer_orders(
+                shop_url, (data.get("data") or {}).get("customer")
             )
-            return json.loads(data)
-
-    def get_orders_by_customer_id(self, shop_url: str, customer_id: str) -> json:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                '''{
-                customer(id: "'''
-                + customer_id
-                + """") {
-                    orders(first:10, sortKey:CREATED_AT, reverse:true) {
-                        edges {
-                            node {
-                                id
-                                name
-                                createdAt
-                                displayFinancialStatus
-                                displayFulfillmentStatus
-                                fulfillments {
-                                    id
-                                    name
-                                    createdAt
-                                    updatedAt
-                                    deliveredAt
-                                    status
-                                    displayStatus
-                                    estimatedDeliveryAt
-                                    requiresShipping
-                                    trackingInfo {
-                                        number
-                                        company
-                                        url
-                                    }
-                                }
-                                totalPriceSet {
-                                    shopMoney {
-                                        amount
-                                        currencyCode
-                                    }
-                                }
-                                currentTotalPriceSet {
-                                    shopMoney {
-                                        amount
-                                        currencyCode
-                                    }
-                                }
-                                totalOutstandingSet {
-                                    shopMoney {
-                                        amount
-                                        currencyCode
-                                    }
-                                }
-                                refunds(first: 10) {
-                                    id
-                                    totalRefundedSet {
-                                        shopMoney {
-                                            amount
-                                            currencyCode
-                                        }
-                                    }
-                                }
-                                lineItems(first:10) {
-                                    edges {
-                                        node {
-                                            id
-                                            name
-                                            image {
-                                                url
-                                            }
-                                            currentQuantity
-                                            refundableQuantity
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                        pageInfo {
-                            startCursor
-                            endCursor
-                            hasNextPage
-                            hasPreviousPage
-                        }
+
+        return data
+
+    async def get_customer_with_orders_by_email(
+        self,
+        shop_url: str,
+        email: str,
+        first: int = ORDERS_PAGE_SIZE,
+        after: Optional[str] = None,
+    ) -> dict:
+        """
+        Resolves the customer by email and returns their orders in the same
+        document, instead of get_customer_by_email followed by
+        get_orders_by_customer_id.
+        """
+        data = await self._execute(
+            shop_url,
+            queries.GET_CUSTOMER_WITH_ORDERS_BY_EMAIL,
+            {"query": f"email:{email}", "first": first, "after": after},
+        )
+        if after is None:
+            edges = ((data.get("data") or {}).get("customers") or {}).get("edges", [])
+            if edges:
+                await self._index_customer_orders(shop_url, edges[0].get("node"))
+        return data
+
+    async def get_customer_orders_by_email(
+        self,
+        shop_url: str,
+        email: str,
+        first: int = ORDERS_PAGE_SIZE,
+        after: Optional[str] = None,
+    ) -> dict:
+        """
+        Returns {"data": {"customers": ..., "orders": ...}} for the customer with
+        the given email, shaped like the separate customers and customer.orders
+        connections. first and after page through the orders.
+
+        The email to customer mapping is cached, a repeat lookup only fetches the
+        orders by customer id. A cached customer that no longer resolves is
+        dropped and looked up by email again.
+        """
+        key = (_normalize_shop_url(shop_url), email.lower())
+        cached = customer_by_email_cache.get(key)
+        if cached is not None:
+            data = await self.get_orders_by_customer_id(
+                shop_url, cached["node"]["id"], first, after
+            )
+            customer = (data.get("data") or {}).get("customer")
+            if customer:
+                return {
+                    "data": {
+                        "customers": {
+                            "edges": [{"node": cached["node"]}],
+                            "pageInfo": cached["pageInfo"],
+                        },
+                        "orders": customer.get("orders", {}),
                     }
                 }
-            }"""
+            customer_by_email_cache.delete(key)
+
+        data = await self.get_customer_with_orders_by_email(
+            shop_url, email, first, after
+        )
+        customers = (data.get("data") or {}).get("customers") or {}
+        edges = customers.get("edges", [])
+        orders = {}
+        if edges:
+            node = dict(edges[0].get("node", {}))
+            orders = node.pop("orders", {})
+            customers = {**customers, "edges": [{**edges[0], "node": node}]}
+            customer_by_email_cache.set(
+                key,
+                {"node": node, "pageInfo": customers.get("pageInfo")},
+                env.CUSTOMER_CACHE_TTL_SECONDS,
             )
+        return {"data": {"customers": customers, "orders": orders}}
 
-            return json.loads(data)
-
-    def get_customer_by_email(self, shop_url: str, email: str) -> json:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """{
-                customers(first:1, query: "email:"""
-                + email
-                + """") {
-                    edges {
-                        node {
-                            id
-                            firstName
-                            lastName
-                        }
-                    }
-                    pageInfo {
-                        startCursor
-                        endCursor
-                        hasNextPage
-                        hasPreviousPage
-                    }
-                }
-            }"""
+    async def _paginate_pages(
+        self,
+        shop_url: str,
+        query: GraphQLQuery,
+        variables: dict,
+        path: Tuple[str, ...],
+        page_size: int,
+        after: Optional[str],
+    ) -> AsyncIterator[Tuple[dict, dict]]:
+        """
+        Yields (data, connection) per page, where connection is found at `path`
+        in data. The next page is only fetched once the previous one has been
+        consumed.
+        """
+        while True:
+            data = await self._execute(
+                shop_url, query, {**variables, "first": page_size, "after": after}
             )
-            return json.loads(data)
+            data = data.get("data") or {}
+            connection = data
+            for key in path:
+                connection = connection.get(key) or {}
+            yield data, connection
+            page_info = connection.get("pageInfo") or {}
+            if not page_info.get("hasNextPage") or not page_info.get("endCursor"):
+                return
+            after = page_info["endCursor"]
+
+    async def _paginate(
+        self,
+        shop_url: str,
+        query: GraphQLQuery,
+        variables: dict,
+        path: Tuple[str, ...],
+        page_size: int,
+        after: Optional[str],
+    ) -> AsyncIterator[dict]:
+        """
+        Yields the edges of the connection at `path`. Every edge has its cursor,
+        to resume from it later with `after`.
+        """
+        async for _, connection in self._paginate_pages(
+            shop_url, query, variables, path, page_size, after
+        ):
+            for edge in connection.get("edges", []):
+                yield edge
+
+    def iter_orders_by_customer_id(
+        self,
+        shop_url: str,
+        customer_id: str,
+        page_size: int = PAGE_SIZE,
+        after: Optional[str] = None,
+    ) -> AsyncIterator[dict]:
+        return self._paginate(
+            shop_url,
+            queries.GET_ORDERS_BY_CUSTOMER_ID,
+            {"id": customer_id},
+            ("customer", "orders"),
+            page_size,
+            after,
+        )
+
+    def iter_orders_by_email(
+        self,
+        shop_url: str,
+        email: str,
+        page_size: int = PAGE_SIZE,
+        after: Optional[str] = None,
+    ) -> AsyncIterator[dict]:
+        return self._paginate(
+            shop_url,
+            queries.GET_ORDERS_BY_EMAIL_PAGE,
+            {"query": f"email:{email}"},
+            ("orders",),
+            page_size,
+            after,
+        )
+
+    def iter_order_line_items(
+        self,
+        shop_url: str,
+        order_id: str,
+        page_size: int = PAGE_SIZE,
+        after: Optional[str] = None,
+    ) -> AsyncIterator[dict]:
+        return self._paginate(
+            shop_url,
+            queries.GET_ORDER_LINE_ITEMS_PAGE,
+            {"id": f"gid://shopify/Order/{order_id}"},
+            ("order", "lineItems"),
+            page_size,
+            after,
+        )
+
+    async def iter_order_refunds(
+        self, shop_url: str, order_id: str
+    ) -> AsyncIterator[dict]:
+        # Order.refunds is a list rather than a connection, there is no cursor to
+        # follow. It is fetched once with the largest size Shopify accepts.
+        data = await self._execute(
+            shop_url,
+            queries.GET_ORDER_REFUNDS,
+            {"id": f"gid://shopify/Order/{order_id}", "first": MAX_PAGE_SIZE},
+        )
+        for refund in ((data.get("data") or {}).get("order") or {}).get("refunds", []):
+            yield refund
 
-    def change_shipping_address(
+    async def iter_product_variants(
+        self,
+        shop_url: str,
+        product_id: str,
+        page_size: int = PAGE_SIZE,
+        after: Optional[str] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Variant edges of the product, a variant without its own image gets the
+        product's featured image like get_variants_for_product.
+        """
+        default_image = None
+        async for data, variants in self._paginate_pages(
+            shop_url,
+            queries.GET_PRODUCT_VARIANTS_PAGE,
+            {"id": f"gid://shopify/Product/{product_id}"},
+            ("product", "variants"),
+            page_size,
+            after,
+        ):
+            if default_image is None:
+                default_image = (data.get("product") or {}).get("featuredImage") or {}
+            for edge in variants.get("edges", []):
+                if not edge.get("node", {}).get("image"):
+                    edge["node"]["image"] = default_image
+                yield edge
+
+    async def get_customer_by_email(self, shop_url: str, email: str) -> dict:
+        data = await self._execute(
+            shop_url, queries.GET_CUSTOMER_BY_EMAIL, {"query": f"email:{email}"}
+        )
+        return data
+
+    async def change_shipping_address(
         self,
         shop_url: str,
         order_id,
@@ -565,831 +617,200 @@ class ShopifyClient:
         country,
         zip_code,
     ) -> dict:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """mutation {
-                    orderUpdate(input: {
-                        id: "gid://shopify/Order/"""
-                + order_id
-                + '''"
-                        shippingAddress: {
-                            firstName: "'''
-                + first_name
-                + '''"
-                            lastName: "'''
-                + last_name
-                + '''"
-                            address1: "'''
-                + address1
-                + '''"
-                            address2: "'''
-                + address2
-                + '''"
-                            city: "'''
-                + city
-                + '''"
-                            province: "'''
-                + province
-                + '''"
-                            country: "'''
-                + country
-                + '''"
-                            zip: "'''
-                + zip_code
-                + """"
-                        }
-                    }) {
-                        order {
-                            id
-                        }
-                        userErrors {
-                            field
-                            message
-                        }
-                    }
-                }"""
-            )
-            return json.loads(data)
-
-    def refund_order(self, shop_url: str, order_id, refund_line_items, shipping_amount):
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """mutation {
-                    refundCreate(
-                        input: {
-                            orderId: "gid://shopify/Order/"""
-                + order_id
-                + """"
-                            notify: true
-                            note: "Customer canceled order before it was shipped"
-                            shipping: {
-                                amount: """
-                + str(shipping_amount)
-                + """
-                                fullRefund: true
-                            }
-                            refundLineItems: [
-                            """
-                + refund_line_items
-                + """
-                            ]
-                        }
-                    )
-                    {
-
-    refund {
-      id
-      order {
-        currencyCode
-        totalTaxSet {
-          shopMoney {
-            amount
-            currencyCode
-          }
-        }
-        updatedAt
-        createdAt
-        processedAt
-        totalRefundedSet {
-          shopMoney {
-            amount
-            currencyCode
-          }
-        }
-        totalPriceSet {
-            shopMoney {
-                amount
-                currencyCode
-            }
-        }
-        subtotalPriceSet {
-          shopMoney {
-            amount
-            currencyCode
-          }
-        }
-      }
-      totalRefundedSet {
-        shopMoney {
-          amount
-          currencyCode
-        }
-      }
-      refundLineItems(first: 100) {
-        edges {
-          node {
-            lineItem {
-              id
-              name
-              image {
-                url
-              }
-              quantity
-              currentQuantity
-              totalDiscountSet {
-                shopMoney {
-                  amount
-                  currencyCode
-                }
-              }
-              discountedTotalSet {
-                shopMoney {
-                  amount
-                  currencyCode
+        data = await self._execute(
+            shop_url,
+            queries.CHANGE_SHIPPING_ADDRESS,
+            {
+                "input": {
+                    "id": f"gid://shopify/Order/{order_id}",
+                    "shippingAddress": {
+                        "firstName": first_name,
+                        "lastName": last_name,
+                        "address1": address1,
+                        "address2": address2,
+                        "city": city,
+                        "province": province,
+                        "country": country,
+                        "zip": zip_code,
+                    },
                 }
-              }
-              originalUnitPriceSet {
-                shopMoney {
-                  amount
-                  currencyCode
-                }
-              }
-            }
+            },
+        )
+        await self._invalidate_projected_order(order_id)
+        return data
 
-          }
-        }
-      }
-    }
-                        userErrors {
-                            field
-                            message
-                        }
-                    }
-                }"""
-            )
-            return json.loads(data)
-
-    def get_fulfillment_orders_by_id(self, shop_url: str, order_id):
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """{
-                order(id: "gid://shopify/Order/"""
-                + order_id
-                + """") {
-                    id
-                    name
-                    createdAt
-                    updatedAt
-                    processedAt
-                    displayFinancialStatus
-                    displayFulfillmentStatus
-                    location
-                    currencyCode
-                    customer {
-                        id
-                        firstName
-                        lastName
-                        displayName
-                        email
-                        phone
-                    }
-                    shippingAddress {
-                        id
-                        address1
-                        address2
-                        city
-                        company
-                        country
-                        countryCodeV2
-                        name
-                        firstName
-                        lastName
-                        phone
-                        province
-                        provinceCode
-                        zip
-                        latitude
-                        longitude
-                        coordinatesValidated
-                    }
-                    fulfillments {
-                        id
-                        name
-                        createdAt
-                        updatedAt
-                        deliveredAt
-                        status
-                        displayStatus
-                        estimatedDeliveryAt
-                        trackingInfo {
-                            number
-                            company
-                            url
-                        }
-                    }
-                    totalShippingPriceSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    totalTaxSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    currentTotalTaxSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    totalPriceSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    currentTotalPriceSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    subtotalPriceSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    currentSubtotalPriceSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    totalDiscountsSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    currentTotalDiscountsSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    totalOutstandingSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    transactions {
-                        gateway
-                        id
-                        kind
-                        amountSet {
-                            shopMoney {
-                                amount
-                                currencyCode
-                            }
-                        }
-                    }
-                    refunds(first: 10) {
-                        id
-                        totalRefundedSet {
-                            shopMoney {
-                                amount
-                                currencyCode
-                            }
-                        }
-                    }
-                    lineItems(first:10) {
-                        edges {
-                            node {
-                                id
-                                name
-                                image {
-                                    url
-                                }
-                                variant {
-                                    id
-                                    title
-                                    displayName
-                                    selectedOptions {
-                                        name
-                                        value
-                                    }
-                                }
-                                product {
-                                    id
-                                    totalVariants
-                                }
-                                currentQuantity
-                                refundableQuantity
-                                originalUnitPriceSet {
-                                    shopMoney {
-                                        amount
-                                        currencyCode
-                                    }
-                                }
-                                discountedUnitPriceSet {
-                                    shopMoney {
-                                        amount
-                                        currencyCode
-                                    }
-                                }
-                                discountedTotalSet {
-                                    shopMoney {
-                                        amount
-                                        currencyCode
-                                    }
-                                }
-                                discountAllocations {
-                                    allocatedAmountSet {
-                                        shopMoney {
-                                            amount
-                                            currencyCode
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    }
-                    fulfillmentOrders(first: 10) {
-                        edges {
-                            node {
-                                id
-                                lineItems(first: 10) {
-                                    edges {
-                                        node {
-                                            lineItem {
-                                                id
-                                                title
-                                                quantity
-                                                currentQuantity
-                                                refundableQuantity
-                                                discountedUnitPriceSet {
-                                                    shopMoney {
-                                                        amount
-                                                        currencyCode
-                                                    }
-                                                }
-                                                fulfillmentService {
-                                                    id
-                                                    location {
-                                                        id
-                                                        name
-                                                    }
-                                                    serviceName
-                                                }
-                                            }
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    }
+    async def refund_order(
+        self, shop_url: str, order_id, refund_line_items: List[dict], shipping_amount
+    ):
+        """
+        refund_line_items are RefundLineItemInput objects, for example
+        {"lineItemId": "gid://shopify/LineItem/1", "quantity": 1}.
+        """
+        data = await self._execute(
+            shop_url,
+            queries.REFUND_ORDER,
+            {
+                "input": {
+                    "orderId": f"gid://shopify/Order/{order_id}",
+                    "notify": True,
+                    "note": "Customer canceled order before it was shipped",
+                    "shipping": {"amount": str(shipping_amount), "fullRefund": True},
+                    "refundLineItems": refund_line_items,
                 }
-            }"""
-            )
+            },
+        )
+        await self._invalidate_projected_order(order_id)
+        return data
+
+    async def get_fulfillment_orders_by_id(self, shop_url: str, order_id):
+        data = await self._execute(
+            shop_url,
+            queries.GET_FULFILLMENT_ORDERS_BY_ID,
+            {"id": f"gid://shopify/Order/{order_id}"},
+        )
 
-            result = json.loads(data)
-            order_details = result.get("data", {}).get("order", {})
-            line_items = []
-            for edge in (
-                order_details.get("fulfillmentOrders", {})
-                .get("edges", [])[0]
-                .get("node", {})
-                .get("lineItems", {})
-                .get("edges", [])
-            ):
-                node = edge.get("node", {}).get("lineItem", {})
-                current_quantity = node.get("currentQuantity", 0)
-                refundable_quantity = node.get("refundableQuantity", 0)
-                if current_quantity == refundable_quantity == 0:
-                    continue
-                line_items.append(edge)
+        result = data
+        order_details = result.get("data", {}).get("order", {})
+        line_items = []
+        for edge in (
+            order_details.get("fulfillmentOrders", {})
+            .get("edges", [])[0]
+            .get("node", {})
+            .get("lineItems", {})
+            .get("edges", [])
+        ):
+            node = edge.get("node", {}).get("lineItem", {})
+            current_quantity = node.get("currentQuantity", 0)
+            refundable_quantity = node.get("refundableQuantity", 0)
+            if current_quantity == refundable_quantity == 0:
+                continue
+            line_items.append(edge)
+
+        result["data"]["order"]["fulfillmentOrders"]["edges"][0]["node"]["lineItems"][
+            "edges"
+        ] = line_items
+
+        line_items = []
+        for edge in order_details.get("lineItems", {}).get("edges", []):
+            node = edge.get("node", {})
+            current_quantity = node.get("currentQuantity", 0)
+            refundable_quantity = node.get("refundableQuantity", 0)
+            if current_quantity == refundable_quantity == 0:
+                continue
+            line_items.append(edge)
+
+        result["data"]["order"]["lineItems"]["edges"] = line_items
+        return result
+
+    async def get_line_item_info_by_id(self, shop_url: str, item_id: str) -> dict:
+        data = await self._execute(
+            shop_url,
+            queries.GET_LINE_ITEM_INFO_BY_ID,
+            {"id": f"gid://shopify/LineItem/{item_id}"},
+        )
+        return data
 
-            result["data"]["order"]["fulfillmentOrders"]["edges"][0]["node"][
-                "lineItems"
-            ]["edges"] = line_items
+    async def get_product_info_for_line_item(self, shop_url: str, item_id: str) -> dict:
+        data = await self._execute(
+            shop_url,
+            queries.GET_PRODUCT_INFO_FOR_LINE_ITEM,
+            {"id": f"gid://shopify/LineItem/{item_id}"},
+        )
+        return data
 
-            line_items = []
-            for edge in order_details.get("lineItems", {}).get("edges", []):
-                node = edge.get("node", {})
-                current_quantity = node.get("currentQuantity", 0)
-                refundable_quantity = node.get("refundableQuantity", 0)
-                if current_quantity == refundable_quantity == 0:
-                    continue
-                line_items.append(edge)
+    async def get_variants_for_product(self, shop_url: str, product_id: str):
+        data = await self._execute(
+            shop_url,
+            queries.GET_VARIANTS_FOR_PRODUCT,
+            {"id": f"gid://shopify/Product/{product_id}"},
+        )
+        result = data
+        default_image = (
+            result.get("data", {}).get("product", {}).get("featuredImage", {})
+        )
+        variants = (
+            result.get("data", {})
+            .get("product", {})
+            .get("variants", {})
+            .get("edges", [])
+        )
+        for index, variant in enumerate(variants):
+            image = variant.get("node", {}).get("image", {})
+            if not image:
+                result["data"]["product"]["variants"]["edges"][index]["node"][
+                    "image"
+                ] = default_image
+
+        return result
+
+    async def get_all_variants_for_order(self, shop_url: str, order_id: str) -> dict:
+        data = await self._execute(
+            shop_url,
+            queries.GET_ALL_VARIANTS_FOR_ORDER,
+            {"id": f"gid://shopify/Order/{order_id}"},
+        )
+        return data
 
-            result["data"]["order"]["lineItems"]["edges"] = line_items
-            return result
-
-    def get_line_item_info_by_id(self, shop_url: str, item_id: str) -> dict:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """
-                query {
-                    node(id: "gid://shopify/LineItem/"""
-                + item_id
-                + """") {
-                    ... on LineItem {
-                        id
-                        name
-                        discountedUnitPriceSet {
-                            shopMoney {
-                                amount
-                                currencyCode
-                            }
-                        }
-                        quantity
-                        discountAllocations {
-                            allocatedAmountSet {
-                                shopMoney {
-                                    amount
-                                    currencyCode
-                                }
-                            }
-                            discountApplication {
-                                allocationMethod
-                            }
-                        }
-                        taxLines {
-                            title
-                            priceSet {
-                                shopMoney {
-                                    amount
-                                    currencyCode
-                                }
-                            }
-                        }
-                        sku
-                        image {
-                            url
-                        }
-                    }
-                }
-                }
-                """
-            )
-            return json.loads(data)
-
-    def get_product_info_for_line_item(self, shop_url: str, item_id: str) -> dict:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """
-                query {
-                    node(id: "gid://shopify/LineItem/"""
-                + item_id
-                + """") {
-                           ... on LineItem {
-                               id
-      name
-      product {
-        id
-        variants(first: 100) {
-          edges {
-            node {
-              id
-              price
-              availableForSale
-              inventoryQuantity
-              displayName
-              selectedOptions {
-                name
-                value
-              }
-              image {
-                url
-                id
-              }
-            }
-          }
-        }
-      }
-                           }
-                       }
-                       }
-                       """
-            )
-            return json.loads(data)
-
-    def get_variants_for_product(self, shop_url: str, product_id: str):
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """{
-                    product(id: "gid://shopify/Product/"""
-                + product_id
-                + """") {
-                        id
-                        featuredImage {
-                            id
-                            url
-                        }
-                        variants(first: 100) {
-      edges {
-        node {
-          id
-          title
-          displayName
-          availableForSale
-          inventoryQuantity
-          selectedOptions {
-            name
-            value
-          }
-          price
-          image {
-            url
-            id
-          }
-        }
-      }
-    }
-                    }
-                }"""
-            )
-            result = json.loads(data)
-            default_image = (
-                result.get("data", {}).get("product", {}).get("featuredImage", {})
-            )
-            variants = (
-                result.get("data", {})
-                .get("product", {})
-                .get("variants", {})
-                .get("edges", [])
-            )
-            for index, variant in enumerate(variants):
-                image = variant.get("node", {}).get("image", {})
-                if not image:
-                    result["data"]["product"]["variants"]["edges"][index]["node"][
-                        "image"
-                    ] = default_image
-
-            return result
-
-    def get_all_variants_for_order(self, shop_url: str, order_id: str) -> dict:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """{
-                order(id: "gid://shopify/Order/"""
-                + order_id
-                + """") {
-                            id
-    name
-    displayFinancialStatus
-    displayFulfillmentStatus
-    customer {
-      id
-      firstName
-      lastName
-      displayName
-      email
-      phone
-    }
-    lineItems(first: 10) {
-      edges {
-        node {
-          id
-          image {
-            id
-            url
-          }
-          quantity
-          currentQuantity
-          variant {
-            displayName
-            selectedOptions {
-              name
-              value
-            }
-          }
-          product {
-            id
-            variants(first: 20) {
-              edges {
-                node {
-                  id
-                  displayName
-                  selectedOptions {
-                    name
-                    value
-                  }
-                  image {
-                    url
-                    id
-                  }
-                }
-              }
-            }
-          }
-        }
-      }
-    }
-                        }
-                    }"""
-            )
-            return json.loads(data)
-
-    def begin_order_edit(self, shop_url: str, order_id: str) -> dict:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """
-                mutation
-                    beginEdit {
-                        orderEditBegin(id: "gid://shopify/Order/"""
-                + order_id
-                + """"){
-                            calculatedOrder{
-                                id
-                            }
-                        }
-                    }
-                """
-            )
-            return json.loads(data)
+    async def begin_order_edit(self, shop_url: str, order_id: str) -> dict:
+        data = await self._execute(
+            shop_url,
+            queries.BEGIN_ORDER_EDIT,
+            {"id": f"gid://shopify/Order/{order_id}"},
+        )
+        return data
 
-    def add_variant_to_order(
+    async def add_variant_to_order(
         self, shop_url: str, calc_order_id: str, variant_id: str, quantity: int
     ) -> dict:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """
-                mutation
-                    addVariantToOrder {
-                        orderEditAddVariant(id: "gid://shopify/CalculatedOrder/"""
-                + calc_order_id
-                + """", variantId: "gid://shopify/ProductVariant/"""
-                + variant_id
-                + """", quantity: """
-                + str(quantity)
-                + """) {
-                            calculatedOrder {
-                                id
-                                addedLineItems(first:5) {
-                                    edges {
-                                        node {
-                                            id
-                                            quantity
-                                        }
-                                    }
-                                }
-                            }
-                            userErrors {
-                                field
-                                message
-                            }
-                        }
-                    }
-                """
-            )
-            return json.loads(data)
+        data = await self._execute(
+            shop_url,
+            queries.ADD_VARIANT_TO_ORDER,
+            {
+                "id": f"gid://shopify/CalculatedOrder/{calc_order_id}",
+                "variantId": f"gid://shopify/ProductVariant/{variant_id}",
+                "quantity": int(quantity),
+            },
+        )
+        return data
 
-    def set_line_item_quantity(
+    async def set_line_item_quantity(
         self, shop_url: str, calc_order_id: str, line_item_id: str, quantity
     ) -> dict:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """
-                mutation
-                    increaseLineItemQuantity {
-                        orderEditSetQuantity(id: "gid://shopify/CalculatedOrder/"""
-                + calc_order_id
-                + """", lineItemId: "gid://shopify/CalculatedLineItem/"""
-                + line_item_id
-                + """", quantity: """
-                + str(quantity)
-                + """) {
-                            calculatedOrder {
-                                id
-                                addedLineItems(first: 5) {
-                                    edges {
-                                        node {
-                                            id
-                                            quantity
-                                        }
-                                    }
-                                }
-                            }
-                            userErrors {
-                                field
-                                message
-                            }
-                        }
-                    }
-                """
-            )
-            return json.loads(data)
-
-    def get_calculated_order_by_id(self, shop_url: str, calc_order_id: str) -> dict:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """
-                query {
-                    node(id: "gid://shopify/CalculatedOrder/"""
-                + calc_order_id
-                + """") {
-                        ... on CalculatedOrder {
-                            id
-                            taxLines {
-                                priceSet {
-                                    shopMoney {
-                                        amount
-                                    }
-                                }
-                            }
-                            totalOutstandingSet {
-                                shopMoney {
-                                    amount
-                                }
-                            }
-                            totalPriceSet {
-                                shopMoney {
-                                    amount
-                                    currencyCode
-                                }
-                            }
-                            subtotalPriceSet {
-                                shopMoney {
-                                    amount
-                                    currencyCode
-                                }
-                            }
-
-                            cartDiscountAmountSet {
-                                shopMoney {
-                                    amount
-                                    currencyCode
-                                }
-                            }
-                            lineItems(first: 10) {
-                                edges {
-                                    node {
-                                        id
-                                        image {
-                                            url
-                                        }
-                                        quantity
-                                        originalUnitPriceSet {
-                                            shopMoney {
-                                                amount
-                                                currencyCode
-                                            }
-                                        }
-                                        discountedUnitPriceSet {
-                                            shopMoney {
-                                                amount
-                                                currencyCode
-                                            }
-                                        }
-                                        calculatedDiscountAllocations {
-                                            allocatedAmountSet {
-                                                shopMoney {
-                                                  amount
-                                                  currencyCode
-                                                }
-                                            }
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    }
-                }
-                """
-            )
-            return json.loads(data)
-
-    def commit_edit_order(self, shop_url: str, calc_order_id: str) -> dict:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """
-                mutation
-                    commitEdit {
-                        orderEditCommit(id: "gid://shopify/CalculatedOrder/"""
-                + calc_order_id
-                + """", notifyCustomer: true, staffNote: "Order was updated by chad") {
-                            order {
-                                id
-                            }
-                            userErrors {
-                                field
-                                message
-                            }
-                        }
-                    }
-                """
-            )
-            return json.loads(data)
+        data = await self._execute(
+            shop_url,
+            queries.SET_LINE_ITEM_QUANTITY,
+            {
+                "id": f"gid://shopify/CalculatedOrder/{calc_order_id}",
+                "lineItemId": f"gid://shopify/CalculatedLineItem/{line_item_id}",
+                "quantity": int(quantity),
+            },
+        )
+        return data
+
+    async def get_calculated_order_by_id(
+        self, shop_url: str, calc_order_id: str
+    ) -> dict:
+        data = await self._execute(
+            shop_url,
+            queries.GET_CALCULATED_ORDER_BY_ID,
+            {"id": f"gid://shopify/CalculatedOrder/{calc_order_id}"},
+        )
+        return data
 
-    def refund_owed_amount(
+    async def commit_edit_order(self, shop_url: str, calc_order_id: str) -> dict:
+        data = await self._execute(
+            shop_url,
+            queries.COMMIT_EDIT_ORDER,
+            {"id": f"gid://shopify/CalculatedOrder/{calc_order_id}"},
+        )
+        order = ((data.get("data") or {}).get("orderEditCommit") or {}).get(
+            "order"
+        ) or {}
+        if order.get("id"):
+            await self._invalidate_projected_order(gid_to_id(order["id"]))
+        return data
+
+    async def refund_owed_amount(
         self,
         shop_url: str,
         order_id: str,
@@ -1397,197 +818,100 @@ class ShopifyClient:
         gateway: str,
         parent_id: str,
     ) -> dict:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """
-                mutation {
-                    refundCreate(
-                        input: {
-                            orderId: "gid://shopify/Order/"""
-                + order_id
-                + """"
-                                        notify: true
-                                        note: "Customer edited order to a cheaper item. Refund was issued on the price difference between original item ordered and the new item."
-                                        transactions: [
-                                            {
-                                                amount: """
-                + refund_amount
-                + """
-                                                orderId: "gid://shopify/Order/"""
-                + order_id
-                + '''"
-                                                kind: REFUND
-                                                gateway: "'''
-                + gateway
-                + '''"
-                                                parentId: "'''
-                + parent_id
-                + """"
-                                            }
-                                        ]
-                                    }
-                                ) {
-                                    userErrors {
-                                        field
-                                        message
-                                    }
-                                    refund {
-                                        id
-                                    }
-                                }
-                            }
-                            """
-            )
-            return json.loads(data)
-
-    def send_order_invoice(self, shop_url: str, order_id: str) -> dict:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """
-                    mutation {
-                        orderInvoiceSend(
-                            id: "gid://shopify/Order/"""
-                + order_id
-                + """"
-                        ) {
-                            order {
-                                id
-                            }
-                            userErrors {
-                                field
-                                message
-                            }
-                        }
-                    }
-                """
-            )
-            return json.loads(data)
-
-    def get_only_order_status(self, shop_url: str, order_id: str):
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """{
-                order(id: "gid://shopify/Order/"""
-                + order_id
-                + """") {
-                    id
-                    name
-                    createdAt
-                    updatedAt
-                    displayFinancialStatus
-                    displayFulfillmentStatus
-                    totalOutstandingSet {
-                        shopMoney {
-                            amount
-                            currencyCode
-                        }
-                    }
-                    customer {
-                        id
-                        firstName
-                        lastName
-                        displayName
-                        email
-                        phone
-                    }
+        data = await self._execute(
+            shop_url,
+            queries.REFUND_OWED_AMOUNT,
+            {
+                "input": {
+                    "orderId": f"gid://shopify/Order/{order_id}",
+                    "notify": True,
+                    "note": "Customer edited order to a cheaper item. Refund was issued on the price difference between original item ordered and the new item.",
+                    "transactions": [
+                        {
+                            "amount": refund_amount,
+                            "orderId": f"gid://shopify/Order/{order_id}",
+                            "kind": "REFUND",
+                            "gateway": gateway,
+                            "parentId": parent_id,
+                        }
+                    ],
                 }
-            }"""
-            )
+            },
+        )
+        return data
+
+    async def send_order_invoice(self, shop_url: str, order_id: str) -> dict:
+        data = await self._execute(
+            shop_url,
+            queries.SEND_ORDER_INVOICE,
+            {"id": f"gid://shopify/Order/{order_id}"},
+        )
+        return data
+
+    async def get_only_order_status(self, shop_url: str, order_id: str):
+        data = await self._execute(
+            shop_url,
+            queries.GET_ONLY_ORDER_STATUS,
+            {"id": f"gid://shopify/Order/{order_id}"},
+        )
 
-            return json.loads(data)
+        return data
 
-    def get_order_id_by_fulfillment_id(
+    async def get_order_id_by_fulfillment_id(
         self, shop_url: str, fulfillment_id: str
     ) -> dict:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """
-                query {
-                    fulfillment(id: "gid://shopify/Fulfillment/"""
-                + fulfillment_id
-                + """") {
-                        order {
-                            id
-                        }
-                    }
-                }
-                """
-            )
-            return json.loads(data)
-
-    def create_webhook(self, shop_url: str, topic: str, callback_url: str) -> dict:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """
-                mutation {
-                    webhookSubscriptionCreate(
-                        topic: """
-                + topic
-                + """
-                        webhookSubscription: {
-                            format: JSON,
-                            callbackUrl: "https://"""
-                + callback_url.replace("https://", "")
-                + """"
-                        }
-                    )
-                    {
-                        userErrors {
-                            field
-                            message
-                        }
-                        webhookSubscription {
-                            id
-                        }
-                    }
-                }
-                """
-            )
-            return json.loads(data)
+        data = await self._execute(
+            shop_url,
+            queries.GET_ORDER_ID_BY_FULFILLMENT_ID,
+            {"id": f"gid://shopify/Fulfillment/{fulfillment_id}"},
+        )
+        return data
+
+    async def create_webhook(
+        self, shop_url: str, topic: str, callback_url: str
+    ) -> dict:
+        data = await self._execute(
+            shop_url,
+            queries.CREATE_WEBHOOK,
+            {
+                "topic": topic,
+                "webhookSubscription": {
+                    "format": "JSON",
+                    "callbackUrl": "https://" + callback_url.replace("https://", ""),
+                },
+            },
+        )
+        return data
 
-    def make_unfulfilled_order_on_hold(
+    async def make_unfulfilled_order_on_hold(
         self, shop_url: str, fulfillment_order_id: str, reason_notes: str
     ) -> dict:
-        temp_session = self.initiate_temporary_session(shop_url)
-        with temp_session:
-            data = shopify.GraphQL().execute(
-                """
-                mutation {
-                    fulfillmentOrderHold(
-                        fulfillmentHold: {
-                            reason: OTHER
-                            reasonNotes: """
-                + '''"'''
-                + reason_notes
-                + '''"'''
-                + """
-                            notifyMerchant: false
-                        },
-                        id: "gid://shopify/FulfillmentOrder/"""
-                + fulfillment_order_id
-                + """"
-                    )
-                    {
-                        fulfillmentOrder {
-                            id
-                            status
-                            requestStatus
-                            fulfillmentHolds {
-                                reason
-                                reasonNotes
-                            }
-                        }
-                        userErrors {
-                            field
-                            message
-                        }
-                    }
-                }
-                """
-            )
-            return json.loads(data)
+        data = await self._execute(
+            shop_url,
+            queries.MAKE_UNFULFILLED_ORDER_ON_HOLD,
+            {
+                "id": f"gid://shopify/FulfillmentOrder/{fulfillment_order_id}",
+                "fulfillmentHold": {
+                    "reason": "OTHER",
+                    "reasonNotes": reason_notes,
+                    "notifyMerchant": False,
+                },
+            },
+        )
+        return data
+
+    async def run_bulk_query(self, shop_url: str, query: str) -> dict:
+        data = await self._execute(shop_url, queries.RUN_BULK_QUERY, {"query": query})
+        return data
+
+    async def get_bulk_operation(self, shop_url: str, operation_id: str) -> dict:
+        data = await self._execute(
+            shop_url, queries.GET_BULK_OPERATION, {"id": operation_id}
+        )
+        return data
+
+    async def cancel_bulk_operation(self, shop_url: str, operation_id: str) -> dict:
+        data = await self._execute(
+            shop_url, queries.CANCEL_BULK_OPERATION, {"id": operation_id}
+        )
+        return data
@@ -0,0 +1,1405 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Shared selections, appended to every document that spreads them.
+FRAGMENTS = {
+    "Money": """
+        fragment Money on MoneyBag {
+            shopMoney {
+                amount
+                currencyCode
+            }
+        }
+    """,
+    "CustomerContact": """
+        fragment CustomerContact on Customer {
+            id
+            firstName
+            lastName
+            displayName
+            email
+            phone
+        }
+    """,
+    "ShippingAddress": """
+        fragment ShippingAddress on MailingAddress {
+            id
+            address1
+            address2
+            city
+            company
+            country
+            countryCodeV2
+            name
+            firstName
+            lastName
+            phone
+            province
+            provinceCode
+            zip
+            latitude
+            longitude
+            coordinatesValidated
+        }
+    """,
+    "PageInfo": """
+        fragment PageInfo on PageInfo {
+            startCursor
+            endCursor
+            hasNextPage
+            hasPreviousPage
+        }
+    """,
+    "OrderListItem": """
+        fragment OrderListItem on Order {
+            id
+            name
+            createdAt
+            displayFinancialStatus
+            displayFulfillmentStatus
+            fulfillments {
+                id
+                name
+                createdAt
+                updatedAt
+                deliveredAt
+                status
+                displayStatus
+                estimatedDeliveryAt
+                requiresShipping
+                trackingInfo {
+                    number
+                    company
+                    url
+                }
+            }
+            totalPriceSet {
+                ...Money
+            }
+            currentTotalPriceSet {
+                ...Money
+            }
+            totalOutstandingSet {
+                ...Money
+            }
+            refunds(first: 10) {
+                id
+                totalRefundedSet {
+                    ...Money
+                }
+            }
+            lineItems(first: 10) {
+                edges {
+                    node {
+                        id
+                        name
+                        image {
+                            url
+                        }
+                        currentQuantity
+                        refundableQuantity
+                    }
+                }
+            }
+        }
+    """,
+    # Pages with the $first and $after variables of the operation that spreads it.
+    "CustomerOrders": """
+        fragment CustomerOrders on Customer {
+            orders(first: $first, after: $after, sortKey: CREATED_AT, reverse: true) {
+                edges {
+                    cursor
+                    node {
+                        ...OrderListItem
+                    }
+                }
+                pageInfo {
+                    ...PageInfo
+                }
+            }
+        }
+    """,
+    "OrderSummary": """
+        fragment OrderSummary on Order {
+            id
+            name
+            createdAt
+            displayFinancialStatus
+            displayFulfillmentStatus
+            fulfillments {
+                id
+                name
+                createdAt
+                deliveredAt
+                displayStatus
+                estimatedDeliveryAt
+            }
+            totalPriceSet {
+                ...Money
+            }
+            currentTotalPriceSet {
+                ...Money
+            }
+            lineItems(first: 10) {
+                edges {
+                    node {
+                        id
+                        name
+                        image {
+                            url
+                        }
+                    }
+                }
+            }
+        }
+    """,
+    "OrderLineItem": """
+        fragment OrderLineItem on LineItem {
+            id
+            name
+            image {
+                url
+            }
+            variant {
+                id
+                title
+                displayName
+                selectedOptions {
+                    name
+                    value
+                }
+            }
+            product {
+                id
+                totalVariants
+            }
+            quantity
+            currentQuantity
+            refundableQuantity
+            originalUnitPriceSet {
+                ...Money
+            }
+            discountedUnitPriceSet {
+                ...Money
+            }
+            discountedTotalSet {
+                ...Money
+            }
+            discountAllocations {
+                allocatedAmountSet {
+                    ...Money
+                }
+            }
+        }
+    """,
+    "VariantDetails": """
+        fragment VariantDetails on ProductVariant {
+            id
+            title
+            displayName
+            availableForSale
+            inventoryQuantity
+            selectedOptions {
+                name
+                value
+            }
+            price
+            image {
+                url
+                id
+            }
+        }
+    """,
+}
+
+_NAME_CHARS = re.compile(r"[A-Za-z0-9_]")
+_FRAGMENT_SPREAD = re.compile(r"\.\.\.\s*(?!on\b)([A-Za-z_][A-Za-z0-9_]*)")
+
+
+def minify(document: str) -> str:
+    """
+    Drops the whitespace and commas GraphQL ignores, keeping a single space only where two names would otherwise
+    merge. String literals are copied unchanged.
+    """
+    out = []
+    pending_space = False
+    i = 0
+    while i < len(document):
+        char = document[i]
+        if char == '"':
+            end = i + 1
+            while document[end] != '"':
+                end += 2 if document[end] == "\\" else 1
+            out.append(document[i : end + 1])
+            pending_space = False
+            i = end + 1
+            continue
+        if char.isspace() or char == ",":
+            pending_space = True
+        else:
+            if pending_space and out and _NAME_CHARS.match(out[-1][-1]) and _NAME_CHARS.match(char):
+                out.append(" ")
+            out.append(char)
+            pending_space = False
+        i += 1
+    return "".join(out)
+
+
+def _fragments_used(document: str) -> List[str]:
+    used = []
+    pending = _FRAGMENT_SPREAD.findall(document)
+    while pending:
+        name = pending.pop(0)
+        if name in used:
+            continue
+        used.append(name)
+        pending.extend(_FRAGMENT_SPREAD.findall(FRAGMENTS[name]))
+    return used
+
+
+@dataclass(frozen=True)
+class GraphQLQuery:
+    name: str
+    document: str
+    hash: str
+
+    @property
+    def is_mutation(self) -> bool:
+        return self.document.startswith("mutation")
+
+
+QUERIES: Dict[str, GraphQLQuery] = {}
+
+
+def register(name: str, document: str) -> GraphQLQuery:
+    """
+    Builds the final document once: the operation plus every fragment it spreads, minified. The hash is the sha256 of
+    that document, so it only changes when the query does.
+    """
+    if name in QUERIES:
+        raise ValueError(f"GraphQL query {name} is already registered.")
+    full_document = minify(" ".join([document] + [FRAGMENTS[fragment] for fragment in _fragments_used(document)]))
+    query = GraphQLQuery(name=name, document=full_document, hash=hashlib.sha256(full_document.encode()).hexdigest())
+    QUERIES[name] = query
+    return query
+
+
+GET_PRODUCTS = register(
+    "GetProducts",
+    """
+    query GetProducts {
+        products(first: 10) {
+            edges {
+                node {
+                    id
+                    title
+                }
+            }
+        }
+    }
+    """,
+)
+
+GET_COUPON_BY_TITLE = register(
+    "GetCouponByTitle",
+    """
+    query GetCouponByTitle($code: String!) {
+        codeDiscountNodeByCode(code: $code) {
+            id
+            codeDiscount {
+                __typename
+                ... on DiscountCodeApp {
+                    status
+                    title
+                }
+                ... on DiscountCodeBasic {
+                    status
+                    title
+                }
+                ... on DiscountCodeBxgy {
+                    status
+                    title
+                }
+                ... on DiscountCodeFreeShipping {
+                    status
+                    title
+                }
+            }
+        }
+    }
+    """,
+)
+
+GET_CUSTOMER_BY_ORDER_ID = register(
+    "GetCustomerByOrderId",
+    """
+    query GetCustomerByOrderId($id: ID!) {
+        order(id: $id) {
+            customer {
+                ...CustomerContact
+            }
+        }
+    }
+    """,
+)
+
+# Top-level selections of an order, in document order. GetOrderById selects all of them, the order endpoint can ask
+# for a subset, see order_query.
+ORDER_FIELDS: Dict[str, str] = {
+    "id": "id",
+    "name": "name",
+    "createdAt": "createdAt",
+    "updatedAt": "updatedAt",
+    "processedAt": "processedAt",
+    "displayFinancialStatus": "displayFinancialStatus",
+    "displayFulfillmentStatus": "displayFulfillmentStatus",
+    "location": "location",
+    "currencyCode": "currencyCode",
+    "customer": """
+        customer {
+            ...CustomerContact
+        }
+    """,
+    "shippingAddress": """
+        shippingAddress {
+            ...ShippingAddress
+        }
+    """,
+    "fulfillments": """
+        fulfillments {
+            id
+            name
+            createdAt
+            updatedAt
+            deliveredAt
+            status
+            displayStatus
+            estimatedDeliveryAt
+            requiresShipping
+            trackingInfo {
+                number
+                company
+                url
+            }
+        }
+    """,
+    "totalShippingPriceSet": "totalShippingPriceSet { ...Money }",
+    "totalTaxSet": "totalTaxSet { ...Money }",
+    "currentTotalTaxSet": "currentTotalTaxSet { ...Money }",
+    "totalPriceSet": "totalPriceSet { ...Money }",
+    "currentTotalPriceSet": "currentTotalPriceSet { ...Money }",
+    "subtotalPriceSet": "subtotalPriceSet { ...Money }",
+    "currentSubtotalPriceSet": "currentSubtotalPriceSet { ...Money }",
+    "totalDiscountsSet": "totalDiscountsSet { ...Money }",
+    "currentTotalDiscountsSet": "currentTotalDiscountsSet { ...Money }",
+    "totalOutstandingSet": "totalOutstandingSet { ...Money }",
+    "transactions": """
+        transactions {
+            gateway
+            id
+            kind
+            amountSet {
+                ...Money
+            }
+        }
+    """,
+    "refunds": """
+        refunds(first: 10) {
+            id
+            totalRefundedSet {
+                ...Money
+            }
+        }
+    """,
+    "lineItems": """
+        lineItems(first: 10) {
+            edges {
+                node {
+                    ...OrderLineItem
+                }
+            }
+        }
+    """,
+}
+
+# Always selected: ownership, the chad status, tracking, lateness and the refunded amount are derived from them.
+ORDER_REQUIRED_FIELDS = (
+    "id",
+    "name",
+    "createdAt",
+    "updatedAt",
+    "displayFinancialStatus",
+    "displayFulfillmentStatus",
+    "customer",
+    "fulfillments",
+    "currentTotalPriceSet",
+    "totalOutstandingSet",
+    "refunds",
+)
+
+ORDER_PROFILES: Dict[str, Tuple[str, ...]] = {
+    # The header of an order card.
+    "summary": ORDER_REQUIRED_FIELDS + ("totalPriceSet",),
+    "detail": tuple(ORDER_FIELDS),
+    # What the order edit screens read: items, address and every total that changes with them.
+    "edit": ORDER_REQUIRED_FIELDS
+    + (
+        "currencyCode",
+        "shippingAddress",
+        "totalShippingPriceSet",
+        "currentTotalTaxSet",
+        "currentSubtotalPriceSet",
+        "currentTotalDiscountsSet",
+        "lineItems",
+    ),
+}
+
+
+def _order_document(name: str, fields: Iterable[str]) -> str:
+    selection = " ".join(ORDER_FIELDS[field] for field in ORDER_FIELDS if field in fields)
+    return f"query {name}($id: ID!) {{ order(id: $id) {{ {selection} }} }}"
+
+
+GET_ORDER_BY_ID = register("GetOrderById", _order_document("GetOrderById", ORDER_FIELDS))
+
+# Field sets are chosen by clients, past this many distinct ones the whole order is queried and trimmed instead.
+MAX_ORDER_QUERIES = 64
+
+_ORDER_QUERIES: Dict[FrozenSet[str], GraphQLQuery] = {frozenset(ORDER_FIELDS): GET_ORDER_BY_ID}
+
+
+def parse_order_fields(value: Optional[str]) -> Optional[FrozenSet[str]]:
+    """
+    Parses the `fields` parameter of the order endpoint: comma separated profile names (summary, detail, edit) and
+    top-level order fields, e.g. "summary,shippingAddress". The required fields are always added.
+
+    Returns:
+        frozenset: The selected fields, None for the whole order.
+
+    Raises:
+        ValueError: For names that are neither a profile nor an order field.
+    """
+    if not value:
+        return None
+    fields = set(ORDER_REQUIRED_FIELDS)
+    for name in filter(None, (part.strip() for part in value.split(","))):
+        if name in ORDER_PROFILES:
+            fields.update(ORDER_PROFILES[name])
+        elif name in ORDER_FIELDS:
+            fields.add(name)
+        else:
+            raise ValueError(f"Unknown order field {name}.")
+    return None if fields >= set(ORDER_FIELDS) else frozenset(fields)
+
+
+def order_query(fields: Optional[FrozenSet[str]] = None) -> GraphQLQuery:
+    """
+    GetOrderById reduced to the given top-level fields, registered on first use. Profiles get a readable name, other
+    field sets one derived from the fields, so the rate limiter learns the cost of each selection separately. The
+    returned query can select more than asked for, see select_order_fields.
+    """
+    fields = frozenset(ORDER_FIELDS) if fields is None else fields
+    query = _ORDER_QUERIES.get(fields)
+    if query is None and len(_ORDER_QUERIES) >= MAX_ORDER_QUERIES:
+        return GET_ORDER_BY_ID
+    if query is None:
+        profile = next((name for name, selected in ORDER_PROFILES.items() if frozenset(selected) == fields), None)
+        if profile:
+            name = f"GetOrderById{profile.capitalize()}"
+        else:
+            name = f"GetOrderByIdFields{hashlib.sha256(','.join(sorted(fields)).encode()).hexdigest()[:8]}"
+        query = _ORDER_QUERIES[fields] = register(name, _order_document(name, fields))
+    return query
+
+
+def select_order_fields(order: dict, fields: Optional[FrozenSet[str]]) -> dict:
+    """
+    Trims a complete order, e.g. one read from the order projection, to the selected fields.
+    """
+    if fields is None:
+        return order
+    return {key: value for key, value in order.items() if key in fields}
+
+
+GET_ORDER_BY_NUMBER = register(
+    "GetOrderByNumber",
+    """
+    query GetOrderByNumber($query: String!) {
+        orders(first: 10, query: $query) {
+            edges {
+                node {
+                    id
+                    name
+                    createdAt
+                    email
+                    fulfillments {
+                        id
+                        displayStatus
+                    }
+                    customer {
+                        id
+                        email
+                    }
+                }
+            }
+            pageInfo {
+                ...PageInfo
+            }
+        }
+    }
+    """,
+)
+
+GET_ORDER_BY_EMAIL = register(
+    "GetOrderByEmail",
+    """
+    query GetOrderByEmail($query: String!) {
+        orders(first: 10, query: $query, sortKey: CREATED_AT, reverse: true) {
+            edges {
+                node {
+                    ...OrderSummary
+                }
+            }
+            pageInfo {
+                ...PageInfo
+            }
+        }
+        customers(first: 1, query: $query) {
+            edges {
+                node {
+                    id
+                    firstName
+                    lastName
+                }
+            }
+            pageInfo {
+                ...PageInfo
+            }
+        }
+    }
+    """,
+)
+
+GET_ORDERS_BY_CUSTOMER_ID = register(
+    "GetOrdersByCustomerId",
+    """
+    query GetOrdersByCustomerId($id: ID!, $first: Int!, $after: String) {
+        customer(id: $id) {
+            id
+            firstName
+            lastName
+            ...CustomerOrders
+        }
+    }
+    """,
+)
+
+GET_CUSTOMER_WITH_ORDERS_BY_EMAIL = register(
+    "GetCustomerWithOrdersByEmail",
+    """
+    query GetCustomerWithOrdersByEmail($query: String!, $first: Int!, $after: String) {
+        customers(first: 1, query: $query) {
+            edges {
+                node {
+                    id
+                    firstName
+                    lastName
+                    ...CustomerOrders
+                }
+            }
+            pageInfo {
+                ...PageInfo
+            }
+        }
+    }
+    """,
+)
+
+GET_CUSTOMER_BY_EMAIL = register(
+    "GetCustomerByEmail",
+    """
+    query GetCustomerByEmail($query: String!) {
+        customers(first: 1, query: $query) {
+            edges {
+                node {
+                    id
+                    firstName
+                    lastName
+                }
+            }
+            pageInfo {
+                ...PageInfo
+            }
+        }
+    }
+    """,
+)
+
+CHANGE_SHIPPING_ADDRESS = register(
+    "ChangeShippingAddress",
+    """
+    mutation ChangeShippingAddress($input: OrderInput!) {
+        orderUpdate(input: $input) {
+            order {
+                id
+            }
+            userErrors {
+                field
+                message
+            }
+        }
+    }
+    """,
+)
+
+REFUND_ORDER = register(
+    "RefundOrder",
+    """
+    mutation RefundOrder($input: RefundInput!) {
+        refundCreate(input: $input) {
+            refund {
+                id
+                order {
+                    currencyCode
+                    totalTaxSet {
+                        ...Money
+                    }
+                    updatedAt
+                    createdAt
+                    processedAt
+                    totalRefundedSet {
+                        ...Money
+                    }
+                    totalPriceSet {
+                        ...Money
+                    }
+                    subtotalPriceSet {
+                        ...Money
+                    }
+                }
+                totalRefundedSet {
+                    ...Money
+                }
+                refundLineItems(first: 100) {
+                    edges {
+                        node {
+                            lineItem {
+                                id
+                                name
+                                image {
+                                    url
+                                }
+                                quantity
+                                currentQuantity
+                                totalDiscountSet {
+                                    ...Money
+                                }
+                                discountedTotalSet {
+                                    ...Money
+                                }
+                                originalUnitPriceSet {
+                                    ...Money
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+            userErrors {
+                field
+                message
+            }
+        }
+    }
+    """,
+)
+
+GET_FULFILLMENT_ORDERS_BY_ID = register(
+    "GetFulfillmentOrdersById",
+    """
+    query GetFulfillmentOrdersById($id: ID!) {
+        order(id: $id) {
+            id
+            name
+            createdAt
+            updatedAt
+            processedAt
+            displayFinancialStatus
+            displayFulfillmentStatus
+            location
+            currencyCode
+            customer {
+                ...CustomerContact
+            }
+            shippingAddress {
+                ...ShippingAddress
+            }
+            fulfillments {
+                id
+                name
+                createdAt
+                updatedAt
+                deliveredAt
+                status
+                displayStatus
+                estimatedDeliveryAt
+                trackingInfo {
+                    number
+                    company
+                    url
+                }
+            }
+            totalShippingPriceSet {
+                ...Money
+            }
+            totalTaxSet {
+                ...Money
+            }
+            currentTotalTaxSet {
+                ...Money
+            }
+            totalPriceSet {
+                ...Money
+            }
+            currentTotalPriceSet {
+                ...Money
+            }
+            subtotalPriceSet {
+                ...Money
+            }
+            currentSubtotalPriceSet {
+                ...Money
+            }
+            totalDiscountsSet {
+                ...Money
+            }
+            currentTotalDiscountsSet {
+                ...Money
+            }
+            totalOutstandingSet {
+                ...Money
+            }
+            transactions {
+                gateway
+                id
+                kind
+                amountSet {
+                    ...Money
+                }
+            }
+            refunds(first: 10) {
+                id
+                totalRefundedSet {
+                    ...Money
+                }
+            }
+            lineItems(first: 10) {
+                edges {
+                    node {
+                        id
+                        name
+                        image {
+                            url
+                        }
+                        variant {
+                            id
+                            title
+                            displayName
+                            selectedOptions {
+                                name
+                                value
+                            }
+                        }
+                        product {
+                            id
+                            totalVariants
+                        }
+                        currentQuantity
+                        refundableQuantity
+                        originalUnitPriceSet {
+                            ...Money
+                        }
+                        discountedUnitPriceSet {
+                            ...Money
+                        }
+                        discountedTotalSet {
+                            ...Money
+                        }
+                        discountAllocations {
+                            allocatedAmountSet {
+                                ...Money
+                            }
+                        }
+                    }
+                }
+            }
+            fulfillmentOrders(first: 10) {
+                edges {
+                    node {
+                        id
+                        lineItems(first: 10) {
+                            edges {
+                                node {
+                                    lineItem {
+                                        id
+                                        title
+                                        quantity
+                                        currentQuantity
+                                        refundableQuantity
+                                        discountedUnitPriceSet {
+                                            ...Money
+                                        }
+                                        fulfillmentService {
+                                            id
+                                            location {
+                                                id
+                                                name
+                                            }
+                                            serviceName
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+    """,
+)
+
+GET_LINE_ITEM_INFO_BY_ID = register(
+    "GetLineItemInfoById",
+    """
+    query GetLineItemInfoById($id: ID!) {
+        node(id: $id) {
+            ... on LineItem {
+                id
+                name
+                discountedUnitPriceSet {
+                    ...Money
+                }
+                quantity
+                discountAllocations {
+                    allocatedAmountSet {
+                        ...Money
+                    }
+                    discountApplication {
+                        allocationMethod
+                    }
+                }
+                taxLines {
+                    title
+                    priceSet {
+                        ...Money
+                    }
+                }
+                sku
+                image {
+                    url
+                }
+            }
+        }
+    }
+    """,
+)
+
+GET_PRODUCT_INFO_FOR_LINE_ITEM = register(
+    "GetProductInfoForLineItem",
+    """
+    query GetProductInfoForLineItem($id: ID!) {
+        node(id: $id) {
+            ... on LineItem {
+                id
+                name
+                product {
+                    id
+                    variants(first: 100) {
+                        edges {
+                            node {
+                                id
+                                price
+                                availableForSale
+                                inventoryQuantity
+                                displayName
+                                selectedOptions {
+                                    name
+                                    value
+                                }
+                                image {
+                                    url
+                                    id
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+    """,
+)
+
+GET_VARIANTS_FOR_PRODUCT = register(
+    "GetVariantsForProduct",
+    """
+    query GetVariantsForProduct($id: ID!) {
+        product(id: $id) {
+            id
+            featuredImage {
+                id
+                url
+            }
+            variants(first: 100) {
+                edges {
+                    node {
+                        ...VariantDetails
+                    }
+                }
+            }
+        }
+    }
+    """,
+)
+
+GET_ORDERS_BY_EMAIL_PAGE = register(
+    "GetOrdersByEmailPage",
+    """
+    query GetOrdersByEmailPage($query: String!, $first: Int!, $after: String) {
+        orders(first: $first, after: $after, query: $query, sortKey: CREATED_AT, reverse: true) {
+            edges {
+                cursor
+                node {
+                    ...OrderSummary
+                }
+            }
+            pageInfo {
+                ...PageInfo
+            }
+        }
+    }
+    """,
+)
+
+GET_ORDER_LINE_ITEMS_PAGE = register(
+    "GetOrderLineItemsPage",
+    """
+    query GetOrderLineItemsPage($id: ID!, $first: Int!, $after: String) {
+        order(id: $id) {
+            lineItems(first: $first, after: $after) {
+                edges {
+                    cursor
+                    node {
+                        ...OrderLineItem
+                    }
+                }
+                pageInfo {
+                    ...PageInfo
+                }
+            }
+        }
+    }
+    """,
+)
+
+# Order.refunds is a plain list, not a connection, so it can only be truncated with first.
+GET_ORDER_REFUNDS = register(
+    "GetOrderRefunds",
+    """
+    query GetOrderRefunds($id: ID!, $first: Int!) {
+        order(id: $id) {
+            refunds(first: $first) {
+                id
+                createdAt
+                note
+                totalRefundedSet {
+                    ...Money
+                }
+            }
+        }
+    }
+    """,
+)
+
+GET_PRODUCT_VARIANTS_PAGE = register(
+    "GetProductVariantsPage",
+    """
+    query GetProductVariantsPage($id: ID!, $first: Int!, $after: String) {
+        product(id: $id) {
+            featuredImage {
+                id
+                url
+            }
+            variants(first: $first, after: $after) {
+                edges {
+                    cursor
+                    node {
+                        ...VariantDetails
+                    }
+                }
+                pageInfo {
+                    ...PageInfo
+                }
+            }
+        }
+    }
+    """,
+)
+
+GET_ALL_VARIANTS_FOR_ORDER = register(
+    "GetAllVariantsForOrder",
+    """
+    query GetAllVariantsForOrder($id: ID!) {
+        order(id: $id) {
+            id
+            name
+            displayFinancialStatus
+            displayFulfillmentStatus
+            customer {
+                ...CustomerContact
+            }
+            lineItems(first: 10) {
+                edges {
+                    node {
+                        id
+                        image {
+                            id
+                            url
+                        }
+                        quantity
+                        currentQuantity
+                        variant {
+                            displayName
+                            selectedOptions {
+                                name
+                                value
+                            }
+                        }
+                        product {
+                            id
+                            variants(first: 20) {
+                                edges {
+                                    node {
+                                        id
+                                        displayName
+                                        selectedOptions {
+                                            name
+                                            value
+                                        }
+                                        image {
+                                            url
+                                            id
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+    """,
+)
+
+BEGIN_ORDER_EDIT = register(
+    "BeginOrderEdit",
+    """
+    mutation BeginOrderEdit($id: ID!) {
+        orderEditBegin(id: $id) {
+            calculatedOrder {
+                id
+            }
+        }
+    }
+    """,
+)
+
+ADD_VARIANT_TO_ORDER = register(
+    "AddVariantToOrder",
+    """
+    mutation AddVariantToOrder($id: ID!, $variantId: ID!, $quantity: Int!) {
+        orderEditAddVariant(id: $id, variantId: $variantId, quantity: $quantity) {
+            calculatedOrder {
+                id
+                addedLineItems(first: 5) {
+                    edges {
+                        node {
+                            id
+                            quantity
+                        }
+                    }
+                }
+            }
+            userErrors {
+                field
+                message
+            }
+        }
+    }
+    """,
+)
+
+SET_LINE_ITEM_QUANTITY = register(
+    "SetLineItemQuantity",
+    """
+    mutation SetLineItemQuantity($id: ID!, $lineItemId: ID!, $quantity: Int!) {
+        orderEditSetQuantity(id: $id, lineItemId: $lineItemId, quantity: $quantity) {
+            calculatedOrder {
+                id
+                addedLineItems(first: 5) {
+                    edges {
+                        node {
+                            id
+                            quantity
+                        }
+                    }
+                }
+            }
+            userErrors {
+                field
+                message
+            }
+        }
+    }
+    """,
+)
+
+GET_CALCULATED_ORDER_BY_ID = register(
+    "GetCalculatedOrderById",
+    """
+    query GetCalculatedOrderById($id: ID!) {
+        node(id: $id) {
+            ... on CalculatedOrder {
+                id
+                taxLines {
+                    priceSet {
+                        shopMoney {
+                            amount
+                        }
+                    }
+                }
+                totalOutstandingSet {
+                    shopMoney {
+                        amount
+                    }
+                }
+                totalPriceSet {
+                    ...Money
+                }
+                subtotalPriceSet {
+                    ...Money
+                }
+                cartDiscountAmountSet {
+                    ...Money
+                }
+                lineItems(first: 10) {
+                    edges {
+                        node {
+                            id
+                            image {
+                                url
+                            }
+                            quantity
+                            originalUnitPriceSet {
+                                ...Money
+                            }
+                            discountedUnitPriceSet {
+                                ...Money
+                            }
+                            calculatedDiscountAllocations {
+                                allocatedAmountSet {
+                                    ...Money
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+    """,
+)
+
+COMMIT_EDIT_ORDER = register(
+    "CommitEditOrder",
+    """
+    mutation CommitEditOrder($id: ID!) {
+        orderEditCommit(id: $id, notifyCustomer: true, staffNote: "Order was updated by chad") {
+            order {
+                id
+            }
+            userErrors {
+                field
+                message
+            }
+        }
+    }
+    """,
+)
+
+REFUND_OWED_AMOUNT = register(
+    "RefundOwedAmount",
+    """
+    mutation RefundOwedAmount($input: RefundInput!) {
+        refundCreate(input: $input) {
+            userErrors {
+                field
+                message
+            }
+            refund {
+                id
+            }
+        }
+    }
+    """,
+)
+
+SEND_ORDER_INVOICE = register(
+    "SendOrderInvoice",
+    """
+    mutation SendOrderInvoice($id: ID!) {
+        orderInvoiceSend(id: $id) {
+            order {
+                id
+            }
+            userErrors {
+                field
+                message
+            }
+        }
+    }
+    """,
+)
+
+GET_ONLY_ORDER_STATUS = register(
+    "GetOnlyOrderStatus",
+    """
+    query GetOnlyOrderStatus($id: ID!) {
+        order(id: $id) {
+            id
+            name
+            createdAt
+            updatedAt
+            displayFinancialStatus
+            displayFulfillmentStatus
+            totalOutstandingSet {
+                ...Money
+            }
+            customer {
+                ...CustomerContact
+            }
+        }
+    }
+    """,
+)
+
+GET_ORDER_ID_BY_FULFILLMENT_ID = register(
+    "GetOrderIdByFulfillmentId",
+    """
+    query GetOrderIdByFulfillmentId($id: ID!) {
+        fulfillment(id: $id) {
+            order {
+                id
+            }
+        }
+    }
+    """,
+)
+
+CREATE_WEBHOOK = register(
+    "CreateWebhook",
+    """
+    mutation CreateWebhook($topic: WebhookSubscriptionTopic!, $webhookSubscription: WebhookSubscriptionInput!) {
+        webhookSubscriptionCreate(topic: $topic, webhookSubscription: $webhookSubscription) {
+            userErrors {
+                field
+                message
+            }
+            webhookSubscription {
+                id
+            }
+        }
+    }
+    """,
+)
+
+MAKE_UNFULFILLED_ORDER_ON_HOLD = register(
+    "MakeUnfulfilledOrderOnHold",
+    """
+    mutation MakeUnfulfilledOrderOnHold($id: ID!, $fulfillmentHold: FulfillmentOrderHoldInput!) {
+        fulfillmentOrderHold(id: $id, fulfillmentHold: $fulfillmentHold) {
+            fulfillmentOrder {
+                id
+                status
+                requestStatus
+                fulfillmentHolds {
+                    reason
+                    reasonNotes
+                }
+            }
+            userErrors {
+                field
+                message
+            }
+        }
+    }
+    """,
+)
+
+RUN_BULK_QUERY = register(
+    "RunBulkQuery",
+    """
+    mutation RunBulkQuery($query: String!) {
+        bulkOperationRunQuery(query: $query) {
+            bulkOperation {
+                id
+                status
+            }
+            userErrors {
+                field
+                message
+            }
+        }
+    }
+    """,
+)
+
+GET_BULK_OPERATION = register(
+    "GetBulkOperation",
+    """
+    query GetBulkOperation($id: ID!) {
+        node(id: $id) {
+            ... on BulkOperation {
+                id
+                status
+                errorCode
+                objectCount
+                url
+                partialDataUrl
+            }
+        }
+    }
+    """,
+)
+
+CANCEL_BULK_OPERATION = register(
+    "CancelBulkOperation",
+    """
+    mutation CancelBulkOperation($id: ID!) {
+        bulkOperationCancel(id: $id) {
+            bulkOperation {
+                id
+                status
+            }
+            userErrors {
+                field
+                message
+            }
+        }
+    }
+    """,
+)
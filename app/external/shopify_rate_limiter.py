@@ -0,0 +1,140 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+from app.common.logger.log import log_warning
+
+# Shopify's standard GraphQL Admin bucket, replaced by the throttleStatus of the first response.
+DEFAULT_MAXIMUM_AVAILABLE = 1000.0
+DEFAULT_RESTORE_RATE = 50.0
+# Used for a query until Shopify has reported its requestedQueryCost once.
+DEFAULT_QUERY_COST = 50.0
+THROTTLE_RETRIES = 3
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+shopify_priority: ContextVar[int] = ContextVar("shopify_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def background_priority():
+    """
+    Shopify calls made inside this block queue behind interactive ones, e.g. webhook processing or backfills.
+    """
+    token = shopify_priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        shopify_priority.reset(token)
+
+
+class _ShopBucket:
+    def __init__(self, now: float):
+        self.maximum_available = DEFAULT_MAXIMUM_AVAILABLE
+        self.restore_rate = DEFAULT_RESTORE_RATE
+        self.currently_available = DEFAULT_MAXIMUM_AVAILABLE
+        self.updated_at = now
+        self.waiters: List[list] = []
+        self.condition = asyncio.Condition()
+
+    def available(self, now: float) -> float:
+        restored = (now - self.updated_at) * self.restore_rate
+        return min(self.maximum_available, self.currently_available + restored)
+
+    def take(self, cost: float, now: float):
+        self.currently_available = self.available(now) - cost
+        self.updated_at = now
+
+    def delay_for(self, cost: float, now: float) -> float:
+        return max(0.0, (cost - self.available(now)) / self.restore_rate)
+
+
+class ShopifyRateLimiter:
+    """
+    Client side copy of Shopify's per-shop leaky bucket for the GraphQL Admin API.
+
+    Before a request is sent its estimated cost (the requestedQueryCost Shopify last reported for that query) is
+    taken from the shop's bucket, waiting for the bucket to refill when needed. Every response carries the real
+    bucket state in extensions.cost.throttleStatus, which replaces the local estimate. Waiters are served by
+    priority and then in arrival order, so interactive reads are not stuck behind background work.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._buckets: Dict[str, _ShopBucket] = {}
+        self._sequence = itertools.count()
+        self.estimated_costs: Dict[str, float] = {}
+
+    def _bucket(self, shop: str) -> _ShopBucket:
+        bucket = self._buckets.get(shop)
+        if bucket is None:
+            bucket = _ShopBucket(self._clock())
+            self._buckets[shop] = bucket
+        return bucket
+
+    def estimated_cost(self, query_name: str) -> float:
+        return self.estimated_costs.get(query_name, DEFAULT_QUERY_COST)
+
+    async def acquire(self, shop: str, query_name: str, priority: Optional[int] = None):
+        bucket = self._bucket(shop)
+        cost = min(self.estimated_cost(query_name), bucket.maximum_available)
+        entry = [shopify_priority.get() if priority is None else priority, next(self._sequence)]
+        async with bucket.condition:
+            heapq.heappush(bucket.waiters, entry)
+            try:
+                while True:
+                    delay = None
+                    if bucket.waiters[0] is entry:
+                        now = self._clock()
+                        delay = bucket.delay_for(cost, now)
+                        if delay <= 0:
+                            bucket.take(cost, now)
+                            return
+                    try:
+                        await asyncio.wait_for(bucket.condition.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                bucket.waiters.remove(entry)
+                heapq.heapify(bucket.waiters)
+                bucket.condition.notify_all()
+
+    async def record(self, shop: str, query_name: str, response: dict) -> bool:
+        """
+        Updates the shop's bucket and the query's estimated cost from a GraphQL response.
+
+        Returns:
+            bool: True when Shopify rejected the request as THROTTLED and it should be sent again.
+        """
+        cost = (response.get("extensions") or {}).get("cost") or {}
+        throttled = any(
+            (error.get("extensions") or {}).get("code") == "THROTTLED" for error in response.get("errors") or []
+        )
+        if cost.get("requestedQueryCost") is not None:
+            self.estimated_costs[query_name] = float(cost["requestedQueryCost"])
+
+        throttle_status = cost.get("throttleStatus")
+        if throttle_status or throttled:
+            bucket = self._bucket(shop)
+            async with bucket.condition:
+                if throttle_status:
+                    bucket.maximum_available = float(throttle_status["maximumAvailable"])
+                    bucket.restore_rate = float(throttle_status["restoreRate"])
+                    bucket.currently_available = float(throttle_status["currentlyAvailable"])
+                else:
+                    # No bucket state in the response, treat the bucket as empty.
+                    bucket.currently_available = 0.0
+                bucket.updated_at = self._clock()
+                bucket.condition.notify_all()
+
+        if throttled:
+            log_warning("Shopify throttled a GraphQL request.", shop=shop, query=query_name, cost=cost)
+        return throttled
+
+
+shopify_rate_limiter = ShopifyRateLimiter()
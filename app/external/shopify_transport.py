@@ -0,0 +1,136 @@
+import asyncio
+from typing import Dict, Optional
+
+import httpx
+
+from app.common.decorators.retry_policy import RetryPolicy, retry_budget
+from app.common.exceptions.exceptions import ServerException
+from app.common.utils import json_codec
+from app.common.utils.circuit_breaker import CircuitBreaker, circuit_breaker
+
+SHOPIFY_API_VERSION = "2022-07"
+
+# Shopify answers most admin GraphQL queries well under a second, the larger
+# order documents can take a few seconds on busy stores.
+DEFAULT_TIMEOUT = httpx.Timeout(15.0, connect=5.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0)
+
+
+class ShopifyException(ServerException):
+    def __init__(self, message: str, **kwargs):
+        super().__init__(0, message, 500, data=kwargs)
+
+
+TRANSIENT_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def _is_transient(exception: BaseException) -> bool:
+    if isinstance(exception, ShopifyException):
+        return (exception.data or {}).get("status_code") in TRANSIENT_STATUS_CODES
+    return True
+
+
+# Only for queries, a mutation whose response got lost may already have been applied.
+shopify_retry_policy = RetryPolicy(
+    "shopify",
+    attempts=3,
+    base_delay=0.2,
+    max_delay=2.0,
+    retry_on=(httpx.TransportError, ShopifyException),
+    retry_if=_is_transient,
+    budget=retry_budget("shopify"),
+)
+
+
+def _is_shopify_failure(exception: BaseException) -> bool:
+    # A 429 is the shop's rate limit rather than Shopify failing, the rate limiter waits for it.
+    if isinstance(exception, ShopifyException) and (exception.data or {}).get("status_code") == 429:
+        return False
+    return _is_transient(exception)
+
+
+def _normalize_shop_url(shop_url: str) -> str:
+    return shop_url.replace("https://", "").replace("http://", "").strip("/")
+
+
+def shopify_circuit_breaker(shop_url: str) -> CircuitBreaker:
+    """
+    The circuit breaker of one shop, keyed like the rate limiter's buckets, so a failing or throttled store does not
+    cut off the others. Wraps whole calls, retries included. Errors of one request (bad token, missing order) and
+    throttling do not count.
+    """
+    return circuit_breaker(
+        f"shopify:{_normalize_shop_url(shop_url)}", slow_call_seconds=5.0, failure_if=_is_shopify_failure
+    )
+
+
+class ShopifyGraphQLTransport:
+    """
+    Async transport for the Shopify Admin GraphQL API.
+
+    Keeps one keep-alive ``httpx.AsyncClient`` per shop so consecutive calls to
+    the same store reuse their connection. Nothing is stored in process-global
+    Shopify session state, so calls for different shops can run concurrently.
+    """
+
+    def __init__(
+        self,
+        api_version: str = SHOPIFY_API_VERSION,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        limits: httpx.Limits = DEFAULT_LIMITS,
+        http_transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_version = api_version
+        self.timeout = timeout
+        self.limits = limits
+        self.http_transport = http_transport
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def get_client(self, shop_url: str) -> httpx.AsyncClient:
+        shop = _normalize_shop_url(shop_url)
+        client = self._clients.get(shop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=f"https://{shop}/admin/api/{self.api_version}",
+                timeout=self.timeout,
+                limits=self.limits,
+                headers={"Content-Type": "application/json"},
+                transport=self.http_transport,
+            )
+            self._clients[shop] = client
+        return client
+
+    async def execute(
+        self,
+        shop_url: str,
+        access_token: str,
+        query: str,
+        variables: Optional[dict] = None,
+    ) -> dict:
+        client = self.get_client(shop_url)
+        payload = {"query": query}
+        if variables:
+            payload["variables"] = variables
+
+        response = await client.post(
+            "/graphql.json",
+            content=json_codec.dumps(payload),
+            headers={"X-Shopify-Access-Token": access_token},
+        )
+        if response.status_code != 200:
+            raise ShopifyException(
+                "Shopify GraphQL request failed.",
+                shop_url=shop_url,
+                status_code=response.status_code,
+                body=response.text[:500],
+            )
+        return json_codec.loads(response.content)
+
+    async def aclose(self):
+        clients = list(self._clients.values())
+        self._clients.clear()
+        await asyncio.gather(*(client.aclose() for client in clients))
+
+
+# Shared by every ShopifyClient instance; FastAPI creates a new client per request.
+shopify_transport = ShopifyGraphQLTransport()
@@ -1,24 +1,32 @@
-import os
+import time
 
-import fireo
-import openai
-from app.service_container import ServiceContainer
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+_imports_started_at = time.perf_counter()
 
-from app.api import (
+from app.service_container import ServiceContainer  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+
+from app.api import (  # noqa: E402
+    admin,
     auth,
     healthcheck,
+    ship24,
     shopify,
+    shopify_webhooks,
 )
-from app.external.secret_manager import SecretManager
+from app.common.middleware.compression import CompressionMiddleware  # noqa: E402
+from app.common.utils.json_codec import CodecJSONResponse  # noqa: E402
+from app.db.firestore import close_async_client  # noqa: E402
+from app.environment import env  # noqa: E402
+from app.external.shopify_transport import shopify_transport  # noqa: E402
+from app.startup import StartupReport, startup  # noqa: E402
+
+startup_report = StartupReport(started_at=_imports_started_at)
+startup_report.phases["imports"] = startup_report.total_ms()
 
 container = ServiceContainer()
-secrets = SecretManager().get_secrets()
-container.config.from_dict(secrets)
-openai.api_key = container.config.open_ai_secret_key
 
-app = FastAPI()
+app = FastAPI(default_response_class=CodecJSONResponse)
 app.container = container
 
 origins = [
@@ -34,9 +42,29 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    CompressionMiddleware, minimum_size=env.RESPONSE_COMPRESSION_MINIMUM_SIZE
+)
 
 app.include_router(healthcheck.router)
 app.include_router(auth.router)
 app.include_router(shopify.router)
+app.include_router(ship24.router)
+app.include_router(shopify_webhooks.router)
+app.include_router(admin.router)
+
+
+@app.on_event("startup")
+async def start():
+    await startup(container, startup_report)
+    startup_report.log()
+
+
+@app.on_event("shutdown")
+async def close_shopify_transport():
+    await shopify_transport.aclose()
+
 
-fireo.connection(from_file=os.getenv("GOOGLE_APPLICATION_CREDENTIALS"))
+@app.on_event("shutdown")
+async def close_firestore_client():
+    close_async_client()
@@ -1,9 +1,8 @@
 from typing import Optional
 
-import validators
 from pydantic import BaseModel, root_validator
 
-from app.common.utils.validators import must_be_only_one_of
+from app.common.utils.validators import is_valid_email, must_be_only_one_of
 
 
 class SendOTPRequestModel(BaseModel):
@@ -14,7 +13,7 @@ class SendOTPRequestModel(BaseModel):
     def validate_email_or_order_number(cls, values):
         email, order_number = values.get("email"), values.get("order_number")
         must_be_only_one_of(email=email, order_number=order_number)
-        if email and not validators.email(email):
+        if email and not is_valid_email(email):
             raise ValueError(f"{email} is invalid Email")
         return values
 
@@ -28,7 +27,7 @@ class EmailOTPVerificationRequestModel(BaseModel):
     def validate_email_or_order_number(cls, values):
         email, order_number = values.get("email"), values.get("order_number")
         must_be_only_one_of(email=email, order_number=order_number)
-        if email and not validators.email(email):
+        if email and not is_valid_email(email):
             raise ValueError(f"{email} is invalid Email")
         return values
 
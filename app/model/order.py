@@ -0,0 +1,202 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, List, Optional
+
+from app.common.utils.order_utils import extract_order_id, shopify_date_str_to_datetime
+from app.constants import ChadStatus
+from app.model.merchant import LateFromDateType
+
+if TYPE_CHECKING:
+    from app.services.tracking_service import TrackingDetails
+
+LATE_THRESHOLD_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def _is_removed(line_item: dict) -> bool:
+    # Fully refunded or removed by an edit.
+    return line_item.get("currentQuantity", 0) == line_item.get("refundableQuantity", 0) == 0
+
+
+@dataclass(init=False)
+class Order:
+    """
+    A Shopify order node and the fields the order endpoints compute for it.
+
+    Parsed once from the node with parse, the computed fields are only written into the node by serialize, which is
+    called once per order right before it is sent. The node is not copied, it belongs to the request that read it.
+
+    Response contract, on top of the node:
+        chadFulfillmentStatus: The order status as presented to the shopper.
+        shippedAt, deliveredAt: Of the first fulfillment, only when the order has one.
+        cancelationRequest: Only when the cancelation failed.
+        trackingDetails or trackingInfoErrorMessage: Only when the order has a shipment to track.
+        isMatchShopperAndShippingName, originalOrder, refundedPriceSet, isLate, lateThreshold: Order endpoint only.
+        Fields of the stored order (stored_details) override all of the above.
+    """
+
+    # Declared by hand, dataclass(slots=True) needs Python 3.10. Slot names cannot have class level defaults, so the
+    # defaults are set in __init__.
+    __slots__ = (
+        "node",
+        "order_id",
+        "fulfillments",
+        "line_items",
+        "courier",
+        "tracking_number",
+        "chad_fulfillment_status",
+        "cancelation_failed",
+        "tracking_details",
+        "tracking_unavailable",
+        "stored_details",
+        "is_match_shopper_and_shipping_name",
+        "original_order",
+        "refunded_price_set",
+        "is_late",
+        "late_threshold",
+    )
+
+    node: dict
+    order_id: str
+    fulfillments: List[dict]
+    # Without the fully refunded and removed items, None when the node has no line items.
+    line_items: Optional[List[dict]]
+    courier: Optional[str]
+    tracking_number: Optional[str]
+    chad_fulfillment_status: Optional[str]
+    cancelation_failed: bool
+    tracking_details: Optional[dict]
+    tracking_unavailable: bool
+    stored_details: Optional[dict]
+    is_match_shopper_and_shipping_name: Optional[bool]
+    original_order: Optional[dict]
+    refunded_price_set: Optional[dict]
+    is_late: Optional[bool]
+    late_threshold: Optional[str]
+
+    def __init__(
+        self,
+        node: dict,
+        order_id: str,
+        fulfillments: List[dict],
+        line_items: Optional[List[dict]] = None,
+        courier: Optional[str] = None,
+        tracking_number: Optional[str] = None,
+    ):
+        self.node = node
+        self.order_id = order_id
+        self.fulfillments = fulfillments
+        self.line_items = line_items
+        self.courier = courier
+        self.tracking_number = tracking_number
+        self.chad_fulfillment_status = None
+        self.cancelation_failed = False
+        self.tracking_details = None
+        self.tracking_unavailable = False
+        self.stored_details = None
+        self.is_match_shopper_and_shipping_name = None
+        self.original_order = None
+        self.refunded_price_set = None
+        self.is_late = None
+        self.late_threshold = None
+
+    @classmethod
+    def parse(cls, node: dict, order_id: Optional[str] = None) -> "Order":
+        fulfillments = node.get("fulfillments") or []
+
+        line_items = None
+        if node.get("lineItems") is not None:
+            line_items = [edge for edge in node["lineItems"].get("edges", []) if not _is_removed(edge.get("node", {}))]
+
+        courier = tracking_number = None
+        tracked_fulfillment = next(
+            filter(lambda item: item.get("requiresShipping") and item.get("trackingInfo"), fulfillments), None
+        )
+        if tracked_fulfillment:
+            tracking_info = tracked_fulfillment["trackingInfo"][0]
+            if tracking_info.get("company") and tracking_info.get("number"):
+                courier = tracking_info["company"]
+                tracking_number = tracking_info["number"]
+
+        return cls(
+            node=node,
+            order_id=order_id or extract_order_id(node.get("id")),
+            fulfillments=fulfillments,
+            line_items=line_items,
+            courier=courier,
+            tracking_number=tracking_number,
+        )
+
+    @property
+    def shipped_at(self) -> Optional[str]:
+        return self.fulfillments[0].get("createdAt") if self.fulfillments else None
+
+    @property
+    def delivered_at(self) -> Optional[str]:
+        return self.fulfillments[0].get("deliveredAt") if self.fulfillments else None
+
+    def use_stored_order(self, order_details: dict):
+        """
+        Answers with the stored order instead of the Shopify node, its line items are sent as stored.
+        """
+        self.node = order_details
+        self.line_items = None
+
+    def apply_tracking_details(self, tracking_details: Optional["TrackingDetails"]):
+        if tracking_details:
+            self.chad_fulfillment_status = tracking_details.chad_status
+            self.tracking_details = tracking_details.dict()
+        else:
+            self.tracking_unavailable = True
+
+    def set_lateness(self, lateness_threshold: int, late_from: LateFromDateType, now: Optional[datetime] = None):
+        """
+        An order is late `lateness_threshold` days after it was placed, or shipped depending on the merchant's
+        config. Orders counted from shipping are only late while they are shipped.
+        """
+        now = now or datetime.now()
+        self.is_late = False
+        self.late_threshold = None
+        if late_from == LateFromDateType.PLACED:
+            started_at = shopify_date_str_to_datetime(self.node.get("createdAt", ""))
+        elif self.chad_fulfillment_status == ChadStatus.SHIPPED.value:
+            if self.fulfillments:
+                started_at = shopify_date_str_to_datetime(self.fulfillments[0].get("updatedAt"))
+            else:
+                started_at = shopify_date_str_to_datetime(self.node.get("updatedAt"))
+        else:
+            return
+        self.is_late = now - started_at > timedelta(days=lateness_threshold)
+        self.late_threshold = (started_at + timedelta(days=lateness_threshold)).strftime(LATE_THRESHOLD_FORMAT)
+
+    def serialize(self) -> dict:
+        """
+        Writes the computed fields into the node and returns it.
+        """
+        node = self.node
+        if self.line_items is not None:
+            node["lineItems"]["edges"] = self.line_items
+        node["chadFulfillmentStatus"] = self.chad_fulfillment_status
+        if self.cancelation_failed:
+            node["cancelationRequest"] = {
+                "isFailed": True,
+                "reason": "The order is already fulfilled",
+            }
+        if self.fulfillments:
+            node["shippedAt"] = self.shipped_at
+            node["deliveredAt"] = self.delivered_at
+        if self.tracking_details is not None:
+            node["trackingDetails"] = self.tracking_details
+        elif self.tracking_unavailable:
+            node["trackingInfoErrorMessage"] = "Status not available"
+        if self.is_match_shopper_and_shipping_name is not None:
+            node["isMatchShopperAndShippingName"] = self.is_match_shopper_and_shipping_name
+        if self.original_order is not None:
+            node["originalOrder"] = self.original_order
+        if self.refunded_price_set is not None:
+            node["refundedPriceSet"] = self.refunded_price_set
+        if self.is_late is not None:
+            node["isLate"] = self.is_late
+            node["lateThreshold"] = self.late_threshold
+        if self.stored_details is not None:
+            node.update(self.stored_details)
+        return node
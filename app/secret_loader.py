@@ -1,12 +1,22 @@
 from functools import lru_cache
+from typing import Optional
 
-from fastapi import Depends
-
-from app.external.secret_manager import SecretManager
 from app.secrets import Secrets
 
+# Filled in by app.startup, so requests do not go to Secret Manager again.
+_secrets: Optional[dict] = None
+
+
+def set_secrets(secrets: dict):
+    global _secrets
+    _secrets = secrets
+    init_setting.cache_clear()
+
 
 @lru_cache
-def init_setting(secret_manager: SecretManager = Depends(SecretManager)):
-    j = secret_manager.get_secrets()
-    return Secrets(**j)
+def init_setting():
+    if _secrets is None:
+        from app.startup import fetch_secrets
+
+        return Secrets(**fetch_secrets())
+    return Secrets(**_secrets)
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseSettings, BaseConfig, Extra
 
 
@@ -15,6 +17,7 @@ class Secrets(BaseSettings):
     bucket_name: str
     open_ai_secret_key: str
     ship24_api_key: str
+    ship24_webhook_secret: Optional[str]
 
     class Config(BaseConfig):
         env_prefix: str = ""
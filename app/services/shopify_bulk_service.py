@@ -0,0 +1,246 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Dict, Optional
+
+import httpx
+
+from app.common.logger.log import log_info, log_warning
+from app.common.utils import json_codec
+from app.external.shopify_client import ShopifyClient
+from app.external.shopify_queries import minify
+from app.external.shopify_rate_limiter import background_priority
+from app.external.shopify_transport import ShopifyException
+
+BULK_POLL_INTERVAL_SECONDS = 5.0
+BULK_TIMEOUT_SECONDS = 60 * 60.0
+BULK_DOWNLOAD_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+BULK_FINISHED_STATUSES = {"COMPLETED", "FAILED", "CANCELED", "EXPIRED"}
+
+# Bulk queries are plain documents without variables, fragments or page sizes. Nested connections (lineItems) come
+# back as separate JSONL lines pointing at their order with __parentId, lists (fulfillments, refunds) stay inline.
+BULK_ORDERS_QUERY = """
+{
+    orders%s {
+        edges {
+            node {
+                id
+                name
+                email
+                createdAt
+                updatedAt
+                displayFinancialStatus
+                displayFulfillmentStatus
+                customer {
+                    id
+                    email
+                }
+                currentTotalPriceSet {
+                    shopMoney {
+                        amount
+                        currencyCode
+                    }
+                }
+                totalOutstandingSet {
+                    shopMoney {
+                        amount
+                        currencyCode
+                    }
+                }
+                fulfillments {
+                    id
+                    createdAt
+                    deliveredAt
+                    displayStatus
+                    estimatedDeliveryAt
+                    requiresShipping
+                    trackingInfo {
+                        number
+                        company
+                        url
+                    }
+                }
+                refunds {
+                    id
+                }
+                lineItems {
+                    edges {
+                        node {
+                            id
+                            name
+                            quantity
+                            currentQuantity
+                            refundableQuantity
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+"""
+
+
+def bulk_orders_query(search: Optional[str] = None) -> str:
+    """
+    Args:
+        search (Optional[str]): Shopify order search syntax, e.g. "updated_at:>2023-06-01". All orders when omitted.
+    """
+    return minify(BULK_ORDERS_QUERY % (f"(query: {json.dumps(search)})" if search else ""))
+
+
+def _child_key(gid: str) -> str:
+    # gid://shopify/LineItem/1 -> lineItems
+    type_name = gid.split("/")[-2]
+    return type_name[0].lower() + type_name[1:] + "s"
+
+
+class ShopifyBulkService:
+    """
+    Runs Shopify bulk operations for back office jobs (status recomputation, late order scans, exports).
+
+    A bulk query is executed by Shopify in the background and its result is downloaded as one JSONL file, so a whole
+    shop is read with a handful of GraphQL calls instead of paging through it. Those calls are made with background
+    priority, interactive requests of the same shop go first.
+    """
+
+    def __init__(
+        self,
+        shopify_client: ShopifyClient,
+        poll_interval: float = BULK_POLL_INTERVAL_SECONDS,
+        timeout: float = BULK_TIMEOUT_SECONDS,
+        http_transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.shopify_client = shopify_client
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.http_transport = http_transport
+
+    async def run(self, shop_url: str, query: str) -> dict:
+        """
+        Submits the bulk query and waits for it to finish.
+
+        Returns:
+            dict: The finished BulkOperation (id, status, objectCount, url).
+
+        Raises:
+            ShopifyException: When Shopify rejects the query, or the operation fails or does not finish in time.
+        """
+        with background_priority():
+            data = await self.shopify_client.run_bulk_query(shop_url, query)
+            result = (data.get("data") or {}).get("bulkOperationRunQuery") or {}
+            if result.get("userErrors") or not result.get("bulkOperation"):
+                raise ShopifyException(
+                    "Shopify rejected the bulk query.",
+                    shop_url=shop_url,
+                    user_errors=result.get("userErrors"),
+                    errors=data.get("errors"),
+                )
+            operation_id = result["bulkOperation"]["id"]
+            log_info("Started Shopify bulk operation.", shop_url=shop_url, operation_id=operation_id)
+            return await self._wait(shop_url, operation_id)
+
+    async def _wait(self, shop_url: str, operation_id: str) -> dict:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            data = await self.shopify_client.get_bulk_operation(shop_url, operation_id)
+            operation = (data.get("data") or {}).get("node") or {}
+            status = operation.get("status")
+            if status == "COMPLETED":
+                return operation
+            if status in BULK_FINISHED_STATUSES:
+                raise ShopifyException(
+                    "Shopify bulk operation did not complete.",
+                    shop_url=shop_url,
+                    operation_id=operation_id,
+                    status=status,
+                    error_code=operation.get("errorCode"),
+                )
+            if time.monotonic() >= deadline:
+                # Shopify runs one bulk query per shop at a time, a forgotten one blocks the next job of the shop.
+                await self._cancel(shop_url, operation_id)
+                raise ShopifyException(
+                    "Shopify bulk operation timed out.",
+                    shop_url=shop_url,
+                    operation_id=operation_id,
+                    status=status,
+                )
+            await asyncio.sleep(self.poll_interval)
+
+    async def _cancel(self, shop_url: str, operation_id: str):
+        try:
+            data = await self.shopify_client.cancel_bulk_operation(shop_url, operation_id)
+        except Exception as e:
+            log_warning("Cancelling the Shopify bulk operation failed.", exception=e, operation_id=operation_id)
+            return
+        result = (data.get("data") or {}).get("bulkOperationCancel") or {}
+        if result.get("userErrors") or data.get("errors"):
+            log_warning(
+                "Shopify did not cancel the bulk operation.",
+                shop_url=shop_url,
+                operation_id=operation_id,
+                user_errors=result.get("userErrors"),
+                errors=data.get("errors"),
+            )
+
+    async def iter_records(self, url: str) -> AsyncIterator[dict]:
+        """
+        Streams the JSONL result line by line, the file is never held in memory as a whole.
+        """
+        async with httpx.AsyncClient(timeout=BULK_DOWNLOAD_TIMEOUT, transport=self.http_transport) as client:
+            async with client.stream("GET", url) as response:
+                if response.status_code != 200:
+                    raise ShopifyException(
+                        "Downloading the Shopify bulk operation result failed.",
+                        status_code=response.status_code,
+                    )
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        yield json_codec.loads(line)
+
+    async def iter_objects(self, url: str) -> AsyncIterator[dict]:
+        """
+        Rebuilds the nested objects from the flat JSONL records: every record with a __parentId is appended to its
+        parent under the plural of its type, e.g. line items to order["lineItems"].
+
+        Shopify writes the children of an object right after it, so only the current top level object is kept; it is
+        yielded as soon as the next one starts.
+        """
+        root = None
+        by_id: Dict[str, dict] = {}
+        async for record in self.iter_records(url):
+            parent_id = record.pop("__parentId", None)
+            if parent_id is None:
+                if root is not None:
+                    yield root
+                root = record
+                by_id = {record["id"]: record} if "id" in record else {}
+                continue
+
+            parent = by_id.get(parent_id)
+            if parent is None:
+                log_warning("Shopify bulk record without a preceding parent.", parent_id=parent_id)
+                continue
+            parent.setdefault(_child_key(record["id"]), []).append(record)
+            by_id[record["id"]] = record
+        if root is not None:
+            yield root
+
+    async def iter_orders(self, shop_url: str, search: Optional[str] = None) -> AsyncIterator[dict]:
+        """
+        Yields every order of the shop matching `search`, with its lineItems as a list and fulfillments and refunds
+        inline.
+        """
+        operation = await self.run(shop_url, bulk_orders_query(search))
+        log_info(
+            "Shopify bulk operation completed.",
+            shop_url=shop_url,
+            operation_id=operation.get("id"),
+            object_count=operation.get("objectCount"),
+        )
+        # No url when the query matched nothing.
+        if not operation.get("url"):
+            return
+        async for order in self.iter_objects(operation["url"]):
+            yield order
@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from app.common.cache.lru_ttl_cache import LRUTTLCache
+from app.common.logger.log import log_warning
+from app.db.tracking_result import TrackingResultModel, tracking_result_repository
+
+# A delivered shipment does not change anymore, keep it for as long as anyone looks at the order.
+DELIVERED_TTL = timedelta(days=90)
+OUT_FOR_DELIVERY_TTL = timedelta(minutes=10)
+ATTENTION_NEEDED_TTL = timedelta(minutes=30)
+PRE_TRANSIT_TTL = timedelta(hours=2)
+IN_TRANSIT_MIN_TTL = timedelta(minutes=30)
+IN_TRANSIT_MAX_TTL = timedelta(hours=12)
+IN_TRANSIT_DEFAULT_TTL = timedelta(hours=2)
+UNKNOWN_STATUS_TTL = timedelta(minutes=15)
+
+# https://docs.ship24.com/status/#statuscode--statuscategory
+MILESTONE_TTL = {
+    "delivered": DELIVERED_TTL,
+    "out_for_delivery": OUT_FOR_DELIVERY_TTL,
+    "failed_attempt": ATTENTION_NEEDED_TTL,
+    "available_for_pickup": ATTENTION_NEEDED_TTL,
+    "exception": ATTENTION_NEEDED_TTL,
+    "pending": PRE_TRANSIT_TTL,
+    "info_received": PRE_TRANSIT_TTL,
+}
+
+
+def parse_ship24_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def tracking_result_ttl(
+    status_milestone: Optional[str], estimated_delivery_date: Optional[str], now: Optional[datetime] = None
+) -> timedelta:
+    """
+    Returns how long a tracking result may be served from cache, based on how likely it is to change soon.
+
+    In-transit shipments are refreshed more often as the estimated delivery date gets closer: a quarter of the time
+    left until the estimate, clamped between IN_TRANSIT_MIN_TTL and IN_TRANSIT_MAX_TTL.
+    """
+    if status_milestone in MILESTONE_TTL:
+        return MILESTONE_TTL[status_milestone]
+    if status_milestone != "in_transit":
+        return UNKNOWN_STATUS_TTL
+
+    estimated_delivery = parse_ship24_datetime(estimated_delivery_date)
+    if estimated_delivery is None:
+        return IN_TRANSIT_DEFAULT_TTL
+    now = now or datetime.now(timezone.utc)
+    return min(max((estimated_delivery - now) / 4, IN_TRANSIT_MIN_TTL), IN_TRANSIT_MAX_TTL)
+
+
+# (courier, tracking number), Ship24 keeps one tracker per pair and the same number can exist at two carriers.
+TrackingKey = Tuple[str, str]
+
+
+class TrackingResultCache:
+    """
+    Two tier cache for normalised tracking results (TrackingDetails.dict()), keyed by (courier, tracking number).
+
+    The in-process LRU answers repeat views on the same worker, Firestore shares results across workers and survives
+    restarts. A persistent hit is promoted to the LRU for the remainder of its TTL.
+    """
+
+    def __init__(self, max_size: int = 4096, persistent: bool = True):
+        self.memory: LRUTTLCache[dict] = LRUTTLCache(max_size=max_size)
+        self.persistent = persistent
+
+    async def get(self, courier: str, tracking_number: str) -> Optional[dict]:
+        key = (courier, tracking_number)
+        details = self.memory.get(key)
+        if details is not None or not self.persistent:
+            return details
+
+        try:
+            model = await tracking_result_repository.get_by_courier_and_tracking_number(courier, tracking_number)
+        except Exception as e:
+            log_warning(
+                "Reading cached tracking result failed.", exception=e, courier=courier, tracking_number=tracking_number
+            )
+            return None
+        return self._promote(key, model)
+
+    async def get_many(self, keys: List[TrackingKey]) -> Dict[TrackingKey, dict]:
+        found = {}
+        for key in keys:
+            details = self.memory.get(key)
+            if details is not None:
+                found[key] = details
+        missing = [key for key in keys if key not in found]
+        if not missing or not self.persistent:
+            return found
+
+        try:
+            models = await tracking_result_repository.get_by_courier_and_tracking_numbers(missing)
+        except Exception as e:
+            log_warning("Reading cached tracking results failed.", exception=e, keys=missing)
+            return found
+        for key, model in models.items():
+            details = self._promote(key, model)
+            if details is not None:
+                found[key] = details
+        return found
+
+    def _promote(self, key: TrackingKey, model: Optional[TrackingResultModel]) -> Optional[dict]:
+        if model is None or not model.details or model.expires_at is None:
+            return None
+        expires_at = model.expires_at if model.expires_at.tzinfo else model.expires_at.replace(tzinfo=timezone.utc)
+        remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        if remaining <= 0:
+            return None
+        self.memory.set(key, model.details, remaining)
+        return model.details
+
+    async def set(self, courier: str, tracking_number: str, details: dict, ttl: timedelta):
+        await self.set_many([(courier, tracking_number, details, ttl)])
+
+    async def set_many(self, results: List[Tuple[str, str, dict, timedelta]]):
+        """
+        Caches (courier, tracking_number, details, ttl) results, persisted with one batched write.
+        """
+        now = datetime.now(timezone.utc)
+        for courier, tracking_number, details, ttl in results:
+            self.memory.set((courier, tracking_number), details, ttl.total_seconds())
+        if not self.persistent or not results:
+            return
+        try:
+            await tracking_result_repository.upsert_many(
+                [(courier, tracking_number, details, now + ttl) for courier, tracking_number, details, ttl in results]
+            )
+        except Exception as e:
+            log_warning(
+                "Writing cached tracking results failed.",
+                exception=e,
+                keys=[(courier, tracking_number) for courier, tracking_number, _, _ in results],
+            )
+
+    def invalidate(self, courier: str, tracking_number: str):
+        self.memory.delete((courier, tracking_number))
+
+
+tracking_result_cache = TrackingResultCache()
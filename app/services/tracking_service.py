@@ -1,15 +1,27 @@
-from typing import Optional
+from datetime import timedelta
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel
 
 from app.common.logger.log import log_warning
+from app.common.utils.circuit_breaker import CircuitBreaker
+from app.common.utils.concurrency import gather_bounded
 from app.constants import ChadStatus
-from app.db.ship24 import Ship24Model, Ship24ModelContext
+from app.db.ship24_batch import ship24_tracker_repository
+from app.environment import env
+from app.services.tracking_cache import (
+    TrackingResultCache,
+    parse_ship24_datetime,
+    tracking_result_cache,
+    tracking_result_ttl,
+)
 from app.external.ship24_client import (
     Ship24Client,
     Ship24Recipient,
     Ship24Events,
     Ship24GetTrackerDetailResponse,
+    Ship24TrackerDetails,
+    ship24_circuit_breaker,
 )
 
 
@@ -70,15 +82,189 @@ class TrackingService:
     def __init__(
         self,
         ship24_client: Ship24Client,
+        *,
+        result_cache: Optional[TrackingResultCache] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
     ):
         self.ship24_client = ship24_client
+        self.result_cache = result_cache or tracking_result_cache
+        self.circuit_breaker = circuit_breaker or ship24_circuit_breaker
 
     async def get_tracking_details(self, courier: str, tracking_number: str) -> Optional[TrackingDetails]:
+        cached = await self.result_cache.get(courier, tracking_number)
+        if cached is not None:
+            return TrackingDetails(**cached)
+        return await self.fetch_tracking_details(courier, tracking_number)
+
+    async def fetch_tracking_details(self, courier: str, tracking_number: str) -> Optional[TrackingDetails]:
+        """
+        get_tracking_details without the cache read, for callers that already read the cache in one batch (see
+        get_cached_tracking_details_many). The result is still cached.
+        """
+        if self.circuit_breaker.is_open:
+            # Ship24 is down, callers fall back to the status derived from the Shopify fulfillments.
+            return None
+
         response = await self._get_tracker_info_from_ship24(
             courier=courier,
             tracking_number=tracking_number,
         )
+        tracking_details = self._to_tracking_details(courier, tracking_number, response)
+        await self._cache_tracking_details(courier, tracking_number, tracking_details)
+        return tracking_details
+
+    async def get_cached_tracking_details_many(
+        self, requests: List[GetTrackingDetailsRequest]
+    ) -> Dict[str, TrackingDetails]:
+        """
+        The results of the given shipments still fresh in the tracking result cache, read in one batch and keyed by
+        tracking number. Shipments without a cached result are left out.
+        """
+        couriers = {}
+        for request in requests:
+            couriers.setdefault(request.tracking_number, request.courier)
+        if not couriers:
+            return {}
+        cached = await self.result_cache.get_many(
+            [(courier, tracking_number) for tracking_number, courier in couriers.items()]
+        )
+        return {tracking_number: TrackingDetails(**details) for (_, tracking_number), details in cached.items()}
 
+    async def get_tracking_details_many(
+        self,
+        requests: List[GetTrackingDetailsRequest],
+        limit: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Optional[TrackingDetails]]:
+        """
+        Batched version of get_tracking_details.
+
+        Results still fresh in the tracking result cache are served from there. For the rest, cached tracker ids are
+        resolved with one batched Firestore read, trackers that do not exist yet are created
+        with one bulk Ship24 call and the tracking results are then fetched in parallel. While the Ship24 circuit
+        breaker is open only cached results are returned.
+
+        Args:
+            requests (List[GetTrackingDetailsRequest]): The shipments to look up.
+            limit (Optional[int]): Maximum number of concurrent Ship24 calls. Defaults to TRACKING_CONCURRENCY_LIMIT.
+            timeout (Optional[float]): Per-call timeout in seconds. Defaults to TRACKING_TIMEOUT_SECONDS.
+
+        Returns:
+            dict: TrackingDetails keyed by tracking number, None for shipments that could not be resolved.
+        """
+        couriers = {}
+        for request in requests:
+            couriers.setdefault(request.tracking_number, request.courier)
+        if not couriers:
+            return {}
+
+        results = await self.get_cached_tracking_details_many(requests)
+        couriers = {
+            tracking_number: courier for tracking_number, courier in couriers.items() if tracking_number not in results
+        }
+        if not couriers:
+            return results
+        if self.circuit_breaker.is_open:
+            return {**results, **{tracking_number: None for tracking_number in couriers}}
+
+        tracker_ids = await self._get_tracker_ids(couriers)
+        tracking_numbers = list(couriers)
+        responses = await gather_bounded(
+            [
+                lambda tracking_number=tracking_number: self._get_tracker_results(
+                    tracker_ids.get(tracking_number), couriers[tracking_number], tracking_number
+                )
+                for tracking_number in tracking_numbers
+            ],
+            limit=limit or env.TRACKING_CONCURRENCY_LIMIT,
+            timeout=timeout or env.TRACKING_TIMEOUT_SECONDS,
+        )
+        fetched = {}
+        for tracking_number, response in zip(tracking_numbers, responses):
+            fetched[tracking_number] = self._to_tracking_details(couriers[tracking_number], tracking_number, response)
+        # One batched write for the whole page instead of a Firestore round trip per shipment.
+        await self.result_cache.set_many(
+            [
+                (couriers[tracking_number], tracking_number, tracking_details.dict(), self._cache_ttl(tracking_details))
+                for tracking_number, tracking_details in fetched.items()
+                if tracking_details is not None
+            ]
+        )
+        return {**results, **fetched}
+
+    async def store_tracking_updates(self, trackings: List[Ship24TrackerDetails]) -> int:
+        """
+        Stores tracker updates pushed by the Ship24 webhook as the latest TrackingDetails of each tracking number.
+
+        Reads are then answered from the tracking result cache, and Ship24 is only called on a miss or once the pushed
+        result expired (see tracking_result_ttl). Updates older than the stored result (webhooks can arrive out of
+        order) are ignored.
+
+        Returns:
+            int: The number of tracking results that were stored.
+        """
+        tracker_couriers = await self._get_tracker_couriers([tracking.tracker.trackerId for tracking in trackings])
+        stored = 0
+        for tracking in trackings:
+            tracking_number = tracking.tracker.trackingNumber
+            if not tracking_number:
+                continue
+            # Results are read under the courier the tracker was created with, not the one Ship24 detected.
+            courier = tracker_couriers.get(tracking.tracker.trackerId) or self._pushed_courier(tracking)
+            cached = await self.result_cache.get(courier, tracking_number)
+            cached_details = TrackingDetails(**cached) if cached else None
+            tracking_details = self._tracking_to_details(courier, tracking)
+            if cached_details and self._is_older(tracking_details, cached_details):
+                continue
+            await self._cache_tracking_details(courier, tracking_number, tracking_details)
+            stored += 1
+        return stored
+
+    @staticmethod
+    async def _get_tracker_couriers(tracker_ids: List[Optional[str]]) -> Dict[str, str]:
+        tracker_ids = [tracker_id for tracker_id in tracker_ids if tracker_id]
+        if not tracker_ids:
+            return {}
+        try:
+            trackers = await ship24_tracker_repository.get_by_tracker_ids(tracker_ids)
+        except Exception as e:
+            log_warning("Reading the couriers of pushed trackers failed.", exception=e, tracker_ids=tracker_ids)
+            return {}
+        return {tracker_id: tracker.courier for tracker_id, tracker in trackers.items()}
+
+    @staticmethod
+    def _pushed_courier(tracking: Ship24TrackerDetails) -> str:
+        # Ship24 sends the courier codes it detected, the list is empty or missing until it detected one.
+        courier_codes = [code for code in tracking.tracker.courierCode or [] if code]
+        return courier_codes[0] if courier_codes else "N/A"
+
+    @staticmethod
+    def _is_older(tracking_details: TrackingDetails, cached_details: TrackingDetails) -> bool:
+        if not tracking_details.last_event or not cached_details.last_event:
+            return False
+        received_at = parse_ship24_datetime(tracking_details.last_event.occurrenceDatetime)
+        cached_at = parse_ship24_datetime(cached_details.last_event.occurrenceDatetime)
+        return bool(received_at and cached_at and received_at < cached_at)
+
+    async def _cache_tracking_details(
+        self, courier: str, tracking_number: str, tracking_details: Optional[TrackingDetails]
+    ):
+        if tracking_details is None:
+            return
+        await self.result_cache.set(
+            courier, tracking_number, tracking_details.dict(), self._cache_ttl(tracking_details)
+        )
+
+    @staticmethod
+    def _cache_ttl(tracking_details: TrackingDetails) -> timedelta:
+        # Pushed results expire like fetched ones, a missed webhook must not pin an in-transit status. Only delivered
+        # results, which do not change anymore, are kept long.
+        return tracking_result_ttl(tracking_details.status_milestone, tracking_details.estimated_delivery_date)
+
+    @staticmethod
+    def _to_tracking_details(
+        courier: str, tracking_number: str, response: Optional[Ship24GetTrackerDetailResponse]
+    ) -> Optional[TrackingDetails]:
         if not response or len(response.trackings) == 0:
             log_warning(
                 "Ship24 response did not contain any trackings.",
@@ -88,7 +274,10 @@ class TrackingService:
             return None
 
         # Note: Its unclear why this api returns this as an array. Just look at the first tracking object.
-        tracking = response.trackings[0]
+        return TrackingService._tracking_to_details(courier, response.trackings[0])
+
+    @staticmethod
+    def _tracking_to_details(courier: str, tracking: Ship24TrackerDetails) -> TrackingDetails:
         tracker = tracking.tracker
         timestamps = tracking.statistics.timestamps
         shipment = tracking.shipment
@@ -112,19 +301,66 @@ class TrackingService:
 
         return tracking_details
 
+    async def _get_tracker_ids(self, couriers: Dict[str, str]) -> Dict[str, str]:
+        tracker_ids = {}
+        try:
+            cached = await ship24_tracker_repository.get_by_courier_and_tracking_numbers(
+                [(courier, tracking_number) for tracking_number, courier in couriers.items()]
+            )
+            for (_, tracking_number), data in cached.items():
+                if data.ship24_tracker_id:
+                    tracker_ids[tracking_number] = data.ship24_tracker_id
+
+            missing = [tracking_number for tracking_number in couriers if tracking_number not in tracker_ids]
+            if missing:
+                created = await self.ship24_client.bulk_create_trackers(
+                    {tracking_number: couriers[tracking_number] for tracking_number in missing}
+                )
+                tracker_ids.update(created)
+                await ship24_tracker_repository.insert_many(
+                    [
+                        (couriers[tracking_number], tracking_number, tracker_id)
+                        for tracking_number, tracker_id in created.items()
+                    ]
+                )
+        except Exception as e:
+            log_warning(
+                "Resolving Ship24 tracker ids failed.",
+                exception=e,
+                tracking_numbers=list(couriers),
+            )
+        return tracker_ids
+
+    async def _get_tracker_results(
+        self, tracker_id: Optional[str], courier: str, tracking_number: str
+    ) -> Optional[Ship24GetTrackerDetailResponse]:
+        if not tracker_id:
+            # Bulk creation did not return a tracker, fall back to the single create-and-track path.
+            return await self._get_tracker_info_from_ship24(courier=courier, tracking_number=tracking_number)
+        try:
+            return await self.ship24_client.get_tracker_results(tracker_id, courier, tracking_number)
+        except Exception as e:
+            log_warning(
+                "Get tracking details from ship24 failed.",
+                exception=e,
+                courier=courier,
+                tracking_number=tracking_number,
+            )
+            return None
+
     async def _get_tracker_info_from_ship24(
         self, courier: str, tracking_number: str
     ) -> Optional[Ship24GetTrackerDetailResponse]:
         try:
             # Check the cache to halve the number of API calls to Ship24.
-            data = Ship24ModelContext.get_by_courier_and_tracking_number(
+            data = await ship24_tracker_repository.get_by_courier_and_tracking_number(
                 courier=courier, tracking_number=tracking_number
             )
             tracker_id = data.ship24_tracker_id if data else None
             if not tracker_id:
                 res = await self.ship24_client.initiate_tracker(courier, tracking_number)
                 ship24_tracker_id = res.trackings[0].tracker.trackerId
-                Ship24Model.insert(
+                await ship24_tracker_repository.insert(
                     courier=courier,
                     tracking_number=tracking_number,
                     ship24_tracker_id=ship24_tracker_id,
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+import fireo
+
+from app.common.logger.log import log_info, log_warning
+from app.db.firestore import async_client
+from app.environment import env
+
+
+class StartupReport:
+    """
+    Wall clock duration of every startup phase. Phases run concurrently, so they can add up to more than the total.
+    """
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = started_at or time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def phase(self, name: str):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - started_at) * 1000, 1)
+
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self.started_at) * 1000, 1)
+
+    def log(self):
+        log_info("Application started.", total_ms=self.total_ms(), phases_ms=self.phases)
+
+
+def _read_secrets_snapshot(path: str) -> Optional[dict]:
+    try:
+        if time.time() - os.path.getmtime(path) > env.SECRETS_SNAPSHOT_MAX_AGE_SECONDS:
+            return None
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log_warning("Reading the secrets snapshot failed.", exception=e, path=path)
+        return None
+
+
+def _write_secrets_snapshot(path: str, secrets: dict):
+    try:
+        # Readable by the owner only, the snapshot holds every secret in plain text.
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as file:
+            json.dump(secrets, file)
+    except Exception as e:
+        log_warning("Writing the secrets snapshot failed.", exception=e, path=path)
+
+
+def fetch_secrets() -> dict:
+    """
+    Secrets from Secret Manager, or from the local snapshot when SECRETS_SNAPSHOT_PATH is set and the snapshot is
+    younger than SECRETS_SNAPSHOT_MAX_AGE_SECONDS. Only meant for local development and restarts on the same host.
+    """
+    path = env.SECRETS_SNAPSHOT_PATH
+    if path:
+        secrets = _read_secrets_snapshot(path)
+        if secrets is not None:
+            return secrets
+
+    from app.external.secret_manager import SecretManager
+
+    secrets = SecretManager().get_secrets()
+    if path:
+        _write_secrets_snapshot(path, secrets)
+    return secrets
+
+
+def configure_openai(api_key: str):
+    # openai is only needed for a few requests and slow to import. It reads OPENAI_API_KEY when it is first
+    # imported, the module is only touched here when something already imported it.
+    os.environ["OPENAI_API_KEY"] = api_key
+    if "openai" in sys.modules:
+        sys.modules["openai"].api_key = api_key
+
+
+def connect_firestore():
+    fireo.connection(from_file=os.getenv("GOOGLE_APPLICATION_CREDENTIALS"))
+    async_client()
+
+
+async def startup(container, report: StartupReport) -> dict:
+    """
+    Fetches the secrets and connects to Firestore at the same time, then configures the services that need the
+    secrets. Blocking client code runs in threads so the phases overlap.
+
+    Returns:
+        dict: The secrets.
+    """
+
+    async def load_secrets() -> dict:
+        async with report.phase("secrets"):
+            return await asyncio.to_thread(fetch_secrets)
+
+    async def load_firestore():
+        async with report.phase("firestore"):
+            await asyncio.to_thread(connect_firestore)
+
+    secrets, _ = await asyncio.gather(load_secrets(), load_firestore())
+
+    async with report.phase("services"):
+        from app.secret_loader import set_secrets
+
+        set_secrets(secrets)
+        container.config.from_dict(secrets)
+        configure_openai(secrets.get("open_ai_secret_key"))
+    return secrets
@@ -0,0 +1,95 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from tests.unit.stand_ins import stand_in_modules
+
+with stand_in_modules():
+    from app.api import admin
+    from app.common.utils.circuit_breaker import circuit_breaker
+    from app.constants import ADMIN_API_KEY, API_KEY
+    from app.external.shopify_client import ShopifyClient
+
+MERCHANT = {
+    "store_url": "store.myshopify.com",
+    "store_logo_url": "https://store.example.com/logo.png",
+    "contact_us_page_link": "https://store.example.com/contact",
+    "email": "support@example.com",
+    "name": "Store",
+}
+
+
+class CircuitBreakersEndpointTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        circuit_breaker("upstream", slow_call_seconds=1.0)
+        app = FastAPI()
+        app.include_router(admin.router)
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_breaker_states_are_listed(self):
+        res = await self.client.get("/api/admin/circuit-breakers", headers={"API_KEY": ADMIN_API_KEY})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["upstream"]["state"], "closed")
+
+    @pytest.mark.asyncio
+    async def test_admin_key_is_required(self):
+        res = await self.client.get("/api/admin/circuit-breakers", headers={"API_KEY": API_KEY})
+
+        self.assertEqual(res.status_code, 403)
+
+    @pytest.mark.asyncio
+    async def test_retry_policy_stats_are_listed(self):
+        stats = {"calls": 10, "retries": 2, "failures": 1, "budget_exhausted": 0}
+        with patch("app.api.admin.shopify_retry_policy.stats", MagicMock(return_value=stats)):
+            res = await self.client.get("/api/admin/retry-policies", headers={"API_KEY": ADMIN_API_KEY})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["shopify"], stats)
+        self.assertEqual(set(res.json()["ship24"]), {"calls", "retries", "failures", "budget_exhausted"})
+
+
+class CreateMerchantEndpointTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.shopify_client = AsyncMock()
+        self.shopify_client.create_webhook.return_value = {
+            "data": {"webhookSubscriptionCreate": {"userErrors": [], "webhookSubscription": {"id": "1"}}}
+        }
+        app = FastAPI()
+        app.include_router(admin.router)
+        app.dependency_overrides[ShopifyClient] = lambda: self.shopify_client
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    @pytest.mark.asyncio
+    @patch("app.api.admin.env.SHOPIFY_WEBHOOK_CALLBACK_URL", "api.example.com/api/shopify/webhooks")
+    @patch("app.api.admin.merchant_repository.create", new_callable=AsyncMock)
+    async def test_new_merchant_is_subscribed_to_the_order_webhooks(self, mock_create):
+        res = await self.client.post("/api/admin/merchants", json=MERCHANT, headers={"API_KEY": ADMIN_API_KEY})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(mock_create.await_args.args[0].store_url, "store.myshopify.com")
+        self.assertEqual(
+            {call.args[1] for call in self.shopify_client.create_webhook.await_args_list},
+            {"ORDERS_CREATE", "ORDERS_UPDATED", "ORDERS_CANCELLED", "FULFILLMENTS_CREATE", "FULFILLMENTS_UPDATE"},
+        )
+        for call in self.shopify_client.create_webhook.await_args_list:
+            self.assertEqual(call.args[::2], ("store.myshopify.com", "api.example.com/api/shopify/webhooks"))
+
+    @pytest.mark.asyncio
+    @patch("app.api.admin.env.SHOPIFY_WEBHOOK_CALLBACK_URL", "")
+    @patch("app.api.admin.merchant_repository.create", new_callable=AsyncMock)
+    async def test_no_subscription_without_a_callback_url(self, mock_create):
+        res = await self.client.post("/api/admin/merchants", json=MERCHANT, headers={"API_KEY": ADMIN_API_KEY})
+
+        self.assertEqual(res.status_code, 200)
+        self.shopify_client.create_webhook.assert_not_awaited()
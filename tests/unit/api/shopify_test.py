@@ -0,0 +1,236 @@
+import asyncio
+import json
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from dependency_injector import providers
+from fastapi import FastAPI
+
+from tests.unit.stand_ins import stand_in_modules
+from tests.unit.utils import sample_settings
+
+with stand_in_modules():
+    from app.api import shopify
+    from app.api.shopify import _stream_orders
+    from app.auth.authentication import get_current_user, get_store_info
+    from app.constants import ADMIN_EMAIL, API_KEY, ChadStatus
+    from app.external.shopify_client import ShopifyClient
+    from app.external.shopify_rate_limiter import ShopifyRateLimiter
+    from app.external.shopify_transport import ShopifyGraphQLTransport
+    from app.model.merchant import RetrieveMerchantResponse
+    from app.model.order import Order
+    from app.model.user import User
+    from app.secrets import Secrets
+    from app.service_container import ServiceContainer
+    from app.services.tracking_service import GetTrackingDetailsRequest, TrackingDetails
+
+REFUNDED_ORDER = {
+    "id": "gid://shopify/Order/1",
+    "name": "#1001",
+    "createdAt": "2023-06-01T12:00:00Z",
+    "updatedAt": "2023-06-02T12:00:00Z",
+    "displayFinancialStatus": "REFUNDED",
+    "displayFulfillmentStatus": "UNFULFILLED",
+    "customer": {"id": "gid://shopify/Customer/1", "email": "jane@example.com"},
+    "fulfillments": [],
+    "currentTotalPriceSet": {"shopMoney": {"amount": "0.0", "currencyCode": "CAD"}},
+    "totalOutstandingSet": {"shopMoney": {"amount": "0.0", "currencyCode": "CAD"}},
+    "refunds": [{"totalRefundedSet": {"shopMoney": {"amount": "20.0", "currencyCode": "CAD"}}}],
+    "shippingAddress": {"firstName": "Jane", "lastName": "Doe"},
+    "lineItems": {"edges": [{"node": {"id": "gid://shopify/LineItem/1", "currentQuantity": 0}}]},
+}
+
+
+def _edge(order_id: str, tracking_number: str = None) -> dict:
+    node = {"id": f"gid://shopify/Order/{order_id}", "fulfillments": []}
+    if tracking_number:
+        node["fulfillments"] = [
+            {"requiresShipping": True, "trackingInfo": [{"company": "UPS", "number": tracking_number}]}
+        ]
+    return {"node": node}
+
+
+def _tracking_details(tracking_number: str) -> TrackingDetails:
+    return TrackingDetails(
+        tracker_id=f"tracker-{tracking_number}",
+        tracking_number=tracking_number,
+        courier="UPS",
+        status_milestone="in_transit",
+        chad_status="Shipped",
+    )
+
+
+async def _lines(tracking_service, edges: list) -> list:
+    orders = [Order.parse(edge["node"]) for edge in edges]
+    chunks = [chunk async for chunk in _stream_orders(tracking_service, edges, orders, {"pageInfo": {}})]
+    # Every chunk is exactly one JSON document terminated by a newline.
+    for chunk in chunks:
+        assert chunk.endswith(b"\n") and chunk.count(b"\n") == 1
+    return [json.loads(chunk) for chunk in chunks]
+
+
+def _tracking_service(cached: dict = None, fetch=None) -> AsyncMock:
+    tracking_service = AsyncMock()
+    tracking_service.get_cached_tracking_details_many.return_value = cached or {}
+    tracking_service.fetch_tracking_details.side_effect = fetch
+    return tracking_service
+
+
+class StreamOrdersTestCase(IsolatedAsyncioTestCase):
+    @pytest.mark.asyncio
+    async def test_one_batched_cache_read_per_page(self):
+        tracking_service = _tracking_service(
+            cached={"111": _tracking_details("111")},
+            fetch=lambda courier, tracking_number: _tracking_details(tracking_number),
+        )
+
+        lines = await _lines(tracking_service, [_edge("1", "111"), _edge("2"), _edge("3", "222")])
+
+        tracking_service.get_cached_tracking_details_many.assert_awaited_once_with(
+            [
+                GetTrackingDetailsRequest(courier="UPS", tracking_number="111"),
+                GetTrackingDetailsRequest(courier="UPS", tracking_number="222"),
+            ]
+        )
+        # Only the cache miss is looked up.
+        tracking_service.fetch_tracking_details.assert_awaited_once_with("UPS", "222")
+        # Untracked orders first, then the cached ones, then the looked up ones, then the trailer.
+        self.assertEqual(
+            [line["order"]["node"]["id"] for line in lines[:-1]],
+            ["gid://shopify/Order/2", "gid://shopify/Order/1", "gid://shopify/Order/3"],
+        )
+        self.assertEqual(lines[1]["order"]["node"]["trackingDetails"]["tracker_id"], "tracker-111")
+        self.assertEqual(lines[2]["order"]["node"]["trackingDetails"]["tracker_id"], "tracker-222")
+        self.assertEqual(lines[-1], {"pageInfo": {}})
+
+    @pytest.mark.asyncio
+    async def test_missing_result_only_marks_its_order(self):
+        tracking_service = _tracking_service(
+            fetch=lambda courier, tracking_number: _tracking_details(tracking_number)
+            if tracking_number == "111"
+            else None
+        )
+
+        lines = await _lines(tracking_service, [_edge("1", "111"), _edge("2", "222")])
+
+        nodes = {line["order"]["node"]["id"]: line["order"]["node"] for line in lines[:-1]}
+        self.assertIn("trackingDetails", nodes["gid://shopify/Order/1"])
+        self.assertEqual(nodes["gid://shopify/Order/2"]["trackingInfoErrorMessage"], "Status not available")
+        self.assertEqual(lines[-1], {"pageInfo": {}})
+
+    @pytest.mark.asyncio
+    async def test_failed_lookup_only_marks_its_order(self):
+        def fetch(courier, tracking_number):
+            if tracking_number == "222":
+                raise RuntimeError("Ship24 is down")
+            return _tracking_details(tracking_number)
+
+        tracking_service = _tracking_service(fetch=fetch)
+
+        lines = await _lines(tracking_service, [_edge("1", "111"), _edge("2"), _edge("3", "222")])
+
+        self.assertEqual(len(lines), 4)
+        nodes = {line["order"]["node"]["id"]: line["order"]["node"] for line in lines[:-1]}
+        self.assertNotIn("trackingInfoErrorMessage", nodes["gid://shopify/Order/2"])
+        self.assertIn("trackingDetails", nodes["gid://shopify/Order/1"])
+        self.assertEqual(nodes["gid://shopify/Order/3"]["trackingInfoErrorMessage"], "Status not available")
+        self.assertEqual(lines[-1], {"pageInfo": {}})
+
+    @pytest.mark.asyncio
+    async def test_failed_cache_read_falls_back_to_lookups(self):
+        tracking_service = _tracking_service(fetch=lambda courier, tracking_number: _tracking_details(tracking_number))
+        tracking_service.get_cached_tracking_details_many.side_effect = RuntimeError("Firestore is down")
+
+        lines = await _lines(tracking_service, [_edge("1", "111")])
+
+        self.assertEqual(lines[0]["order"]["node"]["trackingDetails"]["tracker_id"], "tracker-111")
+        self.assertEqual(lines[-1], {"pageInfo": {}})
+
+    @pytest.mark.asyncio
+    async def test_slow_lookup_does_not_hold_back_the_other_orders(self):
+        async def fetch(courier, tracking_number):
+            if tracking_number == "222":
+                await asyncio.sleep(1)
+            return _tracking_details(tracking_number)
+
+        tracking_service = _tracking_service(fetch=fetch)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        received = []
+        orders_edges = [_edge("1", "111"), _edge("2", "222"), _edge("3", "333")]
+        orders = [Order.parse(edge["node"]) for edge in orders_edges]
+
+        with patch("app.api.shopify.env.TRACKING_TIMEOUT_SECONDS", 0.2):
+            async for chunk in _stream_orders(tracking_service, orders_edges, orders, {"pageInfo": {}}):
+                received.append((loop.time() - started, json.loads(chunk)))
+
+        ids = [line["order"]["node"]["id"] for _, line in received[:-1]]
+        self.assertEqual(ids[-1], "gid://shopify/Order/2")
+        # The fast orders are sent with their tracking details before the slow lookup times out.
+        for elapsed, line in received[:2]:
+            self.assertLess(elapsed, 0.2)
+            self.assertIn("trackingDetails", line["order"]["node"])
+        # The slow one is only marked unavailable once its own timeout passed, not after the full sleep.
+        self.assertEqual(received[2][1]["order"]["node"]["trackingInfoErrorMessage"], "Status not available")
+        self.assertLess(received[-1][0], 0.9)
+        self.assertEqual(received[-1][1], {"pageInfo": {}})
+
+
+class GetOrderByIdFieldsTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(json.loads(request.content))
+            return httpx.Response(200, json={"data": {"order": json.loads(json.dumps(REFUNDED_ORDER))}})
+
+        shopify_client = ShopifyClient(settings=Secrets(**sample_settings()))
+        shopify_client.transport = ShopifyGraphQLTransport(http_transport=httpx.MockTransport(handler))
+        shopify_client.rate_limiter = ShopifyRateLimiter()
+        shopify_client.order_projection = AsyncMock()
+        shopify_client.order_projection.get_order.return_value = None
+        self.shopify_client = shopify_client
+
+        self.container = ServiceContainer()
+        self.container.tracking_service.override(providers.Object(AsyncMock()))
+        self.container.wire(modules=[shopify])
+        patch("app.api.utils.db_order.order_repository.get_by_order_id", AsyncMock(return_value=None)).start()
+        self.addCleanup(patch.stopall)
+
+        app = FastAPI()
+        app.include_router(shopify.router)
+        app.dependency_overrides[ShopifyClient] = lambda: shopify_client
+        app.dependency_overrides[get_current_user] = lambda: User(email=ADMIN_EMAIL, store_url="store.myshopify.com")
+        app.dependency_overrides[get_store_info] = lambda: RetrieveMerchantResponse(
+            id="1",
+            store_url="store.myshopify.com",
+            store_logo_url="",
+            contact_us_page_link="",
+            email="support@example.com",
+            name="Store",
+        )
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        await self.shopify_client.transport.aclose()
+        self.container.unwire()
+
+    @pytest.mark.asyncio
+    async def test_minimal_fields_still_get_the_derived_fields(self):
+        res = await self.client.get(
+            "/api/shopify/order/1",
+            params={"fields": "shippingAddress"},
+            headers={"API_KEY": API_KEY, "shop-url": "store.myshopify.com"},
+        )
+
+        self.assertEqual(res.status_code, 200)
+        order = res.json()["data"]["order"]
+        self.assertNotIn("lineItems", self.requests[0]["query"])
+        self.assertNotIn("lineItems", order)
+        self.assertEqual(order["shippingAddress"], REFUNDED_ORDER["shippingAddress"])
+        # The status and refunded amount need refunds and the totals, which every selection includes.
+        self.assertEqual(order["chadFulfillmentStatus"], ChadStatus.REFUNDED.value)
+        self.assertEqual(order["refundedPriceSet"], {"shopMoney": {"amount": "20.00", "currencyCode": "CAD"}})
@@ -0,0 +1,160 @@
+import base64
+import hashlib
+import hmac
+import json
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from tests.unit.stand_ins import stand_in_modules
+from tests.unit.utils import sample_settings
+
+with stand_in_modules():
+    from app.api import shopify_webhooks
+    from app.api.shopify_webhooks import refresh_order, seen_webhook_ids
+    from app.external.shopify_client import ShopifyClient
+    from app.secret_loader import init_setting
+    from app.secrets import Secrets
+
+PAYLOAD = {"id": 1001, "updated_at": "2023-06-01T08:00:00-04:00"}
+
+
+def sign(body: bytes, secret: str = "shopify_client_secret") -> str:
+    return base64.b64encode(hmac.new(secret.encode(), body, hashlib.sha256).digest()).decode()
+
+
+class ShopifyWebhookTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        seen_webhook_ids.clear()
+        self.shopify_client = AsyncMock()
+        app = FastAPI()
+        app.include_router(shopify_webhooks.router)
+        app.dependency_overrides[init_setting] = lambda: Secrets(**sample_settings())
+        app.dependency_overrides[ShopifyClient] = lambda: self.shopify_client
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def post(self, payload: dict, topic: str = "orders/updated", webhook_id: str = "w1", signature: str = None):
+        body = json.dumps(payload).encode()
+        return await self.client.post(
+            "/api/shopify/webhooks",
+            content=body,
+            headers={
+                "X-Shopify-Hmac-Sha256": signature or sign(body),
+                "X-Shopify-Topic": topic,
+                "X-Shopify-Shop-Domain": "store.myshopify.com",
+                "X-Shopify-Webhook-Id": webhook_id,
+            },
+        )
+
+    @pytest.mark.asyncio
+    @patch("app.api.shopify_webhooks.refresh_order")
+    @patch("app.api.shopify_webhooks.ShopifyWebhookEventModelContext.register")
+    @patch("app.api.shopify_webhooks.ShopifyWebhookEventModelContext.is_registered", return_value=False)
+    async def test_invalid_signature_is_rejected(self, mock_is_registered, mock_register, mock_refresh):
+        res = await self.post(PAYLOAD, signature=sign(b"{}"))
+
+        self.assertEqual(res.status_code, 403)
+        mock_register.assert_not_called()
+        mock_refresh.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("app.api.shopify_webhooks.refresh_order")
+    @patch("app.api.shopify_webhooks.ShopifyWebhookEventModelContext.register")
+    @patch("app.api.shopify_webhooks.ShopifyWebhookEventModelContext.is_registered", return_value=False)
+    async def test_order_is_refreshed_in_the_background(self, mock_is_registered, mock_register, mock_refresh):
+        res = await self.post(PAYLOAD)
+
+        self.assertEqual(res.json(), {"status": "success"})
+        mock_refresh.assert_called_once_with(
+            self.shopify_client, "store.myshopify.com", "1001", "2023-06-01T08:00:00-04:00"
+        )
+
+    @pytest.mark.asyncio
+    @patch("app.api.shopify_webhooks.refresh_order")
+    @patch("app.api.shopify_webhooks.ShopifyWebhookEventModelContext.register")
+    @patch("app.api.shopify_webhooks.ShopifyWebhookEventModelContext.is_registered", return_value=False)
+    async def test_fulfillment_refreshes_its_order(self, mock_is_registered, mock_register, mock_refresh):
+        await self.post(
+            {"id": 7, "order_id": 1001, "updated_at": "2023-06-01T08:00:00-04:00"}, topic="fulfillments/update"
+        )
+
+        mock_refresh.assert_called_once_with(self.shopify_client, "store.myshopify.com", "1001", None)
+
+    @pytest.mark.asyncio
+    @patch("app.api.shopify_webhooks.refresh_order")
+    @patch("app.api.shopify_webhooks.ShopifyWebhookEventModelContext.register")
+    @patch("app.api.shopify_webhooks.ShopifyWebhookEventModelContext.is_registered", return_value=False)
+    async def test_redelivery_is_deduplicated(self, mock_is_registered, mock_register, mock_refresh):
+        await self.post(PAYLOAD)
+        res = await self.post(PAYLOAD)
+
+        self.assertEqual(res.json(), {"status": "duplicate"})
+        mock_register.assert_called_once()
+        mock_refresh.assert_called_once()
+
+    @pytest.mark.asyncio
+    @patch("app.api.shopify_webhooks.refresh_order")
+    @patch("app.api.shopify_webhooks.ShopifyWebhookEventModelContext.register")
+    @patch("app.api.shopify_webhooks.ShopifyWebhookEventModelContext.is_registered", return_value=False)
+    async def test_delivery_seen_by_another_instance_is_deduplicated(
+        self, mock_is_registered, mock_register, mock_refresh
+    ):
+        mock_is_registered.return_value = True
+
+        res = await self.post(PAYLOAD)
+
+        self.assertEqual(res.json(), {"status": "duplicate"})
+        mock_refresh.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("app.api.shopify_webhooks.refresh_order")
+    @patch("app.api.shopify_webhooks.ShopifyWebhookEventModelContext.register")
+    @patch("app.api.shopify_webhooks.ShopifyWebhookEventModelContext.is_registered", return_value=False)
+    async def test_delivery_is_recorded_after_the_refresh(self, mock_is_registered, mock_register, mock_refresh):
+        await self.post(PAYLOAD)
+
+        mock_register.assert_awaited_once_with("w1", "orders/updated", "store.myshopify.com")
+        self.assertTrue(seen_webhook_ids.get("w1"))
+
+    @pytest.mark.asyncio
+    @patch("app.api.shopify_webhooks.refresh_order")
+    @patch("app.api.shopify_webhooks.ShopifyWebhookEventModelContext.register")
+    @patch("app.api.shopify_webhooks.ShopifyWebhookEventModelContext.is_registered", return_value=False)
+    async def test_failed_refresh_is_not_recorded(self, mock_is_registered, mock_register, mock_refresh):
+        mock_refresh.side_effect = [RuntimeError("Shopify is unavailable"), None]
+
+        first = await self.post(PAYLOAD)
+        second = await self.post(PAYLOAD)
+
+        self.assertEqual(first.json(), {"status": "success"})
+        self.assertEqual(second.json(), {"status": "success"})
+        self.assertEqual(mock_refresh.call_count, 2)
+        mock_register.assert_awaited_once()
+
+
+class RefreshOrderTestCase(IsolatedAsyncioTestCase):
+    @pytest.mark.asyncio
+    @patch("app.api.shopify_webhooks.OrderProjectionModelContext.get_shopify_updated_at")
+    async def test_projection_as_recent_as_the_webhook_is_kept(self, mock_get_updated_at):
+        mock_get_updated_at.return_value = "2023-06-01T12:00:00Z"
+        shopify_client = AsyncMock()
+
+        await refresh_order(shopify_client, "store.myshopify.com", "1001", "2023-06-01T08:00:00-04:00")
+
+        shopify_client.refresh_order_projection.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("app.api.shopify_webhooks.OrderProjectionModelContext.get_shopify_updated_at")
+    async def test_older_projection_is_refreshed(self, mock_get_updated_at):
+        mock_get_updated_at.return_value = "2023-06-01T11:59:59Z"
+        shopify_client = AsyncMock()
+
+        await refresh_order(shopify_client, "store.myshopify.com", "1001", "2023-06-01T08:00:00-04:00")
+
+        shopify_client.refresh_order_projection.assert_awaited_once_with("store.myshopify.com", "1001")
@@ -0,0 +1,69 @@
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+import pytest
+
+from app.api.utils import check_order_ownership, get_chad_status
+from app.common.exceptions.exceptions import PermissionDenied
+from app.constants import ChadStatus
+from app.db.order import DBOrder
+from app.model.user import User
+
+USER = User(email="jane@example.com", store_url="example.myshopify.com")
+
+
+class CheckOrderOwnershipTestCase(TestCase):
+    def test_owner_passes(self):
+        check_order_ownership({"customer": {"email": "jane@example.com"}}, USER)
+
+    def test_other_customer_is_denied(self):
+        with self.assertRaises(PermissionDenied):
+            check_order_ownership({"customer": {"email": "john@example.com"}}, USER)
+
+    def test_order_without_customer_is_denied(self):
+        with self.assertRaises(PermissionDenied):
+            check_order_ownership({"customer": None}, USER)
+        with self.assertRaises(PermissionDenied):
+            check_order_ownership({}, USER)
+
+
+SHIPPED_ORDER = {
+    "displayFulfillmentStatus": "FULFILLED",
+    "fulfillments": [{"displayStatus": "IN_TRANSIT", "createdAt": "2023-01-01T00:00:00Z"}],
+}
+
+
+class GetChadStatusTestCase(IsolatedAsyncioTestCase):
+    @pytest.mark.asyncio
+    @patch("app.db.order.order_repository.get_by_order_id")
+    async def test_prefetched_order_is_used(self, mock_get_by_order_id):
+        db_orders = {"1": DBOrder(order_id="1", status="CANCELED", original_order_details={"name": "#1001"})}
+
+        res = await get_chad_status(dict(SHIPPED_ORDER), "1", db_orders)
+
+        self.assertEqual(res, ("CANCELED", {"name": "#1001"}, False))
+        mock_get_by_order_id.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("app.db.order.order_repository.get_by_order_id")
+    async def test_order_missing_from_the_map_uses_shopify_status(self, mock_get_by_order_id):
+        res = await get_chad_status(dict(SHIPPED_ORDER), "2", {})
+
+        self.assertEqual(res, (ChadStatus.SHIPPED.value, None, False))
+        mock_get_by_order_id.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_cancelation_is_flagged(self):
+        db_orders = {"1": DBOrder(order_id="1", status="CANCELATION_FAILED")}
+
+        res = await get_chad_status(dict(SHIPPED_ORDER), "1", db_orders)
+
+        self.assertEqual(res, (ChadStatus.SHIPPED.value, None, True))
+
+    @pytest.mark.asyncio
+    @patch("app.db.order.order_repository.get_by_order_id", return_value=None)
+    async def test_without_prefetch_the_order_is_read_on_its_own(self, mock_get_by_order_id):
+        res = await get_chad_status(dict(SHIPPED_ORDER), "1")
+
+        self.assertEqual(res, (ChadStatus.SHIPPED.value, None, False))
+        mock_get_by_order_id.assert_awaited_once_with("1")
@@ -0,0 +1,76 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+import pytest
+
+from app.common.cache.loading_cache import AsyncLoadingCache
+
+
+class AsyncLoadingCacheTestCase(IsolatedAsyncioTestCase):
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_load(self):
+        cache = AsyncLoadingCache(ttl=60)
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"store_url": "store"}
+
+        results = await asyncio.gather(*(cache.get("store", loader) for _ in range(5)))
+        self.assertEqual(calls, 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+        await cache.get("store", loader)
+        self.assertEqual(calls, 1)
+
+    @pytest.mark.asyncio
+    async def test_invalidate_forces_reload(self):
+        cache = AsyncLoadingCache(ttl=60)
+        values = iter(["first", "second"])
+
+        async def loader():
+            return next(values)
+
+        self.assertEqual(await cache.get("store", loader), "first")
+        cache.invalidate("store")
+        self.assertEqual(await cache.get("store", loader), "second")
+
+    @pytest.mark.asyncio
+    async def test_result_of_load_invalidated_in_flight_is_not_cached(self):
+        cache = AsyncLoadingCache(ttl=60)
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_loader():
+            started.set()
+            await release.wait()
+            return "stale"
+
+        pending = asyncio.ensure_future(cache.get("store", slow_loader))
+        await started.wait()
+        cache.invalidate("store")
+        release.set()
+        self.assertEqual(await pending, "stale")
+
+        async def loader():
+            return "fresh"
+
+        self.assertEqual(await cache.get("store", loader), "fresh")
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_waiter_and_are_not_cached(self):
+        cache = AsyncLoadingCache(ttl=60)
+
+        async def failing_loader():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("firestore unavailable")
+
+        results = await asyncio.gather(*(cache.get("store", failing_loader) for _ in range(3)), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+        async def loader():
+            return "loaded"
+
+        self.assertEqual(await cache.get("store", loader), "loaded")
@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+from app.common.cache.lru_ttl_cache import LRUTTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class LRUTTLCacheTestCase(TestCase):
+    def test_entry_expires_after_its_ttl(self):
+        clock = FakeClock()
+        cache = LRUTTLCache(clock=clock)
+        cache.set("short", 1, ttl=10)
+        cache.set("long", 2, ttl=100)
+
+        clock.now = 50
+        self.assertIsNone(cache.get("short"))
+        self.assertEqual(cache.get("long"), 2)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUTTLCache(max_size=2)
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2, ttl=60)
+        cache.get("a")
+        cache.set("c", 3, ttl=60)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_non_positive_ttl_removes_entry(self):
+        cache = LRUTTLCache()
+        cache.set("a", 1, ttl=60)
+        cache.set("a", 1, ttl=0)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
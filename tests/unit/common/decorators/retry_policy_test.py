@@ -0,0 +1,116 @@
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from app.common.decorators.retry_policy import RetryBudget, RetryPolicy
+
+
+class RetryBudgetTestCase(TestCase):
+    def test_retries_are_capped_to_a_share_of_calls(self):
+        budget = RetryBudget("upstream", ratio=0.1, min_retries=0, window_seconds=10)
+        for _ in range(20):
+            budget.record_call(now=100)
+
+        self.assertTrue(budget.try_acquire_retry(now=100))
+        self.assertTrue(budget.try_acquire_retry(now=100))
+        self.assertFalse(budget.try_acquire_retry(now=100))
+        self.assertEqual(budget.rejected, 1)
+
+    def test_min_retries_are_always_allowed(self):
+        budget = RetryBudget("upstream", ratio=0.1, min_retries=2)
+
+        self.assertTrue(budget.try_acquire_retry(now=100))
+        self.assertTrue(budget.try_acquire_retry(now=100))
+        self.assertFalse(budget.try_acquire_retry(now=100))
+
+    def test_old_retries_leave_the_window(self):
+        budget = RetryBudget("upstream", ratio=0.1, min_retries=1, window_seconds=10)
+        self.assertTrue(budget.try_acquire_retry(now=100))
+        self.assertFalse(budget.try_acquire_retry(now=109))
+
+        self.assertTrue(budget.try_acquire_retry(now=110))
+
+
+class RetryPolicyTestCase(TestCase):
+    def test_sync_call_is_retried_until_it_succeeds(self):
+        function = Mock(side_effect=[ConnectionError(), ConnectionError(), "ok"])
+        policy = RetryPolicy("upstream", attempts=3, sleep=False)
+
+        self.assertEqual(policy.call(function, 1, key="value"), "ok")
+        self.assertEqual(function.call_count, 3)
+        function.assert_called_with(1, key="value")
+        self.assertEqual(policy.stats(), {"calls": 1, "retries": 2, "failures": 0, "budget_exhausted": 0})
+
+    def test_last_exception_is_raised_after_the_last_attempt(self):
+        function = Mock(side_effect=ConnectionError())
+        policy = RetryPolicy("upstream", attempts=3, sleep=False)
+
+        with self.assertRaises(ConnectionError):
+            policy.call(function)
+        self.assertEqual(function.call_count, 3)
+        self.assertEqual(policy.failures, 1)
+
+    def test_exception_rules(self):
+        policy = RetryPolicy(
+            "upstream",
+            retry_on=(ConnectionError, ValueError),
+            give_up_on=(ConnectionRefusedError,),
+            retry_if=lambda e: "permanent" not in str(e),
+        )
+
+        self.assertTrue(policy.should_retry(ConnectionResetError()))
+        self.assertFalse(policy.should_retry(ConnectionRefusedError()))
+        self.assertFalse(policy.should_retry(KeyError()))
+        self.assertFalse(policy.should_retry(ValueError("permanent")))
+
+    def test_exception_that_is_not_retried_is_raised_at_once(self):
+        function = Mock(side_effect=KeyError())
+        policy = RetryPolicy("upstream", retry_on=(ConnectionError,), sleep=False)
+
+        with self.assertRaises(KeyError):
+            policy.call(function)
+        function.assert_called_once()
+
+    def test_exhausted_budget_stops_retries(self):
+        budget = RetryBudget("upstream", ratio=0, min_retries=1)
+        function = Mock(side_effect=ConnectionError())
+        policy = RetryPolicy("upstream", attempts=5, budget=budget, sleep=False)
+
+        with self.assertRaises(ConnectionError):
+            policy.call(function)
+        self.assertEqual(function.call_count, 2)
+        self.assertEqual(policy.budget_exhausted, 1)
+
+    def test_full_jitter_stays_under_the_exponential_cap(self):
+        policy = RetryPolicy("upstream", base_delay=0.1, max_delay=1.0)
+
+        with patch("app.common.decorators.retry_policy.random.uniform", side_effect=lambda low, high: high):
+            self.assertEqual([policy.delay(retry) for retry in range(5)], [0.1, 0.2, 0.4, 0.8, 1.0])
+
+
+class AsyncRetryPolicyTestCase(IsolatedAsyncioTestCase):
+    @pytest.mark.asyncio
+    @patch("app.common.decorators.retry_policy.asyncio.sleep")
+    @patch("app.common.decorators.retry_policy.time.sleep")
+    async def test_async_call_sleeps_without_blocking(self, mock_time_sleep, mock_asyncio_sleep):
+        function = AsyncMock(side_effect=[ConnectionError(), "ok"])
+        policy = RetryPolicy("upstream", attempts=2, base_delay=1.0)
+
+        self.assertEqual(await policy.call_async(function), "ok")
+        mock_asyncio_sleep.assert_awaited_once()
+        mock_time_sleep.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_decorator_keeps_coroutine_functions_async(self):
+        calls = []
+
+        @RetryPolicy("upstream", sleep=False)
+        async def fetch(value):
+            calls.append(value)
+            if len(calls) == 1:
+                raise ConnectionError()
+            return value
+
+        self.assertEqual(await fetch("order"), "order")
+        self.assertEqual(calls, ["order", "order"])
@@ -1,4 +1,6 @@
-from unittest import TestCase
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+import pytest
 
 from app.common.decorators.retry_with_backoff_decorator import retry_with_backoff
 
@@ -25,3 +27,17 @@ class RetryWithBackoffTestCase(TestCase):
         retry_class_object = TestRetry()
         self.assertRaises(KeyError, retry_class_object.do_work)
         self.assertEqual(retry_class_object.call_count, 3)
+
+
+class AsyncRetryWithBackoffTestCase(IsolatedAsyncioTestCase):
+    @pytest.mark.asyncio
+    async def test_fail_open_returns_none(self):
+        calls = []
+
+        @retry_with_backoff(retries=2, fail_open=True, test_mode=True)
+        async def do_work():
+            calls.append(1)
+            raise KeyError()
+
+        self.assertIsNone(await do_work())
+        self.assertEqual(len(calls), 2)
@@ -0,0 +1,93 @@
+import zlib
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from starlette.responses import PlainTextResponse
+
+from app.common.middleware.compression import CompressionMiddleware, negotiate_encoding
+
+LARGE_BODY = "order " * 1000
+
+
+class NegotiateEncodingTestCase(TestCase):
+    @patch("app.common.middleware.compression.brotli", None)
+    def test_gzip_without_brotli(self):
+        self.assertEqual(negotiate_encoding("gzip, deflate, br"), "gzip")
+        self.assertIsNone(negotiate_encoding("br"))
+        self.assertIsNone(negotiate_encoding(""))
+
+    @patch("app.common.middleware.compression.brotli", object())
+    def test_brotli_is_preferred_unless_the_client_ranks_it_lower(self):
+        self.assertEqual(negotiate_encoding("gzip, deflate, br"), "br")
+        self.assertEqual(negotiate_encoding("br;q=0.5, gzip"), "gzip")
+        self.assertEqual(negotiate_encoding("*"), "br")
+        self.assertIsNone(negotiate_encoding("gzip;q=0, br;q=0"))
+
+
+class CompressionMiddlewareTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        app = FastAPI()
+
+        @app.get("/large")
+        async def large():
+            return PlainTextResponse(LARGE_BODY)
+
+        @app.get("/small")
+        async def small():
+            return PlainTextResponse("ok")
+
+        app.add_middleware(CompressionMiddleware, minimum_size=100)
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    @pytest.mark.asyncio
+    @patch("app.common.middleware.compression.brotli", None)
+    async def test_large_response_is_compressed(self):
+        res = await self.client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(res.headers["content-encoding"], "gzip")
+        self.assertEqual(res.headers["vary"], "Accept-Encoding")
+        self.assertLess(int(res.headers["content-length"]), len(LARGE_BODY))
+        self.assertEqual(res.text, LARGE_BODY)
+
+    @pytest.mark.asyncio
+    async def test_small_response_is_sent_as_is(self):
+        res = await self.client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+        self.assertNotIn("content-encoding", res.headers)
+        self.assertEqual(res.text, "ok")
+
+    @pytest.mark.asyncio
+    async def test_response_is_not_compressed_without_accept_encoding(self):
+        res = await self.client.get("/large", headers={"Accept-Encoding": "identity"})
+
+        self.assertNotIn("content-encoding", res.headers)
+
+    @pytest.mark.asyncio
+    @patch("app.common.middleware.compression.brotli", None)
+    async def test_streamed_chunks_can_be_decoded_as_they_arrive(self):
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", b"21")]})
+            for index in range(3):
+                await send({"type": "http.response.body", "body": f"line {index}\n".encode(), "more_body": index < 2})
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+        await CompressionMiddleware(app, minimum_size=100)(scope, None, send)
+
+        headers = dict(messages[0]["headers"])
+        self.assertEqual(headers[b"content-encoding"], b"gzip")
+        self.assertNotIn(b"content-length", headers)
+        decompressor = zlib.decompressobj(31)
+        chunks = [decompressor.decompress(message["body"]) for message in messages[1:]]
+        self.assertEqual(chunks, [b"line 0\n", b"line 1\n", b"line 2\n"])
+        self.assertTrue(decompressor.eof)
@@ -0,0 +1,143 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.common.utils.circuit_breaker import CircuitBreaker, CircuitOpenException, CircuitState
+
+
+def breaker(**kwargs) -> CircuitBreaker:
+    options = dict(
+        slow_call_seconds=1.0,
+        failure_rate_threshold=0.5,
+        slow_call_rate_threshold=0.5,
+        minimum_calls=4,
+        window_seconds=10,
+        open_seconds=30,
+        half_open_max_calls=2,
+    )
+    return CircuitBreaker("upstream", **{**options, **kwargs})
+
+
+class CircuitBreakerTestCase(TestCase):
+    def test_opens_at_the_failure_rate(self):
+        circuit_breaker = breaker()
+        for failed in (False, False, True):
+            circuit_breaker.record(0.1, failed, now=100)
+        self.assertEqual(circuit_breaker.state, CircuitState.CLOSED)
+
+        circuit_breaker.record(0.1, True, now=100)
+
+        self.assertEqual(circuit_breaker.state, CircuitState.OPEN)
+        self.assertFalse(circuit_breaker.allow(now=129))
+        self.assertEqual(circuit_breaker.rejected, 1)
+
+    def test_opens_at_the_slow_call_rate(self):
+        circuit_breaker = breaker()
+        for duration in (0.1, 0.1, 1.5, 2.0):
+            circuit_breaker.record(duration, False, now=100)
+
+        self.assertEqual(circuit_breaker.state, CircuitState.OPEN)
+
+    def test_stays_closed_below_the_minimum_calls(self):
+        circuit_breaker = breaker()
+        for _ in range(3):
+            circuit_breaker.record(0.1, True, now=100)
+
+        self.assertEqual(circuit_breaker.state, CircuitState.CLOSED)
+
+    def test_failures_leave_the_window(self):
+        circuit_breaker = breaker()
+        for _ in range(3):
+            circuit_breaker.record(0.1, True, now=100)
+        circuit_breaker.record(0.1, True, now=110)
+
+        self.assertEqual(circuit_breaker.state, CircuitState.CLOSED)
+
+    def test_half_open_closes_after_successful_trial_calls(self):
+        circuit_breaker = breaker()
+        for _ in range(4):
+            circuit_breaker.record(0.1, True, now=100)
+
+        first = circuit_breaker.admit(now=130)
+        self.assertIsNotNone(first)
+        self.assertEqual(circuit_breaker.state, CircuitState.HALF_OPEN)
+        second = circuit_breaker.admit(now=130)
+        self.assertFalse(circuit_breaker.allow(now=130))
+        circuit_breaker.record(0.1, False, now=130, generation=first)
+        circuit_breaker.record(0.1, False, now=130, generation=second)
+
+        self.assertEqual(circuit_breaker.state, CircuitState.CLOSED)
+
+    def test_half_open_opens_again_on_a_slow_trial_call(self):
+        circuit_breaker = breaker()
+        for _ in range(4):
+            circuit_breaker.record(0.1, True, now=100)
+        generation = circuit_breaker.admit(now=130)
+
+        circuit_breaker.record(5.0, False, now=131, generation=generation)
+
+        self.assertEqual(circuit_breaker.state, CircuitState.OPEN)
+        self.assertFalse(circuit_breaker.allow(now=160))
+        self.assertTrue(circuit_breaker.allow(now=161))
+
+    def test_calls_admitted_before_the_breaker_opened_are_not_trial_calls(self):
+        circuit_breaker = breaker()
+        closed = [circuit_breaker.admit(now=100) for _ in range(3)]
+        for _ in range(4):
+            circuit_breaker.record(0.1, True, now=100)
+        trial = circuit_breaker.admit(now=130)
+
+        # Calls let through while closed that end during the half open state say nothing about the recovery.
+        for generation in closed:
+            circuit_breaker.record(0.1, False, now=130, generation=generation)
+        circuit_breaker.record(0.1, False, now=130)
+        self.assertEqual(circuit_breaker.state, CircuitState.HALF_OPEN)
+
+        circuit_breaker.record(0.1, False, now=130, generation=trial)
+        circuit_breaker.record(0.1, False, now=130, generation=circuit_breaker.admit(now=130))
+        self.assertEqual(circuit_breaker.state, CircuitState.CLOSED)
+
+    def test_late_failures_do_not_open_the_breaker_again(self):
+        circuit_breaker = breaker()
+        closed = circuit_breaker.admit(now=100)
+        for _ in range(4):
+            circuit_breaker.record(0.1, True, now=100)
+        trial = circuit_breaker.admit(now=130)
+
+        circuit_breaker.record(0.1, True, now=130, generation=closed)
+
+        self.assertEqual(circuit_breaker.state, CircuitState.HALF_OPEN)
+        circuit_breaker.record(0.1, True, now=130, generation=trial)
+        self.assertEqual(circuit_breaker.state, CircuitState.OPEN)
+
+
+class CircuitBreakerCallTestCase(IsolatedAsyncioTestCase):
+    @pytest.mark.asyncio
+    async def test_open_breaker_rejects_calls_without_calling(self):
+        circuit_breaker = breaker(minimum_calls=1)
+        function = AsyncMock(side_effect=ConnectionError())
+        with self.assertRaises(ConnectionError):
+            await circuit_breaker.call_async(function)
+
+        with self.assertRaises(CircuitOpenException):
+            await circuit_breaker.call_async(function)
+        function.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_exceptions_rejected_by_failure_if_do_not_count(self):
+        circuit_breaker = breaker(minimum_calls=1, failure_if=lambda e: not isinstance(e, KeyError))
+        with self.assertRaises(KeyError):
+            await circuit_breaker.call_async(AsyncMock(side_effect=KeyError()))
+
+        self.assertEqual(circuit_breaker.state, CircuitState.CLOSED)
+
+    @pytest.mark.asyncio
+    async def test_timed_out_call_counts_as_failed(self):
+        circuit_breaker = breaker(minimum_calls=1)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(circuit_breaker.call_async(asyncio.sleep, 1), 0.01)
+
+        self.assertEqual(circuit_breaker.state, CircuitState.OPEN)
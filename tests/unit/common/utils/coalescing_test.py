@@ -0,0 +1,72 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+import pytest
+
+from app.common.utils.coalescing import RequestCoalescer
+
+
+class RequestCoalescerTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.coalescer = RequestCoalescer("test")
+        self.calls = 0
+
+    async def fetch(self, value=None):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return {"order": {"id": value or "1"}}
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_calls_share_one_request(self):
+        res = await asyncio.gather(*[self.coalescer.run("order-1", self.fetch) for _ in range(3)])
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(res, [{"order": {"id": "1"}}] * 3)
+        self.assertEqual(self.coalescer.stats(), {"calls": 3, "coalesced": 2, "in_flight": 0})
+
+    @pytest.mark.asyncio
+    async def test_callers_get_their_own_copy(self):
+        first, second = await asyncio.gather(*[self.coalescer.run("order-1", self.fetch) for _ in range(2)])
+
+        first["order"]["id"] = "changed"
+
+        self.assertEqual(second["order"]["id"], "1")
+
+    @pytest.mark.asyncio
+    async def test_different_keys_are_not_collapsed(self):
+        await asyncio.gather(
+            self.coalescer.run("order-1", lambda: self.fetch("1")),
+            self.coalescer.run("order-2", lambda: self.fetch("2")),
+        )
+
+        self.assertEqual(self.calls, 2)
+
+    @pytest.mark.asyncio
+    async def test_finished_call_is_not_reused(self):
+        await self.coalescer.run("order-1", self.fetch)
+        await self.coalescer.run("order-1", self.fetch)
+
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(self.coalescer.coalesced, 0)
+
+    @pytest.mark.asyncio
+    async def test_error_is_shared(self):
+        async def fail():
+            self.calls += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        res = await asyncio.gather(*[self.coalescer.run("order-1", fail) for _ in range(2)], return_exceptions=True)
+
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(isinstance(error, RuntimeError) for error in res))
+        self.assertEqual(self.coalescer.in_flight, 0)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_the_others(self):
+        first = asyncio.ensure_future(self.coalescer.run("order-1", self.fetch))
+        second = asyncio.ensure_future(self.coalescer.run("order-1", self.fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        self.assertEqual(await second, {"order": {"id": "1"}})
@@ -0,0 +1,81 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+import pytest
+
+from app.common.utils.concurrency import as_completed_bounded, gather_bounded
+
+
+class GatherBoundedTestCase(IsolatedAsyncioTestCase):
+    @pytest.mark.asyncio
+    async def test_results_keep_input_order(self):
+        async def work(value, delay):
+            await asyncio.sleep(delay)
+            return value
+
+        delays = [0.03, 0.01, 0.02, 0]
+        res = await gather_bounded([lambda v=v, d=d: work(v, d) for v, d in enumerate(delays)], limit=4)
+        self.assertEqual(res, [0, 1, 2, 3])
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_capped(self):
+        running = 0
+        peak = 0
+
+        async def work():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await gather_bounded([work for _ in range(10)], limit=3)
+        self.assertEqual(peak, 3)
+
+    @pytest.mark.asyncio
+    async def test_timed_out_call_resolves_to_none(self):
+        async def work(delay):
+            await asyncio.sleep(delay)
+            return delay
+
+        res = await gather_bounded([lambda: work(1), lambda: work(0)], limit=2, timeout=0.05)
+        self.assertEqual(res, [None, 0])
+
+
+class AsCompletedBoundedTestCase(IsolatedAsyncioTestCase):
+    @pytest.mark.asyncio
+    async def test_yields_in_completion_order(self):
+        async def work(value, delay):
+            await asyncio.sleep(delay)
+            return value
+
+        delays = [0.03, 0.01, 0.02]
+        res = [
+            item async for item in as_completed_bounded([lambda v=v, d=d: work(v, d) for v, d in enumerate(delays)], 3)
+        ]
+
+        self.assertEqual(res, [(1, 1), (2, 2), (0, 0)])
+
+    @pytest.mark.asyncio
+    async def test_timeout_resolves_to_none(self):
+        res = [item async for item in as_completed_bounded([lambda: asyncio.sleep(1, "late")], 1, timeout=0.01)]
+
+        self.assertEqual(res, [(0, None)])
+
+    @pytest.mark.asyncio
+    async def test_stopping_early_cancels_pending_calls(self):
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        results = as_completed_bounded([lambda: asyncio.sleep(0, "fast"), slow], 2)
+        self.assertEqual(await results.__anext__(), (0, "fast"))
+        await results.aclose()
+        await asyncio.sleep(0)
+
+        self.assertTrue(cancelled.is_set())
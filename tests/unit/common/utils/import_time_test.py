@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+from app.common.utils.import_time import (
+    ImportFailed,
+    ModuleImportTime,
+    measure_import,
+    parse_import_times,
+    total_import_us,
+)
+
+# Cold import of the app on a developer machine, workers pay it on every boot.
+APP_IMPORT_BUDGET_MS = 2500
+
+OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       249 |        249 |   _io
+import time:       498 |       1317 | _frozen_importlib_external
+import time:        80 |         80 |     app.environment
+import time:       120 |        200 |   app.db
+import time:       300 |        500 | app.main
+"""
+
+
+class ParseImportTimesTestCase(TestCase):
+    def test_lines_are_parsed_with_their_depth(self):
+        times = parse_import_times(OUTPUT)
+
+        self.assertEqual(times[0], ModuleImportTime("_io", 249, 249, 1))
+        self.assertEqual(times[2], ModuleImportTime("app.environment", 80, 80, 2))
+        self.assertEqual(times[-1], ModuleImportTime("app.main", 300, 500, 0))
+
+    def test_total_leaves_out_interpreter_startup(self):
+        self.assertEqual(total_import_us(parse_import_times(OUTPUT), "app.main"), 500)
+
+
+class MeasureImportTestCase(TestCase):
+    def test_import_is_measured_in_a_fresh_interpreter(self):
+        times = measure_import("app.common.utils.import_time")
+
+        self.assertGreater(total_import_us(times, "app.common.utils.import_time"), 0)
+
+    def test_failed_import_raises(self):
+        with self.assertRaises(ImportFailed):
+            measure_import("app.no_such_module")
+
+
+class AppImportBudgetTestCase(TestCase):
+    def test_app_imports_within_budget(self):
+        # Runs `python -X importtime -c "import app.main"` in a fresh interpreter. An app that does not import at all
+        # fails the budget too.
+        try:
+            times = measure_import("app.main")
+        except ImportFailed as e:
+            self.fail(f"app.main cannot be imported: {e}")
+
+        total_ms = total_import_us(times, "app.main") / 1000
+        slowest = sorted(times, key=lambda entry: entry.self_us, reverse=True)[:10]
+        self.assertLessEqual(
+            total_ms,
+            APP_IMPORT_BUDGET_MS,
+            "Slowest imports: " + ", ".join(f"{entry.module} {entry.self_us / 1000:.1f} ms" for entry in slowest),
+        )
@@ -0,0 +1,34 @@
+import datetime
+from decimal import Decimal
+from unittest import TestCase
+from unittest.mock import patch
+
+from app.common.utils import json_codec
+from app.common.utils.json_codec import CodecJSONResponse
+
+ORDER = {
+    "id": "gid://shopify/Order/1",
+    "name": "Café #1001",
+    "totalPriceSet": {"shopMoney": {"amount": "10.00", "currencyCode": "EUR"}},
+    "lineItems": {"edges": [{"node": {"currentQuantity": 1}}]},
+    "processedAt": datetime.datetime(2023, 6, 1, 8, 0, tzinfo=datetime.timezone.utc),
+    "taxRate": Decimal("0.19"),
+}
+EXPECTED = {**ORDER, "processedAt": "2023-06-01T08:00:00+00:00", "taxRate": "0.19"}
+
+
+class JsonCodecTestCase(TestCase):
+    def test_round_trip(self):
+        self.assertEqual(json_codec.loads(json_codec.dumps(ORDER)), EXPECTED)
+
+    def test_stdlib_fallback_matches(self):
+        with patch("app.common.utils.json_codec.orjson", None):
+            encoded = json_codec.dumps(ORDER)
+            self.assertEqual(json_codec.loads(encoded), EXPECTED)
+        self.assertIn('"name":"Café #1001","totalPriceSet"'.encode(), encoded)
+
+    def test_response_renders_with_the_codec(self):
+        response = CodecJSONResponse({"order": ORDER})
+
+        self.assertEqual(json_codec.loads(response.body), {"order": EXPECTED})
+        self.assertEqual(response.headers["content-type"], "application/json")
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from app.db.order_projection import CustomerOrderIndexModel, OrderProjectionModel, OrderProjectionModelContext
+
+MAX_AGE = timedelta(minutes=5)
+ORDER = {"id": "gid://shopify/Order/1", "name": "#1001"}
+
+
+def _projection(shop_url: str) -> OrderProjectionModel:
+    return OrderProjectionModel.from_dict(
+        {
+            "id": "1",
+            "order_id": "1",
+            "shop_url": shop_url,
+            "shopify_updated_at": "2023-06-01T12:00:00Z",
+            "order": ORDER,
+            "synced_at": datetime.now(timezone.utc),
+        }
+    )
+
+
+def _index(shop_url: str, **fields) -> CustomerOrderIndexModel:
+    return CustomerOrderIndexModel.from_dict(
+        {
+            "id": "1",
+            "customer_id": "gid://shopify/Customer/1",
+            "shop_url": shop_url,
+            "customer": {"id": "gid://shopify/Customer/1"},
+            "order_ids": ["1"],
+            "cursors": ["c1"],
+            "synced_at": datetime.now(timezone.utc),
+            **fields,
+        }
+    )
+
+
+class OrderProjectionShopTestCase(TestCase):
+    def setUp(self):
+        self.projections = MagicMock()
+        self.indexes = MagicMock()
+        patch.object(OrderProjectionModel, "collection", self.projections).start()
+        patch.object(CustomerOrderIndexModel, "collection", self.indexes).start()
+        self.addCleanup(patch.stopall)
+
+    def test_projection_is_served_to_its_shop(self):
+        self.projections.get.return_value = _projection("store.myshopify.com")
+
+        self.assertEqual(OrderProjectionModelContext._get_order("store.myshopify.com", "1", MAX_AGE), ORDER)
+
+    def test_projection_of_another_shop_is_not_served(self):
+        self.projections.get.return_value = _projection("other.myshopify.com")
+
+        self.assertIsNone(OrderProjectionModelContext._get_order("store.myshopify.com", "1", MAX_AGE))
+        self.assertIsNone(OrderProjectionModelContext._get_shopify_updated_at("store.myshopify.com", "1"))
+
+    def test_customer_orders_of_another_shop_are_not_served(self):
+        self.indexes.get.return_value = _index("store.myshopify.com")
+        self.projections.filter.return_value.fetch.return_value = [_projection("other.myshopify.com")]
+
+        self.assertIsNone(
+            OrderProjectionModelContext._get_customer_orders("store.myshopify.com", "gid://shopify/Customer/1", MAX_AGE)
+        )
+
+        self.indexes.get.return_value = _index("other.myshopify.com")
+        self.assertIsNone(
+            OrderProjectionModelContext._get_customer_orders("store.myshopify.com", "gid://shopify/Customer/1", MAX_AGE)
+        )
+
+    def test_customer_orders_are_served_with_their_cursors(self):
+        self.indexes.get.return_value = _index("store.myshopify.com")
+        self.projections.filter.return_value.fetch.return_value = [_projection("store.myshopify.com")]
+
+        self.assertEqual(
+            OrderProjectionModelContext._get_customer_orders(
+                "store.myshopify.com", "gid://shopify/Customer/1", MAX_AGE
+            ),
+            ({"id": "gid://shopify/Customer/1"}, [("c1", ORDER)]),
+        )
+
+    def test_index_without_cursors_is_not_served(self):
+        self.indexes.get.return_value = _index("store.myshopify.com", cursors=None)
+        self.projections.filter.return_value.fetch.return_value = [_projection("store.myshopify.com")]
+
+        self.assertIsNone(
+            OrderProjectionModelContext._get_customer_orders("store.myshopify.com", "gid://shopify/Customer/1", MAX_AGE)
+        )
+
+    def test_new_order_drops_the_customer_index(self):
+        self.indexes.get.return_value = _index("store.myshopify.com")
+
+        OrderProjectionModelContext._upsert_order(
+            "store.myshopify.com", {"id": "gid://shopify/Order/2", "customer": {"id": "gid://shopify/Customer/1"}}
+        )
+
+        self.indexes.delete.assert_called_once_with(self.indexes.get.return_value.key)
+
+    def test_known_order_keeps_the_customer_index(self):
+        self.indexes.get.return_value = _index("store.myshopify.com")
+
+        OrderProjectionModelContext._upsert_order(
+            "store.myshopify.com", {"id": "gid://shopify/Order/1", "customer": {"id": "gid://shopify/Customer/1"}}
+        )
+
+        self.indexes.delete.assert_not_called()
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import uuid
+from unittest import IsolatedAsyncioTestCase, TestCase, skipUnless
+from unittest.mock import MagicMock
+
+import pytest
+from google.cloud.firestore import SERVER_TIMESTAMP, AsyncClient
+
+from app.db.firestore import natural_key_id
+from app.db.order import DBOrder, OrderRepository
+from app.db.otp import MAX_TRY_COUNT, DBOtp, OtpRepository
+from app.db.repository import to_document
+from app.db.user import DBUser, UserRepository
+
+# Run against the local emulator: gcloud emulators firestore start --host-port=localhost:8080
+# and FIRESTORE_EMULATOR_HOST=localhost:8080 pytest tests/unit/db
+EMULATOR_HOST = os.getenv("FIRESTORE_EMULATOR_HOST")
+
+
+class DocumentIdTestCase(TestCase):
+    def setUp(self):
+        self.users = UserRepository(DBUser, client=lambda: None)
+
+    def test_new_model_gets_the_natural_key_id(self):
+        user = DBUser.from_dict({"email": "jane@example.com"})
+
+        self.assertEqual(self.users.document_id(user), natural_key_id("jane@example.com"))
+
+    def test_loaded_model_keeps_its_id(self):
+        user = DBUser.from_dict({"id": "legacy-id", "email": "jane@example.com"})
+
+        self.assertEqual(self.users.document_id(user), "legacy-id")
+
+    def test_key_parts_do_not_run_together(self):
+        self.assertNotEqual(natural_key_id("ab", "c"), natural_key_id("a", "bc"))
+
+
+class ModelConversionTestCase(TestCase):
+    def test_document_has_defaults_and_no_id(self):
+        document = to_document(DBOtp.from_dict({"id": "otp-1", "email": "jane@example.com"}))
+
+        self.assertEqual(document["email"], "jane@example.com")
+        self.assertEqual(document["try_count"], 0)
+        self.assertEqual(document["created_at"], SERVER_TIMESTAMP)
+        self.assertNotIn("id", document)
+        # None values are left out, like fireo does.
+        self.assertNotIn("code", document)
+
+    def test_snapshot_is_read_into_the_model(self):
+        snapshot = MagicMock(id="otp-1", exists=True)
+        snapshot.reference.path = "otp/otp-1"
+        snapshot.to_dict.return_value = {"email": "jane@example.com", "try_count": 2}
+
+        otp = OtpRepository(DBOtp, client=lambda: None).to_model(snapshot)
+
+        self.assertEqual((otp.id, otp.email, otp.try_count), ("otp-1", "jane@example.com", 2))
+
+
+@skipUnless(EMULATOR_HOST, "FIRESTORE_EMULATOR_HOST is not set")
+class AsyncRepositoryEmulatorTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # A fresh project per test keeps the emulator data of the tests apart.
+        client = AsyncClient(project=f"test-{uuid.uuid4().hex[:12]}")
+        self.client = client
+        self.users = UserRepository(DBUser, client=lambda: client)
+        self.otps = OtpRepository(DBOtp, client=lambda: client)
+        self.orders = OrderRepository(DBOrder, client=lambda: client)
+
+    async def asyncTearDown(self):
+        self.client.close()
+
+    @pytest.mark.asyncio
+    async def test_saved_model_is_found_by_field(self):
+        user = DBUser.from_dict({"user_id": "u1", "email": "jane@example.com", "shopify_customer_id": "1"})
+        await self.users.save(user)
+
+        found = await self.users.get_by_email("jane@example.com")
+
+        self.assertEqual(found.user_id, "u1")
+        self.assertEqual(found.id, natural_key_id("jane@example.com"))
+        self.assertIsNotNone(found.created_at)
+        self.assertIsNone(await self.users.get_by_email("john@example.com"))
+
+    @pytest.mark.asyncio
+    async def test_update_writes_only_the_given_fields(self):
+        user = DBUser.from_dict({"user_id": "u1", "email": "jane@example.com"})
+        await self.users.save(user)
+        stale = await self.users.get_by_user_id("u1")
+
+        await self.users.update(stale, {"shopify_customer_id": "42"})
+
+        found = await self.users.get_by_user_id("u1")
+        self.assertEqual(found.shopify_customer_id, "42")
+        self.assertEqual(found.email, "jane@example.com")
+
+    @pytest.mark.asyncio
+    async def test_orders_are_loaded_in_chunks(self):
+        await self.orders.save_many([DBOrder.from_dict({"order_id": str(i), "status": "ORDERED"}) for i in range(25)])
+
+        found = await self.orders.get_by_order_ids([str(i) for i in range(0, 30, 2)])
+
+        self.assertEqual(sorted(found, key=int), [str(i) for i in range(0, 25, 2)])
+
+    @pytest.mark.asyncio
+    async def test_otp_is_deleted_once_verified(self):
+        await self.otps.save(DBOtp.from_dict({"email": "jane@example.com", "code": "1234"}))
+
+        self.assertFalse(await self.otps.verify("jane@example.com", "0000"))
+        self.assertEqual((await self.otps.get_by_email("jane@example.com")).try_count, 1)
+        self.assertTrue(await self.otps.verify("jane@example.com", "1234"))
+        self.assertIsNone(await self.otps.get_by_email("jane@example.com"))
+
+    @pytest.mark.asyncio
+    async def test_otp_is_deleted_after_too_many_tries(self):
+        await self.otps.save(DBOtp.from_dict({"email": "jane@example.com", "code": "1234", "try_count": MAX_TRY_COUNT}))
+
+        self.assertFalse(await self.otps.verify("jane@example.com", "0000"))
+        self.assertIsNone(await self.otps.get_by_email("jane@example.com"))
+
+    @pytest.mark.asyncio
+    async def test_concurrent_wrong_codes_use_up_the_tries_once(self):
+        await self.otps.save(DBOtp.from_dict({"email": "jane@example.com", "code": "1234"}))
+
+        await asyncio.gather(*[self.otps.verify("jane@example.com", "0000") for _ in range(MAX_TRY_COUNT)])
+
+        self.assertEqual((await self.otps.get_by_email("jane@example.com")).try_count, MAX_TRY_COUNT)
+
+    @pytest.mark.asyncio
+    async def test_legacy_document_is_found_and_migrated(self):
+        from app.db.migrations.deterministic_ids import migrate
+
+        _, legacy = await self.users.collection.add({"user_id": "u1", "email": "jane@example.com"})
+
+        self.assertEqual((await self.users.get_by_email("jane@example.com")).id, legacy.id)
+
+        result = await migrate(self.users)
+
+        self.assertEqual((result.moved, result.dropped), (1, 0))
+        self.assertFalse((await legacy.get()).exists)
+        self.assertIsNotNone(await self.users.get(natural_key_id("jane@example.com")))
+        self.assertEqual((await migrate(self.users)).skipped, 1)
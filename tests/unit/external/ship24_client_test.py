@@ -0,0 +1,105 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from tests.unit.stand_ins import stand_in_modules
+
+with stand_in_modules():
+    from app.common.utils.circuit_breaker import CircuitBreaker, CircuitOpenException, CircuitState
+    from app.external.ship24_client import Ship24Client
+
+# https://docs.ship24.com/tracking-api-reference/#/operations/bulk-create-trackers
+BULK_CREATE_RESPONSE = {
+    "status": "partial",
+    "data": [
+        {
+            "itemStatus": "created",
+            "tracker": {
+                "trackerId": "tracker-1",
+                "trackingNumber": "111",
+                "courierCode": ["dhl"],
+                "isSubscribed": True,
+                "createdAt": "2023-06-01T12:00:00.000Z",
+            },
+        },
+        {
+            "itemStatus": "error",
+            "errors": [{"code": "tracking_number_invalid", "message": "Tracking number is invalid."}],
+        },
+    ],
+}
+
+
+def _session(status: int, body: dict) -> MagicMock:
+    response = MagicMock(status=status)
+    response.json = AsyncMock(return_value=body)
+    session = MagicMock()
+    session.post.return_value.__aenter__ = AsyncMock(return_value=response)
+    session.post.return_value.__aexit__ = AsyncMock(return_value=False)
+    return session
+
+
+class Ship24ClientBulkCreateTestCase(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.client = Ship24Client("api-key")
+
+    @pytest.mark.asyncio
+    async def test_tracker_ids_are_read_from_the_data_items(self):
+        self.client.session = _session(207, BULK_CREATE_RESPONSE)
+
+        res = await self.client.bulk_create_trackers({"111": "DHL", "xyz": "UPS"})
+
+        self.assertEqual(res, {"111": "tracker-1"})
+        self.assertEqual(
+            self.client.session.post.call_args.kwargs["json"],
+            [{"trackingNumber": "111", "courierName": "DHL"}, {"trackingNumber": "xyz", "courierName": "UPS"}],
+        )
+
+    @pytest.mark.asyncio
+    async def test_failed_request_creates_no_trackers(self):
+        self.client.session = _session(400, {"errors": []})
+
+        res = await self.client.bulk_create_trackers({"111": "DHL"})
+
+        self.assertEqual(res, {})
+
+
+class Ship24ClientTrackerCreationTestCase(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.client = Ship24Client("api-key")
+        self.breaker = CircuitBreaker("ship24", slow_call_seconds=1.0, minimum_calls=1)
+        patch("app.external.ship24_client.ship24_circuit_breaker", self.breaker).start()
+        self.addCleanup(patch.stopall)
+
+    @pytest.mark.asyncio
+    async def test_failed_creation_is_sent_once_and_opens_the_breaker(self):
+        self.client.session = _session(503, {})
+
+        res = await self.client.initiate_tracker("DHL", "111")
+
+        self.assertIsNone(res)
+        self.client.session.post.assert_called_once()
+        self.assertEqual(self.breaker.state, CircuitState.OPEN)
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_sends_no_creation(self):
+        self.breaker.record(0, failed=True)
+        self.client.session = _session(207, BULK_CREATE_RESPONSE)
+
+        with self.assertRaises(CircuitOpenException):
+            await self.client.initiate_tracker("DHL", "111")
+        res = await self.client.bulk_create_trackers({"111": "DHL"})
+
+        self.assertEqual(res, {})
+        self.client.session.post.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_bulk_creation_is_sent_once(self):
+        self.client.session = _session(502, {})
+
+        res = await self.client.bulk_create_trackers({"111": "DHL"})
+
+        self.assertEqual(res, {})
+        self.client.session.post.assert_called_once()
+        self.assertEqual(self.breaker.state, CircuitState.OPEN)
@@ -0,0 +1,440 @@
+import asyncio
+import json
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from tests.unit.stand_ins import stand_in_modules
+from tests.unit.utils import sample_settings
+
+with stand_in_modules():
+    from app.common.decorators.retry_policy import RetryPolicy
+    from app.common.utils.coalescing import RequestCoalescer
+    from app.external import shopify_queries as queries
+    from app.external.shopify_client import ShopifyClient, customer_by_email_cache
+    from app.external.shopify_rate_limiter import ShopifyRateLimiter
+    from app.external.shopify_transport import ShopifyException, ShopifyGraphQLTransport, shopify_retry_policy
+    from app.secrets import Secrets
+
+CUSTOMER = {"id": "gid://shopify/Customer/1", "firstName": "Jane", "lastName": "Doe"}
+ORDERS = {"edges": [{"cursor": "c1", "node": {"id": "gid://shopify/Order/1"}}], "pageInfo": {"hasNextPage": False}}
+PAGE_INFO = {"startCursor": "a", "endCursor": "a", "hasNextPage": False, "hasPreviousPage": False}
+
+
+class ShopifyClientCustomerOrdersTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        customer_by_email_cache.clear()
+        self.requests = []
+        self.customer_exists = True
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            body = json.loads(request.content)
+            self.requests.append(body)
+            if "customers(" in body["query"]:
+                edge = {"node": {**CUSTOMER, "orders": ORDERS}}
+                return httpx.Response(200, json={"data": {"customers": {"edges": [edge], "pageInfo": PAGE_INFO}}})
+            customer = {**CUSTOMER, "orders": ORDERS} if self.customer_exists else None
+            return httpx.Response(200, json={"data": {"customer": customer}})
+
+        self.client = ShopifyClient(settings=Secrets(**sample_settings()))
+        self.client.transport = ShopifyGraphQLTransport(http_transport=httpx.MockTransport(handler))
+        self.client.rate_limiter = ShopifyRateLimiter()
+        self.client.order_projection = AsyncMock()
+        self.client.order_projection.get_customer_orders.return_value = None
+
+    async def asyncTearDown(self):
+        await self.client.transport.aclose()
+        customer_by_email_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_first_lookup_is_a_single_query(self):
+        res = await self.client.get_customer_orders_by_email("store.myshopify.com", "jane@example.com")
+
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(self.requests[0]["variables"], {"query": "email:jane@example.com", "first": 10, "after": None})
+        self.assertEqual(res["data"]["orders"], ORDERS)
+        self.assertEqual(res["data"]["customers"], {"edges": [{"node": CUSTOMER}], "pageInfo": PAGE_INFO})
+
+    @pytest.mark.asyncio
+    async def test_repeat_lookup_skips_the_customer_search(self):
+        first = await self.client.get_customer_orders_by_email("store.myshopify.com", "jane@example.com")
+        second = await self.client.get_customer_orders_by_email("store.myshopify.com", "Jane@Example.com")
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.requests[1]["variables"], {"id": CUSTOMER["id"], "first": 10, "after": None})
+        self.assertEqual(first, second)
+
+    @pytest.mark.asyncio
+    async def test_stale_customer_falls_back_to_the_email_lookup(self):
+        await self.client.get_customer_orders_by_email("store.myshopify.com", "jane@example.com")
+        self.customer_exists = False
+
+        res = await self.client.get_customer_orders_by_email("store.myshopify.com", "jane@example.com")
+
+        self.assertEqual(len(self.requests), 3)
+        self.assertIn("customers(", self.requests[2]["query"])
+        self.assertEqual(res["data"]["orders"], ORDERS)
+
+
+PROJECTED_ORDER = {
+    "id": "gid://shopify/Order/1",
+    "name": "#1001",
+    "updatedAt": "2023-06-01T12:00:00Z",
+    "customer": {"id": CUSTOMER["id"], "email": "jane@example.com"},
+    "transactions": [],
+    "lineItems": {
+        "edges": [
+            {"node": {"id": "gid://shopify/LineItem/1", "name": "Shirt", "quantity": 1, "currentQuantity": 1}},
+            {"node": {"id": "gid://shopify/LineItem/2", "name": "Hat", "quantity": 1, "currentQuantity": 0}},
+        ]
+    },
+}
+
+
+class ShopifyClientOrderProjectionTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            body = json.loads(request.content)
+            self.requests.append(body)
+            if "customer(" in body["query"]:
+                return httpx.Response(200, json={"data": {"customer": {**CUSTOMER, "orders": ORDERS}}})
+            if "orderEditCommit(" in body["query"]:
+                commit = {"order": {"id": "gid://shopify/Order/1"}, "userErrors": []}
+                return httpx.Response(200, json={"data": {"orderEditCommit": commit}})
+            return httpx.Response(200, json={"data": {"order": json.loads(json.dumps(PROJECTED_ORDER))}})
+
+        self.client = ShopifyClient(settings=Secrets(**sample_settings()))
+        self.client.transport = ShopifyGraphQLTransport(http_transport=httpx.MockTransport(handler))
+        self.client.rate_limiter = ShopifyRateLimiter()
+        self.client.order_projection = AsyncMock()
+
+    async def asyncTearDown(self):
+        await self.client.transport.aclose()
+
+    @pytest.mark.asyncio
+    async def test_fresh_projection_is_served_without_graphql(self):
+        self.client.order_projection.get_order.return_value = json.loads(json.dumps(PROJECTED_ORDER))
+
+        res = await self.client.get_order_by_id("store.myshopify.com", "1")
+
+        self.assertEqual(self.requests, [])
+        self.assertEqual(res["data"]["order"]["name"], "#1001")
+        # Line items are filtered the same way as for a GraphQL read.
+        self.assertEqual(len(res["data"]["order"]["lineItems"]["edges"]), 1)
+
+    @pytest.mark.asyncio
+    async def test_projection_is_read_for_the_requesting_shop(self):
+        self.client.order_projection.get_order.return_value = None
+        self.client.order_projection.get_customer_orders.return_value = None
+
+        await self.client.get_order_by_id("https://store.myshopify.com", "1")
+        await self.client.get_orders_by_customer_id("https://store.myshopify.com", CUSTOMER["id"])
+
+        self.assertEqual(self.client.order_projection.get_order.await_args.args[:2], ("store.myshopify.com", "1"))
+        self.assertEqual(
+            self.client.order_projection.get_customer_orders.await_args.args[:2],
+            ("store.myshopify.com", CUSTOMER["id"]),
+        )
+
+    @pytest.mark.asyncio
+    async def test_missing_projection_is_read_through(self):
+        self.client.order_projection.get_order.return_value = None
+        stored = []
+        self.client.order_projection.upsert_order.side_effect = lambda shop_url, order: stored.append(
+            (shop_url, json.loads(json.dumps(order)))
+        )
+
+        res = await self.client.get_order_by_id("https://store.myshopify.com", "1")
+
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(res["data"]["order"]["name"], "#1001")
+        # The projection keeps the order as Shopify returned it, before line items are filtered.
+        self.assertEqual(stored[0][0], "store.myshopify.com")
+        self.assertEqual(len(stored[0][1]["lineItems"]["edges"]), 2)
+
+    @pytest.mark.asyncio
+    async def test_projection_failure_falls_back_to_graphql(self):
+        self.client.order_projection.get_order.side_effect = RuntimeError("firestore unavailable")
+
+        res = await self.client.get_order_by_id("store.myshopify.com", "1")
+
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(res["data"]["order"]["name"], "#1001")
+
+    @pytest.mark.asyncio
+    async def test_failed_projection_write_fails_the_refresh(self):
+        self.client.order_projection.upsert_order.side_effect = RuntimeError("firestore unavailable")
+
+        with self.assertRaises(RuntimeError):
+            await self.client.refresh_order_projection("store.myshopify.com", "1")
+
+    @pytest.mark.asyncio
+    async def test_selected_fields_query_a_smaller_document(self):
+        self.client.order_projection.get_order.return_value = None
+        fields = queries.parse_order_fields("summary")
+
+        res = await self.client.get_order_by_id("store.myshopify.com", "1", fields=fields)
+
+        self.assertTrue(self.requests[0]["query"].startswith("query GetOrderByIdSummary("))
+        self.assertNotIn("lineItems", self.requests[0]["query"])
+        self.assertLessEqual(set(res["data"]["order"]), fields)
+        # A partial order must not replace the projection.
+        self.client.order_projection.upsert_order.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_refunded_items_of_a_partial_order(self):
+        self.client.order_projection.get_order.return_value = None
+
+        res = await self.client.get_order_by_id(
+            "store.myshopify.com", "1", get_refunded_items=True, fields=queries.parse_order_fields("summary")
+        )
+
+        self.assertEqual(res["data"]["order"]["name"], "#1001")
+        self.assertNotIn("currentSubtotalPriceSet", res["data"]["order"])
+
+    @pytest.mark.asyncio
+    async def test_projection_is_trimmed_to_the_selected_fields(self):
+        self.client.order_projection.get_order.return_value = json.loads(json.dumps(PROJECTED_ORDER))
+
+        res = await self.client.get_order_by_id(
+            "store.myshopify.com", "1", fields=queries.parse_order_fields("summary")
+        )
+
+        self.assertEqual(self.requests, [])
+        self.assertEqual(res["data"]["order"]["name"], "#1001")
+        self.assertNotIn("lineItems", res["data"]["order"])
+
+    @pytest.mark.asyncio
+    async def test_projected_customer_orders_are_shaped_like_graphql(self):
+        self.client.order_projection.get_customer_orders.return_value = (
+            CUSTOMER,
+            [("c1", PROJECTED_ORDER), ("c2", PROJECTED_ORDER)],
+        )
+
+        res = await self.client.get_orders_by_customer_id("store.myshopify.com", CUSTOMER["id"])
+
+        self.assertEqual(self.requests, [])
+        orders = res["data"]["customer"]["orders"]
+        # The cursors are the ones GraphQL returned for the indexed list.
+        self.assertEqual([edge["cursor"] for edge in orders["edges"]], ["c1", "c2"])
+        self.assertEqual(
+            orders["pageInfo"],
+            {"startCursor": "c1", "endCursor": "c2", "hasNextPage": False, "hasPreviousPage": False},
+        )
+        node = orders["edges"][0]["node"]
+        self.assertNotIn("transactions", node)
+        self.assertEqual(
+            set(node["lineItems"]["edges"][0]["node"]), {"id", "name", "image", "currentQuantity", "refundableQuantity"}
+        )
+
+    @pytest.mark.asyncio
+    async def test_customer_orders_beyond_the_page_size_use_graphql(self):
+        self.client.order_projection.get_customer_orders.return_value = (CUSTOMER, [("c1", PROJECTED_ORDER)] * 3)
+
+        await self.client.get_orders_by_customer_id("store.myshopify.com", CUSTOMER["id"], first=2)
+
+        self.assertEqual(len(self.requests), 1)
+
+    @pytest.mark.asyncio
+    async def test_complete_first_page_is_indexed(self):
+        self.client.order_projection.get_customer_orders.return_value = None
+
+        await self.client.get_orders_by_customer_id("store.myshopify.com", CUSTOMER["id"])
+
+        shop_url, customer, order_ids, cursors = self.client.order_projection.set_customer_order_ids.await_args.args
+        self.assertEqual(customer["id"], CUSTOMER["id"])
+        self.assertEqual(order_ids, ["1"])
+        self.assertEqual(cursors, ["c1"])
+
+    @pytest.mark.asyncio
+    async def test_order_mutations_invalidate_the_projection(self):
+        await self.client.refund_order("store.myshopify.com", "1", [], "0.00")
+        await self.client.change_shipping_address(
+            "store.myshopify.com", "1", "Jane", "Doe", "1 Main St", "", "Ottawa", "ON", "CA", "K1A 0B1"
+        )
+        await self.client.commit_edit_order("store.myshopify.com", "10")
+
+        self.assertEqual(
+            [call.args for call in self.client.order_projection.invalidate_order.await_args_list], [("1",)] * 3
+        )
+
+    @pytest.mark.asyncio
+    async def test_failed_invalidation_does_not_fail_the_mutation(self):
+        self.client.order_projection.invalidate_order.side_effect = RuntimeError("firestore unavailable")
+
+        res = await self.client.refund_order("store.myshopify.com", "1", [], "0.00")
+
+        self.assertIn("data", res)
+
+
+class ShopifyClientCoalescingTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(json.loads(request.content))
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"data": {"products": {"edges": []}}})
+
+        self.client = ShopifyClient(settings=Secrets(**sample_settings()))
+        self.client.transport = ShopifyGraphQLTransport(http_transport=httpx.MockTransport(handler))
+        self.client.rate_limiter = ShopifyRateLimiter()
+        self.client.coalescer = RequestCoalescer("shopify")
+
+    async def asyncTearDown(self):
+        await self.client.transport.aclose()
+
+    @pytest.mark.asyncio
+    async def test_identical_reads_in_flight_share_one_request(self):
+        await asyncio.gather(*[self.client.get_products("store.myshopify.com") for _ in range(3)])
+
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(self.client.coalescer.coalesced, 2)
+
+    @pytest.mark.asyncio
+    async def test_mutations_are_always_sent(self):
+        await asyncio.gather(*[self.client.send_order_invoice("store.myshopify.com", "1") for _ in range(2)])
+
+        self.assertEqual(len(self.requests), 2)
+
+
+class ShopifyClientThrottleTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.responses = [
+            {
+                "errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+                "extensions": {
+                    "cost": {
+                        "requestedQueryCost": 20,
+                        "throttleStatus": {"maximumAvailable": 1000, "currentlyAvailable": 0, "restoreRate": 1000},
+                    }
+                },
+            },
+            {"data": {"products": {"edges": []}}},
+        ]
+        self.calls = 0
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.calls += 1
+            return httpx.Response(200, json=self.responses.pop(0))
+
+        self.client = ShopifyClient(settings=Secrets(**sample_settings()))
+        self.client.transport = ShopifyGraphQLTransport(http_transport=httpx.MockTransport(handler))
+        self.client.rate_limiter = ShopifyRateLimiter()
+
+    async def asyncTearDown(self):
+        await self.client.transport.aclose()
+
+    @pytest.mark.asyncio
+    async def test_throttled_request_is_sent_again(self):
+        res = await self.client.get_products("store.myshopify.com")
+
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(res, {"data": {"products": {"edges": []}}})
+
+
+class ShopifyClientRetryTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.status_codes = [503, 200]
+        self.calls = 0
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.calls += 1
+            return httpx.Response(self.status_codes.pop(0), json={"data": {"products": {"edges": []}}})
+
+        self.client = ShopifyClient(settings=Secrets(**sample_settings()))
+        self.client.transport = ShopifyGraphQLTransport(http_transport=httpx.MockTransport(handler))
+        self.client.rate_limiter = ShopifyRateLimiter()
+        self.client.retry_policy = RetryPolicy(
+            "shopify", retry_on=shopify_retry_policy.retry_on, retry_if=shopify_retry_policy.retry_if, sleep=False
+        )
+
+    async def asyncTearDown(self):
+        await self.client.transport.aclose()
+
+    @pytest.mark.asyncio
+    async def test_query_failing_with_a_transient_error_is_retried(self):
+        res = await self.client.get_products("store.myshopify.com")
+
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(res, {"data": {"products": {"edges": []}}})
+
+    @pytest.mark.asyncio
+    async def test_query_failing_with_a_client_error_is_not_retried(self):
+        self.status_codes = [401, 200]
+
+        with self.assertRaises(ShopifyException):
+            await self.client.get_products("store.myshopify.com")
+        self.assertEqual(self.calls, 1)
+
+    @pytest.mark.asyncio
+    async def test_mutation_is_not_retried(self):
+        with self.assertRaises(ShopifyException):
+            await self.client.send_order_invoice("store.myshopify.com", "1")
+        self.assertEqual(self.calls, 1)
+
+
+def page(connection: str, ids: list, end_cursor: str, has_next_page: bool) -> dict:
+    return {
+        connection: {
+            "edges": [{"cursor": f"c{id}", "node": {"id": id}} for id in ids],
+            "pageInfo": {"endCursor": end_cursor, "hasNextPage": has_next_page},
+        }
+    }
+
+
+class ShopifyClientPaginationTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+        self.pages = {
+            None: page("orders", [1, 2], "c2", True),
+            "c2": page("orders", [3], "c3", False),
+        }
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            body = json.loads(request.content)
+            self.requests.append(body["variables"])
+            return httpx.Response(200, json={"data": self.pages[body["variables"]["after"]]})
+
+        self.client = ShopifyClient(settings=Secrets(**sample_settings()))
+        self.client.transport = ShopifyGraphQLTransport(http_transport=httpx.MockTransport(handler))
+        self.client.rate_limiter = ShopifyRateLimiter()
+
+    async def asyncTearDown(self):
+        await self.client.transport.aclose()
+
+    @pytest.mark.asyncio
+    async def test_follows_end_cursor_until_the_last_page(self):
+        ids = [edge["node"]["id"] async for edge in self.client.iter_orders_by_email("shop", "a@a.com", page_size=2)]
+
+        self.assertEqual(ids, [1, 2, 3])
+        self.assertEqual([variables["after"] for variables in self.requests], [None, "c2"])
+        self.assertEqual(self.requests[0], {"query": "email:a@a.com", "first": 2, "after": None})
+
+    @pytest.mark.asyncio
+    async def test_next_page_is_only_fetched_when_consumed(self):
+        orders = self.client.iter_orders_by_email("shop", "a@a.com", page_size=2)
+        await orders.__anext__()
+        await orders.__anext__()
+        await orders.aclose()
+
+        self.assertEqual(len(self.requests), 1)
+
+    @pytest.mark.asyncio
+    async def test_resumes_after_a_cursor(self):
+        ids = [edge["node"]["id"] async for edge in self.client.iter_orders_by_email("shop", "a@a.com", after="c2")]
+
+        self.assertEqual(ids, [3])
+
+    @pytest.mark.asyncio
+    async def test_variants_without_image_get_the_featured_image(self):
+        featured = {"id": "img", "url": "https://cdn/img.png"}
+        self.pages = {None: {"product": {"featuredImage": featured, **page("variants", [1], "c1", False)}}}
+
+        edges = [edge async for edge in self.client.iter_product_variants("shop", "1")]
+
+        self.assertEqual(edges[0]["node"]["image"], featured)
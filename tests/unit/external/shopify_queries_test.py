@@ -0,0 +1,92 @@
+import hashlib
+from unittest import TestCase
+
+from app.external import shopify_queries as queries
+from app.external.shopify_queries import QUERIES, minify
+
+
+class MinifyTestCase(TestCase):
+    def test_drops_insignificant_whitespace_and_commas(self):
+        document = """
+            query Q($id: ID!, $first: Int) {
+                order(id: $id) {
+                    id
+                    ... on Order { name }
+                }
+            }
+        """
+        self.assertEqual(minify(document), "query Q($id:ID!$first:Int){order(id:$id){id...on Order{name}}}")
+
+    def test_keeps_string_literals(self):
+        document = 'mutation { commit(note: "Order  was, updated \\"here\\"") { id } }'
+        self.assertEqual(minify(document), 'mutation{commit(note:"Order  was, updated \\"here\\""){id}}')
+
+
+class QueryRegistryTestCase(TestCase):
+    def test_documents_are_minified_and_balanced(self):
+        for query in QUERIES.values():
+            self.assertNotIn("\n", query.document, query.name)
+            self.assertNotIn("  ", query.document, query.name)
+            self.assertEqual(query.document.count("{"), query.document.count("}"), query.name)
+            self.assertEqual(query.document.count("("), query.document.count(")"), query.name)
+
+    def test_only_spread_fragments_are_appended(self):
+        document = queries.GET_ORDERS_BY_CUSTOMER_ID.document
+
+        self.assertEqual(document.count("fragment CustomerOrders on Customer"), 1)
+        # Spread by CustomerOrders itself
+        self.assertEqual(document.count("fragment Money on MoneyBag"), 1)
+        self.assertEqual(document.count("fragment PageInfo on PageInfo"), 1)
+        self.assertNotIn("fragment CustomerContact", document)
+        self.assertNotIn("fragment", queries.GET_PRODUCTS.document)
+
+    def test_hash_identifies_the_document(self):
+        for query in QUERIES.values():
+            self.assertEqual(query.hash, hashlib.sha256(query.document.encode()).hexdigest())
+        self.assertEqual(len({query.hash for query in QUERIES.values()}), len(QUERIES))
+
+    def test_names_are_unique(self):
+        with self.assertRaises(ValueError):
+            queries.register("GetProducts", "query GetProducts { shop { name } }")
+
+
+class OrderFieldsTestCase(TestCase):
+    def test_profiles_and_fields_are_combined_with_the_required_fields(self):
+        fields = queries.parse_order_fields("summary, shippingAddress")
+
+        self.assertLessEqual(set(queries.ORDER_REQUIRED_FIELDS), fields)
+        self.assertIn("totalPriceSet", fields)
+        self.assertIn("shippingAddress", fields)
+        self.assertNotIn("lineItems", fields)
+
+    def test_whole_order_is_none(self):
+        self.assertIsNone(queries.parse_order_fields(None))
+        self.assertIsNone(queries.parse_order_fields("detail"))
+        self.assertIsNone(queries.parse_order_fields(",".join(queries.ORDER_FIELDS)))
+
+    def test_unknown_names_are_rejected(self):
+        with self.assertRaises(ValueError):
+            queries.parse_order_fields("summary,secretField")
+
+    def test_profiles_get_a_named_query(self):
+        query = queries.order_query(queries.parse_order_fields("summary"))
+
+        self.assertEqual(query.name, "GetOrderByIdSummary")
+        self.assertIs(queries.QUERIES[query.name], query)
+        self.assertNotIn("lineItems", query.document)
+        self.assertNotIn("fragment OrderLineItem", query.document)
+        self.assertIs(queries.order_query(None), queries.GET_ORDER_BY_ID)
+
+    def test_other_field_sets_are_registered_once(self):
+        fields = queries.parse_order_fields("transactions")
+
+        query = queries.order_query(fields)
+
+        self.assertTrue(query.name.startswith("GetOrderByIdFields"))
+        self.assertIs(queries.order_query(frozenset(fields)), query)
+
+    def test_select_order_fields_trims_the_order(self):
+        order = {"id": "1", "name": "#1001", "lineItems": {"edges": []}}
+
+        self.assertEqual(queries.select_order_fields(order, frozenset({"id", "name"})), {"id": "1", "name": "#1001"})
+        self.assertIs(queries.select_order_fields(order, None), order)
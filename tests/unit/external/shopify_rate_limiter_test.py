@@ -0,0 +1,90 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+
+import pytest
+
+from app.external.shopify_rate_limiter import (
+    BACKGROUND,
+    DEFAULT_QUERY_COST,
+    INTERACTIVE,
+    ShopifyRateLimiter,
+    background_priority,
+    shopify_priority,
+)
+
+
+def cost_response(requested: float, available: float, restore_rate: float = 1000.0, throttled: bool = False) -> dict:
+    response = {
+        "extensions": {
+            "cost": {
+                "requestedQueryCost": requested,
+                "throttleStatus": {
+                    "maximumAvailable": 1000.0,
+                    "currentlyAvailable": available,
+                    "restoreRate": restore_rate,
+                },
+            }
+        }
+    }
+    if throttled:
+        response["errors"] = [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}]
+    return response
+
+
+class ShopifyRateLimiterTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.limiter = ShopifyRateLimiter()
+
+    @pytest.mark.asyncio
+    async def test_record_learns_query_cost(self):
+        self.assertEqual(self.limiter.estimated_cost("GetOrderById"), DEFAULT_QUERY_COST)
+
+        throttled = await self.limiter.record("shop", "GetOrderById", cost_response(212, 900))
+
+        self.assertFalse(throttled)
+        self.assertEqual(self.limiter.estimated_cost("GetOrderById"), 212)
+
+    @pytest.mark.asyncio
+    async def test_record_reports_throttled_responses(self):
+        self.assertTrue(await self.limiter.record("shop", "GetOrderById", cost_response(212, 10, throttled=True)))
+
+    @pytest.mark.asyncio
+    async def test_acquire_waits_for_the_bucket_to_refill(self):
+        # 50 points missing at 1000 points per second
+        await self.limiter.record("shop", "GetOrderById", cost_response(100, 50))
+
+        started = time.monotonic()
+        await self.limiter.acquire("shop", "GetOrderById")
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+
+    @pytest.mark.asyncio
+    async def test_acquire_does_not_wait_with_room_left(self):
+        await self.limiter.record("shop", "GetOrderById", cost_response(100, 0))
+        await self.limiter.record("other", "GetOrderById", cost_response(100, 1000))
+
+        await asyncio.wait_for(self.limiter.acquire("other", "GetOrderById"), 0.01)
+
+    @pytest.mark.asyncio
+    async def test_interactive_requests_go_ahead_of_background_work(self):
+        await self.limiter.record("shop", "GetOrderById", cost_response(100, 0))
+        served = []
+
+        async def acquire(name, priority):
+            await self.limiter.acquire("shop", "GetOrderById", priority=priority)
+            served.append(name)
+
+        background = asyncio.create_task(acquire("background", BACKGROUND))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(acquire("interactive", INTERACTIVE))
+        await asyncio.gather(background, interactive)
+
+        self.assertEqual(served, ["interactive", "background"])
+
+    @pytest.mark.asyncio
+    async def test_background_priority_sets_the_context(self):
+        self.assertEqual(shopify_priority.get(), INTERACTIVE)
+        with background_priority():
+            self.assertEqual(shopify_priority.get(), BACKGROUND)
+        self.assertEqual(shopify_priority.get(), INTERACTIVE)
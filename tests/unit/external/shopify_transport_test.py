@@ -0,0 +1,83 @@
+import json
+from unittest import IsolatedAsyncioTestCase
+
+import httpx
+import pytest
+
+from app.common.utils.circuit_breaker import CircuitState
+from app.external.shopify_transport import ShopifyException, ShopifyGraphQLTransport, shopify_circuit_breaker
+
+
+class ShopifyGraphQLTransportTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            if request.url.host == "broken.myshopify.com":
+                return httpx.Response(502, text="bad gateway")
+            return httpx.Response(200, json={"data": {"shop": {"name": request.url.host}}})
+
+        self.transport = ShopifyGraphQLTransport(http_transport=httpx.MockTransport(handler))
+
+    async def asyncTearDown(self):
+        await self.transport.aclose()
+
+    @pytest.mark.asyncio
+    async def test_execute_posts_query_and_variables(self):
+        res = await self.transport.execute(
+            "https://store.myshopify.com", "token", "query Q($id: ID!) { order(id: $id) { id } }", {"id": "1"}
+        )
+
+        self.assertEqual(res, {"data": {"shop": {"name": "store.myshopify.com"}}})
+        request = self.requests[0]
+        self.assertEqual(request.url.path, "/admin/api/2022-07/graphql.json")
+        self.assertEqual(request.headers["X-Shopify-Access-Token"], "token")
+        self.assertEqual(json.loads(request.content)["variables"], {"id": "1"})
+
+    @pytest.mark.asyncio
+    async def test_client_is_reused_per_shop(self):
+        first = self.transport.get_client("store.myshopify.com")
+        second = self.transport.get_client("https://store.myshopify.com/")
+        other = self.transport.get_client("other.myshopify.com")
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+
+    @pytest.mark.asyncio
+    async def test_execute_raises_on_error_status(self):
+        with self.assertRaises(ShopifyException):
+            await self.transport.execute("broken.myshopify.com", "token", "{ shop { name } }")
+
+
+class ShopifyCircuitBreakerTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        for shop_url in ("broken.myshopify.com", "store.myshopify.com", "throttled.myshopify.com"):
+            shopify_circuit_breaker(shop_url).reset()
+
+    async def fail(self, shop_url: str, status_code: int, times: int = 20):
+        breaker = shopify_circuit_breaker(shop_url)
+        for _ in range(times):
+            with self.assertRaises(ShopifyException):
+                await breaker.call_async(self.raise_status, shop_url, status_code)
+
+    @staticmethod
+    async def raise_status(shop_url: str, status_code: int):
+        raise ShopifyException("Shopify GraphQL request failed.", shop_url=shop_url, status_code=status_code)
+
+    @pytest.mark.asyncio
+    async def test_breakers_are_kept_per_shop(self):
+        self.assertIs(
+            shopify_circuit_breaker("https://store.myshopify.com/"), shopify_circuit_breaker("store.myshopify.com")
+        )
+
+        await self.fail("broken.myshopify.com", 502)
+
+        self.assertEqual(shopify_circuit_breaker("broken.myshopify.com").state, CircuitState.OPEN)
+        self.assertEqual(shopify_circuit_breaker("store.myshopify.com").state, CircuitState.CLOSED)
+
+    @pytest.mark.asyncio
+    async def test_throttled_calls_do_not_open_the_breaker(self):
+        await self.fail("throttled.myshopify.com", 429)
+
+        self.assertEqual(shopify_circuit_breaker("throttled.myshopify.com").state, CircuitState.CLOSED)
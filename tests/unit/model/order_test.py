@@ -0,0 +1,131 @@
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from app.constants import ChadStatus
+from app.model.merchant import LateFromDateType
+from app.model.order import Order
+
+
+def shopify_order() -> dict:
+    return {
+        "id": "gid://shopify/Order/1",
+        "name": "#1001",
+        "createdAt": "2023-06-01T12:00:00Z",
+        "updatedAt": "2023-06-03T12:00:00Z",
+        "fulfillments": [
+            {
+                "createdAt": "2023-06-02T12:00:00Z",
+                "updatedAt": "2023-06-02T13:00:00Z",
+                "deliveredAt": None,
+                "requiresShipping": True,
+                "trackingInfo": [{"company": "UPS", "number": "1Z999"}],
+            }
+        ],
+        "lineItems": {
+            "edges": [
+                {"node": {"id": "1", "currentQuantity": 1, "refundableQuantity": 1}},
+                {"node": {"id": "2", "currentQuantity": 0, "refundableQuantity": 0}},
+            ]
+        },
+    }
+
+
+class OrderTestCase(TestCase):
+    def test_parse_reads_the_order_once(self):
+        order = Order.parse(shopify_order())
+
+        self.assertEqual(order.order_id, "1")
+        self.assertEqual((order.courier, order.tracking_number), ("UPS", "1Z999"))
+        self.assertEqual([edge["node"]["id"] for edge in order.line_items], ["1"])
+        self.assertEqual(order.shipped_at, "2023-06-02T12:00:00Z")
+
+    def test_untracked_fulfillments_have_no_tracking_number(self):
+        node = shopify_order()
+        node["fulfillments"][0]["trackingInfo"] = [{"company": "UPS", "number": None}]
+
+        self.assertIsNone(Order.parse(node).tracking_number)
+
+    def test_serialize_writes_the_computed_fields_into_the_node(self):
+        node = shopify_order()
+        order = Order.parse(node)
+        order.chad_fulfillment_status = ChadStatus.SHIPPED.value
+        order.cancelation_failed = True
+        order.apply_tracking_details(None)
+
+        data = order.serialize()
+
+        self.assertIs(data, node)
+        self.assertEqual(data["chadFulfillmentStatus"], ChadStatus.SHIPPED.value)
+        self.assertEqual(data["shippedAt"], "2023-06-02T12:00:00Z")
+        self.assertEqual(data["trackingInfoErrorMessage"], "Status not available")
+        self.assertTrue(data["cancelationRequest"]["isFailed"])
+        self.assertEqual(len(data["lineItems"]["edges"]), 1)
+        # Fields of the order endpoint only are left out.
+        self.assertNotIn("isLate", data)
+        self.assertNotIn("isMatchShopperAndShippingName", data)
+
+    def test_tracking_details_override_the_status(self):
+        order = Order.parse(shopify_order())
+        order.chad_fulfillment_status = ChadStatus.SHIPPED.value
+        tracking_details = MagicMock(chad_status=ChadStatus.DELIVERED.value)
+        tracking_details.dict.return_value = {"tracking_number": "1Z999"}
+
+        order.apply_tracking_details(tracking_details)
+        data = order.serialize()
+
+        self.assertEqual(data["chadFulfillmentStatus"], ChadStatus.DELIVERED.value)
+        self.assertEqual(data["trackingDetails"], {"tracking_number": "1Z999"})
+
+    def test_stored_details_override_the_computed_fields(self):
+        order = Order.parse(shopify_order())
+        order.chad_fulfillment_status = ChadStatus.SHIPPED.value
+        order.stored_details = {"chadFulfillmentStatus": "REFUND_REQUESTED", "note": "stored"}
+
+        data = order.serialize()
+
+        self.assertEqual(data["chadFulfillmentStatus"], "REFUND_REQUESTED")
+        self.assertEqual(data["note"], "stored")
+
+    def test_stored_order_keeps_its_line_items(self):
+        stored = {"name": "#1001", "lineItems": {"edges": [{"node": {"id": "2"}}]}}
+        order = Order.parse(shopify_order())
+
+        order.use_stored_order(stored)
+        data = order.serialize()
+
+        self.assertIs(data, stored)
+        self.assertEqual(data["lineItems"]["edges"], [{"node": {"id": "2"}}])
+        # Still the dates of the Shopify fulfillments.
+        self.assertEqual(data["shippedAt"], "2023-06-02T12:00:00Z")
+
+    def test_lateness_from_placed(self):
+        order = Order.parse(shopify_order())
+
+        order.set_lateness(14, LateFromDateType.PLACED, now=datetime(2023, 6, 20))
+
+        self.assertTrue(order.is_late)
+        self.assertEqual(order.late_threshold, "2023-06-15T12:00:00Z")
+
+    def test_lateness_from_shipped(self):
+        order = Order.parse(shopify_order())
+        order.chad_fulfillment_status = ChadStatus.SHIPPED.value
+
+        order.set_lateness(14, LateFromDateType.SHIPPED, now=datetime(2023, 6, 10))
+
+        self.assertFalse(order.is_late)
+        self.assertEqual(order.late_threshold, "2023-06-16T13:00:00Z")
+
+    def test_orders_not_shipped_are_not_late_from_shipped(self):
+        order = Order.parse(shopify_order())
+        order.chad_fulfillment_status = ChadStatus.DELIVERED.value
+
+        order.set_lateness(14, LateFromDateType.SHIPPED, now=datetime(2024, 1, 1))
+        data = order.serialize()
+
+        self.assertFalse(data["isLate"])
+        self.assertIsNone(data["lateThreshold"])
+
+    def test_orders_have_no_instance_dict(self):
+        with self.assertRaises(AttributeError):
+            Order.parse(shopify_order()).unknown_field = True
@@ -0,0 +1,124 @@
+import json
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from tests.unit.stand_ins import stand_in_modules
+from tests.unit.utils import sample_settings
+
+with stand_in_modules():
+    from app.external.shopify_client import ShopifyClient
+    from app.external.shopify_rate_limiter import BACKGROUND, ShopifyRateLimiter, shopify_priority
+    from app.external.shopify_transport import ShopifyException, ShopifyGraphQLTransport
+    from app.secrets import Secrets
+    from app.services.shopify_bulk_service import ShopifyBulkService, bulk_orders_query
+
+RESULT_URL = "https://storage.googleapis.com/shopify-tiers-assets-prod-us-east1/bulk-result.jsonl"
+RESULT_LINES = [
+    {"id": "gid://shopify/Order/1", "name": "#1001", "fulfillments": []},
+    {"id": "gid://shopify/LineItem/11", "name": "Shirt", "__parentId": "gid://shopify/Order/1"},
+    {"id": "gid://shopify/LineItem/12", "name": "Socks", "__parentId": "gid://shopify/Order/1"},
+    {"id": "gid://shopify/Order/2", "name": "#1002", "fulfillments": []},
+    {"id": "gid://shopify/LineItem/21", "name": "Hat", "__parentId": "gid://shopify/Order/2"},
+    {"id": "gid://shopify/Order/3", "name": "#1003", "fulfillments": []},
+]
+
+
+class ShopifyBulkServiceTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.graphql_requests = []
+        self.priorities = []
+        self.statuses = ["CREATED", "RUNNING", "COMPLETED"]
+        self.user_errors = []
+
+        def shopify(request: httpx.Request) -> httpx.Response:
+            body = json.loads(request.content)
+            self.graphql_requests.append(body)
+            self.priorities.append(shopify_priority.get())
+            if body["query"].startswith("mutation RunBulkQuery"):
+                operation = None if self.user_errors else {"id": "gid://shopify/BulkOperation/1", "status": "CREATED"}
+                result = {"bulkOperation": operation, "userErrors": self.user_errors}
+                return httpx.Response(200, json={"data": {"bulkOperationRunQuery": result}})
+            if body["query"].startswith("mutation CancelBulkOperation"):
+                operation = {"id": body["variables"]["id"], "status": "CANCELING"}
+                result = {"bulkOperation": operation, "userErrors": []}
+                return httpx.Response(200, json={"data": {"bulkOperationCancel": result}})
+            status = self.statuses.pop(0)
+            operation = {"id": "gid://shopify/BulkOperation/1", "status": status, "objectCount": "6"}
+            if status == "COMPLETED":
+                operation["url"] = RESULT_URL
+            return httpx.Response(200, json={"data": {"node": operation}})
+
+        def storage(request: httpx.Request) -> httpx.Response:
+            self.assertEqual(str(request.url), RESULT_URL)
+            return httpx.Response(200, content="\n".join(json.dumps(line) for line in RESULT_LINES) + "\n")
+
+        self.client = ShopifyClient(settings=Secrets(**sample_settings()))
+        self.client.transport = ShopifyGraphQLTransport(http_transport=httpx.MockTransport(shopify))
+        self.client.rate_limiter = ShopifyRateLimiter()
+        self.service = ShopifyBulkService(self.client, poll_interval=0, http_transport=httpx.MockTransport(storage))
+
+    async def asyncTearDown(self):
+        await self.client.transport.aclose()
+
+    @pytest.mark.asyncio
+    async def test_orders_are_rebuilt_with_their_line_items(self):
+        orders = [order async for order in self.service.iter_orders("store.myshopify.com")]
+
+        self.assertEqual([order["name"] for order in orders], ["#1001", "#1002", "#1003"])
+        self.assertEqual([item["name"] for item in orders[0]["lineItems"]], ["Shirt", "Socks"])
+        self.assertEqual([item["name"] for item in orders[1]["lineItems"]], ["Hat"])
+        self.assertNotIn("lineItems", orders[2])
+        self.assertNotIn("__parentId", orders[0]["lineItems"][0])
+
+    @pytest.mark.asyncio
+    async def test_polls_until_completed_with_background_priority(self):
+        await self.service.run("store.myshopify.com", bulk_orders_query())
+
+        self.assertEqual(len(self.graphql_requests), 4)
+        self.assertEqual(set(self.priorities), {BACKGROUND})
+
+    @pytest.mark.asyncio
+    async def test_failed_operation_raises(self):
+        self.statuses = ["RUNNING", "FAILED"]
+
+        with self.assertRaises(ShopifyException):
+            await self.service.run("store.myshopify.com", bulk_orders_query())
+
+    @pytest.mark.asyncio
+    async def test_timed_out_operation_is_cancelled(self):
+        self.statuses = ["RUNNING"]
+        self.service.timeout = 0
+
+        with self.assertRaises(ShopifyException):
+            await self.service.run("store.myshopify.com", bulk_orders_query())
+
+        cancel = self.graphql_requests[-1]
+        self.assertTrue(cancel["query"].startswith("mutation CancelBulkOperation"))
+        self.assertEqual(cancel["variables"], {"id": "gid://shopify/BulkOperation/1"})
+
+    @pytest.mark.asyncio
+    async def test_failed_cancel_still_raises_the_timeout(self):
+        self.statuses = ["RUNNING"]
+        self.service.timeout = 0
+        self.client.cancel_bulk_operation = AsyncMock(side_effect=ShopifyException("Shopify is unavailable."))
+
+        with self.assertRaisesRegex(ShopifyException, "timed out"):
+            await self.service.run("store.myshopify.com", bulk_orders_query())
+
+        self.client.cancel_bulk_operation.assert_awaited_once_with(
+            "store.myshopify.com", "gid://shopify/BulkOperation/1"
+        )
+
+    @pytest.mark.asyncio
+    async def test_rejected_query_raises(self):
+        self.user_errors = [{"field": ["query"], "message": "A bulk query operation is already in progress."}]
+
+        with self.assertRaises(ShopifyException):
+            await self.service.run("store.myshopify.com", bulk_orders_query())
+
+    def test_search_is_quoted_into_the_query(self):
+        self.assertTrue(bulk_orders_query('name:"#1001"').startswith('{orders(query:"name:\\"#1001\\""){'))
+        self.assertTrue(bulk_orders_query().startswith("{orders{edges{node{id name"))
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta, timezone
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.db.firestore import natural_key_id
+from app.db.tracking_result import TrackingResultModel, TrackingResultRepository
+from app.services.tracking_cache import (
+    DELIVERED_TTL,
+    IN_TRANSIT_DEFAULT_TTL,
+    IN_TRANSIT_MAX_TTL,
+    IN_TRANSIT_MIN_TTL,
+    OUT_FOR_DELIVERY_TTL,
+    TrackingResultCache,
+    tracking_result_ttl,
+)
+
+NOW = datetime(2023, 5, 1, tzinfo=timezone.utc)
+
+
+class TrackingResultTtlTestCase(TestCase):
+    def test_ttl_by_status_milestone(self):
+        self.assertEqual(tracking_result_ttl("delivered", None, NOW), DELIVERED_TTL)
+        self.assertEqual(tracking_result_ttl("out_for_delivery", None, NOW), OUT_FOR_DELIVERY_TTL)
+
+    def test_in_transit_ttl_follows_estimated_delivery_date(self):
+        self.assertEqual(tracking_result_ttl("in_transit", None, NOW), IN_TRANSIT_DEFAULT_TTL)
+        self.assertEqual(tracking_result_ttl("in_transit", "2023-05-01T08:00:00Z", NOW), timedelta(hours=2))
+        self.assertEqual(tracking_result_ttl("in_transit", "2023-05-20T00:00:00.000Z", NOW), IN_TRANSIT_MAX_TTL)
+        self.assertEqual(tracking_result_ttl("in_transit", "2023-04-28", NOW), IN_TRANSIT_MIN_TTL)
+
+
+class TrackingResultCacheTestCase(IsolatedAsyncioTestCase):
+    @patch("app.db.tracking_result.tracking_result_repository.upsert_many")
+    @patch("app.db.tracking_result.tracking_result_repository.get_by_courier_and_tracking_number")
+    @pytest.mark.asyncio
+    async def test_memory_hit_skips_persistent_tier(self, mock_get_by_courier_and_tracking_number, mock_upsert_many):
+        cache = TrackingResultCache()
+        await cache.set("UPS", "111", {"tracking_number": "111"}, timedelta(minutes=5))
+
+        self.assertEqual(await cache.get("UPS", "111"), {"tracking_number": "111"})
+        mock_get_by_courier_and_tracking_number.assert_not_called()
+        mock_upsert_many.assert_called_once()
+
+    @patch("app.db.tracking_result.tracking_result_repository.get_by_courier_and_tracking_number")
+    @pytest.mark.asyncio
+    async def test_persistent_hit_is_promoted_and_expired_entry_ignored(self, mock_get_by_courier_and_tracking_number):
+        fresh = TrackingResultModel()
+        fresh.details = {"tracking_number": "111"}
+        fresh.expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+        mock_get_by_courier_and_tracking_number.return_value = fresh
+        cache = TrackingResultCache()
+
+        self.assertEqual(await cache.get("UPS", "111"), {"tracking_number": "111"})
+        self.assertEqual(cache.memory.get(("UPS", "111")), {"tracking_number": "111"})
+        mock_get_by_courier_and_tracking_number.assert_awaited_once_with("UPS", "111")
+
+        fresh.expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        self.assertIsNone(await cache.get("UPS", "222"))
+
+    @pytest.mark.asyncio
+    async def test_entries_are_kept_apart_by_courier(self):
+        cache = TrackingResultCache(persistent=False)
+        await cache.set("UPS", "111", {"courier": "UPS"}, timedelta(minutes=5))
+
+        self.assertIsNone(await cache.get("DHL", "111"))
+        self.assertEqual(await cache.get_many([("DHL", "111"), ("UPS", "111")]), {("UPS", "111"): {"courier": "UPS"}})
+
+    @patch("app.db.tracking_result.tracking_result_repository.upsert_many")
+    @pytest.mark.asyncio
+    async def test_set_many_is_one_write(self, mock_upsert_many):
+        cache = TrackingResultCache()
+
+        await cache.set_many(
+            [
+                ("UPS", "111", {"tracking_number": "111"}, timedelta(minutes=5)),
+                ("DHL", "222", {"tracking_number": "222"}, DELIVERED_TTL),
+            ]
+        )
+
+        self.assertEqual(cache.memory.get(("DHL", "222")), {"tracking_number": "222"})
+        mock_upsert_many.assert_awaited_once()
+        self.assertEqual(
+            [result[:2] for result in mock_upsert_many.await_args.args[0]], [("UPS", "111"), ("DHL", "222")]
+        )
+
+
+class TrackingResultRepositoryTestCase(IsolatedAsyncioTestCase):
+    @pytest.mark.asyncio
+    async def test_results_are_set_under_their_key_without_a_read(self):
+        client = MagicMock()
+        batch = client.return_value.batch.return_value
+        batch.commit = AsyncMock()
+        collection = client.return_value.collection.return_value
+        repository = TrackingResultRepository(TrackingResultModel, client=client)
+
+        await repository.upsert_many([("UPS", "111", {"status_milestone": "delivered"}, NOW)])
+
+        collection.document.assert_called_once_with(natural_key_id("UPS", "111"))
+        reference, document = batch.set.call_args.args
+        self.assertIs(reference, collection.document.return_value)
+        self.assertEqual(document["tracking_number"], "111")
+        self.assertEqual(document["courier"], "UPS")
+        collection.where.assert_not_called()
+        batch.commit.assert_awaited_once()
@@ -0,0 +1,209 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch, MagicMock, AsyncMock
+
+import pytest
+
+from tests.unit.stand_ins import stand_in_modules
+
+with stand_in_modules():
+    from app.common.utils.circuit_breaker import CircuitBreaker
+    from app.external.ship24_client import (
+        Ship24Events,
+        Ship24GetTrackerDetailResponse,
+    )
+    from app.services.tracking_cache import IN_TRANSIT_MAX_TTL, TrackingResultCache
+    from app.services.tracking_service import GetTrackingDetailsRequest, TrackingService
+
+
+def _ship24_tracking_response(tracker_id: str, tracking_number: str, milestone: str) -> Ship24GetTrackerDetailResponse:
+    return Ship24GetTrackerDetailResponse(
+        trackings=[
+            {
+                "tracker": {"trackerId": tracker_id, "trackingNumber": tracking_number},
+                "shipment": {
+                    "shipmentId": f"shipment-{tracker_id}",
+                    "statusMilestone": milestone,
+                    "delivery": {},
+                    "trackingNumbers": [{"tn": tracking_number}],
+                    "recipient": {},
+                },
+                "events": [],
+                "statistics": {"timestamps": {}},
+            }
+        ]
+    )
+
+
+def _ship24_event(tracking_number: str, milestone: str, occurred_at: str) -> Ship24Events:
+    return Ship24Events(
+        eventId=f"event-{occurred_at}",
+        trackingNumber=tracking_number,
+        eventTrackingNumber=tracking_number,
+        status=milestone,
+        occurrenceDatetime=occurred_at,
+        datetime=occurred_at,
+        statusMilestone=milestone,
+    )
+
+
+class TrackingServiceGetManyTestCase(IsolatedAsyncioTestCase):
+    @patch("app.db.ship24_batch.ship24_tracker_repository.insert_many")
+    @patch("app.db.ship24_batch.ship24_tracker_repository.get_by_courier_and_tracking_numbers")
+    @pytest.mark.asyncio
+    async def test_get_tracking_details_many(self, mock_get_by_courier_and_tracking_numbers, mock_insert_many):
+        cached = MagicMock()
+        cached.ship24_tracker_id = "tracker-1"
+        mock_get_by_courier_and_tracking_numbers.return_value = {("DHL", "111"): cached}
+
+        mock_ship24_client = AsyncMock()
+        mock_ship24_client.bulk_create_trackers.return_value = {"222": "tracker-2"}
+        mock_ship24_client.get_tracker_results.side_effect = lambda tracker_id, courier, tracking_number: (
+            _ship24_tracking_response(
+                tracker_id, tracking_number, "in_transit" if tracker_id == "tracker-1" else "delivered"
+            )
+        )
+
+        result_cache = TrackingResultCache(persistent=False)
+        result_cache.set_many = AsyncMock(wraps=result_cache.set_many)
+        service = TrackingService(mock_ship24_client, result_cache=result_cache)
+        res = await service.get_tracking_details_many(
+            [
+                GetTrackingDetailsRequest(courier="DHL", tracking_number="111"),
+                GetTrackingDetailsRequest(courier="UPS", tracking_number="222"),
+                GetTrackingDetailsRequest(courier="DHL", tracking_number="111"),
+            ],
+            limit=2,
+            timeout=1,
+        )
+
+        self.assertEqual(list(res), ["111", "222"])
+        self.assertEqual(res["111"].chad_status, "SHIPPED")
+        self.assertEqual(res["222"].chad_status, "DELIVERED")
+        self.assertEqual(res["222"].courier, "UPS")
+        mock_get_by_courier_and_tracking_numbers.assert_called_once_with([("DHL", "111"), ("UPS", "222")])
+        mock_ship24_client.bulk_create_trackers.assert_called_once_with({"222": "UPS"})
+        mock_insert_many.assert_called_once_with([("UPS", "222", "tracker-2")])
+        # The results of the page are cached with one write.
+        result_cache.set_many.assert_awaited_once()
+        self.assertEqual(
+            [result[:2] for result in result_cache.set_many.await_args.args[0]], [("DHL", "111"), ("UPS", "222")]
+        )
+        self.assertEqual(mock_ship24_client.get_tracker_results.call_count, 2)
+
+    @pytest.mark.asyncio
+    async def test_get_tracking_details_many_serves_cached_results(self):
+        result_cache = TrackingResultCache(persistent=False)
+        mock_ship24_client = AsyncMock()
+        service = TrackingService(mock_ship24_client, result_cache=result_cache)
+        details = service._to_tracking_details("DHL", "111", _ship24_tracking_response("tracker-1", "111", "delivered"))
+        await service._cache_tracking_details("DHL", "111", details)
+
+        res = await service.get_tracking_details_many([GetTrackingDetailsRequest(courier="DHL", tracking_number="111")])
+
+        self.assertEqual(res["111"], details)
+        mock_ship24_client.get_tracker_results.assert_not_called()
+        mock_ship24_client.bulk_create_trackers.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_breaker_skips_ship24(self):
+        result_cache = TrackingResultCache(persistent=False)
+        circuit_breaker = CircuitBreaker("ship24", slow_call_seconds=1, minimum_calls=1)
+        circuit_breaker.record(0, failed=True)
+        mock_ship24_client = AsyncMock()
+        service = TrackingService(mock_ship24_client, result_cache=result_cache, circuit_breaker=circuit_breaker)
+        details = service._to_tracking_details("DHL", "111", _ship24_tracking_response("tracker-1", "111", "delivered"))
+        await service._cache_tracking_details("DHL", "111", details)
+
+        res = await service.get_tracking_details_many(
+            [
+                GetTrackingDetailsRequest(courier="DHL", tracking_number="111"),
+                GetTrackingDetailsRequest(courier="UPS", tracking_number="222"),
+            ]
+        )
+
+        self.assertEqual(res, {"111": details, "222": None})
+        self.assertIsNone(await service.get_tracking_details("UPS", "222"))
+        mock_ship24_client.bulk_create_trackers.assert_not_called()
+        mock_ship24_client.get_tracker_results.assert_not_called()
+        mock_ship24_client.initiate_tracker.assert_not_called()
+
+
+class TrackingServiceWebhookTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        tracker = MagicMock(courier="DHL", ship24_tracker_id="tracker-1")
+        get_by_tracker_ids = patch(
+            "app.db.ship24_batch.ship24_tracker_repository.get_by_tracker_ids", return_value={"tracker-1": tracker}
+        )
+        self.mock_get_by_tracker_ids = get_by_tracker_ids.start()
+        self.addCleanup(get_by_tracker_ids.stop)
+
+    @pytest.mark.asyncio
+    async def test_store_tracking_updates_keeps_latest_result(self):
+        result_cache = TrackingResultCache(persistent=False)
+        service = TrackingService(AsyncMock(), result_cache=result_cache)
+        newer = _ship24_tracking_response("tracker-1", "111", "delivered").trackings[0]
+        newer.events = [_ship24_event("111", "delivered", "2023-05-02T10:00:00.000Z")]
+        older = _ship24_tracking_response("tracker-1", "111", "in_transit").trackings[0]
+        older.events = [_ship24_event("111", "in_transit", "2023-05-01T10:00:00.000Z")]
+
+        self.assertEqual(await service.store_tracking_updates([newer]), 1)
+        self.assertEqual(await service.store_tracking_updates([older]), 0)
+
+        res = await service.get_tracking_details("DHL", "111")
+        self.assertEqual(res.chad_status, "DELIVERED")
+
+    @pytest.mark.asyncio
+    async def test_pushed_tracking_without_courier_codes_is_stored(self):
+        result_cache = TrackingResultCache(persistent=False)
+        service = TrackingService(AsyncMock(), result_cache=result_cache)
+        tracking = _ship24_tracking_response("tracker-1", "111", "in_transit").trackings[0]
+        tracking.tracker.courierCode = []
+        self.mock_get_by_tracker_ids.return_value = {}
+
+        self.assertEqual(await service.store_tracking_updates([tracking]), 1)
+        self.assertEqual(result_cache.memory.get(("N/A", "111"))["courier"], "N/A")
+
+    @pytest.mark.asyncio
+    async def test_pushed_result_is_stored_under_the_tracker_courier(self):
+        result_cache = TrackingResultCache(persistent=False)
+        service = TrackingService(AsyncMock(), result_cache=result_cache)
+        tracking = _ship24_tracking_response("tracker-1", "111", "in_transit").trackings[0]
+        tracking.tracker.courierCode = ["dhl-express"]
+
+        await service.store_tracking_updates([tracking])
+
+        self.mock_get_by_tracker_ids.assert_awaited_once_with(["tracker-1"])
+        self.assertEqual((await service.get_tracking_details("DHL", "111")).courier, "DHL")
+
+    @pytest.mark.asyncio
+    async def test_pushed_in_transit_result_expires_like_a_fetched_one(self):
+        result_cache = TrackingResultCache(persistent=False)
+        result_cache.set = AsyncMock(wraps=result_cache.set)
+        service = TrackingService(AsyncMock(), result_cache=result_cache)
+        in_transit = _ship24_tracking_response("tracker-1", "111", "in_transit").trackings[0]
+
+        await service.store_tracking_updates([in_transit])
+
+        self.assertLessEqual(result_cache.set.await_args.args[3], IN_TRANSIT_MAX_TTL)
+
+
+class TrackingServiceCourierKeyTestCase(IsolatedAsyncioTestCase):
+    @pytest.mark.asyncio
+    async def test_same_number_at_another_courier_is_not_served(self):
+        result_cache = TrackingResultCache(persistent=False)
+        mock_ship24_client = AsyncMock()
+        mock_ship24_client.get_tracker_results.return_value = _ship24_tracking_response(
+            "tracker-2", "111", "in_transit"
+        )
+        service = TrackingService(mock_ship24_client, result_cache=result_cache)
+        details = service._to_tracking_details("DHL", "111", _ship24_tracking_response("tracker-1", "111", "delivered"))
+        await service._cache_tracking_details("DHL", "111", details)
+
+        with patch(
+            "app.db.ship24_batch.ship24_tracker_repository.get_by_courier_and_tracking_number",
+            return_value=MagicMock(ship24_tracker_id="tracker-2"),
+        ):
+            res = await service.get_tracking_details("UPS", "111")
+
+        self.assertEqual((res.courier, res.chad_status), ("UPS", "SHIPPED"))
+        mock_ship24_client.get_tracker_results.assert_awaited_once_with("tracker-2", "UPS", "111")
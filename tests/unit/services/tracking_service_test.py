@@ -20,8 +20,8 @@ from tests.unit.data.tracking_service_data import (
 
 
 class TrackingServiceTestCase(IsolatedAsyncioTestCase):
-    @patch("app.db.ship24.Ship24Model.insert")
-    @patch("app.db.ship24.Ship24ModelContext.get_by_courier_and_tracking_number")
+    @patch("app.db.ship24_batch.ship24_tracker_repository.insert")
+    @patch("app.db.ship24_batch.ship24_tracker_repository.get_by_courier_and_tracking_number")
     @pytest.mark.asyncio
     async def test_get_tracking_details_returns_none(self, mock_get_by_courier_and_tracking_number, mock_db_insert):
         mock_get_by_courier_and_tracking_number.return_value = None
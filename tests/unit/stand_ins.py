@@ -0,0 +1,95 @@
+"""
+Stand-ins for app modules that are not part of every checkout of this repository, e.g. the generated Shopify response
+models and the base HTTP client. Test modules import the app code that needs them inside stand_in_modules(), which only
+registers the modules that cannot be found, so a complete tree always tests against the real code. Tests never depend
+on their behaviour, the clients and repositories using them are replaced with mocks.
+"""
+import importlib.util
+import sys
+import types
+from contextlib import contextmanager
+from typing import List, Optional
+
+from dependency_injector import containers, providers
+from pydantic import BaseModel
+
+
+class _BaseClient:
+    def __init__(self):
+        self.session = None
+
+
+class _GeoCoordinates(BaseModel):
+    latitude: Optional[float]
+    longitude: Optional[float]
+    display_name: Optional[str]
+
+
+class _Ship24Model:
+    pass
+
+
+class _ShopifyGetCustomerByOrderIdResponse(BaseModel):
+    pass
+
+
+class _ServiceContainer(containers.DeclarativeContainer):
+    config = providers.Configuration()
+    tracking_service = providers.Object(None)
+
+
+def _get_edit_order_by_order_id(order_id: str):
+    return None
+
+
+STAND_INS = {
+    "app.external.base_client": {"BaseClient": _BaseClient},
+    "app.external.geocode_client": {"GeoCoordinates": _GeoCoordinates},
+    "app.db.ship24": {"Ship24Model": _Ship24Model},
+    "app.external.shopify": {},
+    "app.external.shopify.responses": {"ShopifyGetCustomerByOrderIdResponse": _ShopifyGetCustomerByOrderIdResponse},
+    "app.db.edit_order": {"get_by_order_id": _get_edit_order_by_order_id},
+    "app.service_container": {"ServiceContainer": _ServiceContainer},
+}
+
+
+def _missing(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is None
+    except ModuleNotFoundError:
+        return True
+
+
+def _register(name: str, registered: List[str]):
+    if name in sys.modules or not _missing(name):
+        return
+    module = types.ModuleType(name)
+    module.__dict__.update(STAND_INS.get(name, {}))
+    sys.modules[name] = module
+    registered.append(name)
+    parent, _, child = name.rpartition(".")
+    _register(parent, registered)
+    setattr(importlib.import_module(parent), child, module)
+
+
+def _unregister(name: str):
+    module = sys.modules.pop(name, None)
+    parent, _, child = name.rpartition(".")
+    if parent in sys.modules and getattr(sys.modules[parent], child, None) is module:
+        delattr(sys.modules[parent], child)
+
+
+@contextmanager
+def stand_in_modules():
+    """
+    Registers the stand-ins of the missing modules for the imports made in the block and removes them again afterwards,
+    so they never leak into other test modules. App modules imported in the block keep the stand-ins they bound.
+    """
+    registered = []
+    for name in STAND_INS:
+        _register(name, registered)
+    try:
+        yield
+    finally:
+        for name in reversed(registered):
+            _unregister(name)
@@ -0,0 +1,55 @@
+import json
+import os
+import stat
+import tempfile
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+import pytest
+
+from app.startup import StartupReport, _read_secrets_snapshot, _write_secrets_snapshot, fetch_secrets
+
+SECRETS = {"shopify_client_secret": "secret"}
+
+
+class SecretsSnapshotTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "secrets.json")
+
+    def test_snapshot_is_only_readable_by_the_owner(self):
+        _write_secrets_snapshot(self.path, SECRETS)
+
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+        with open(self.path) as file:
+            self.assertEqual(json.load(file), SECRETS)
+
+    def test_fresh_snapshot_is_used(self):
+        _write_secrets_snapshot(self.path, SECRETS)
+
+        with patch("app.startup.env.SECRETS_SNAPSHOT_PATH", self.path):
+            self.assertEqual(fetch_secrets(), SECRETS)
+
+    @patch("app.startup.env.SECRETS_SNAPSHOT_MAX_AGE_SECONDS", 60)
+    def test_stale_snapshot_is_ignored(self):
+        _write_secrets_snapshot(self.path, SECRETS)
+        os.utime(self.path, (0, 0))
+
+        self.assertIsNone(_read_secrets_snapshot(self.path))
+
+    def test_missing_snapshot_is_ignored(self):
+        self.assertIsNone(_read_secrets_snapshot(self.path))
+
+
+class StartupReportTestCase(IsolatedAsyncioTestCase):
+    @pytest.mark.asyncio
+    async def test_failed_phase_is_recorded(self):
+        report = StartupReport()
+
+        with self.assertRaises(RuntimeError):
+            async with report.phase("secrets"):
+                raise RuntimeError()
+
+        self.assertIn("secrets", report.phases)
+        self.assertGreaterEqual(report.total_ms(), report.phases["secrets"])
@@ -13,6 +13,7 @@ def sample_settings() -> dict:
         bucket_name="bucket_name",
         open_ai_secret_key="open_ai_secret_key",
         ship24_api_key="ship24_api_key",
+        ship24_webhook_secret="ship24_webhook_secret",
     )
 
 
@@ -29,4 +30,17 @@ def sample_env() -> dict:
         SECRET_MANAGER_PROJECT_ID="SECRET_MANAGER_PROJECT_ID",
         SECRET_MANAGER_SECRET_ID="SECRET_MANAGER_SECRET_ID",
         SECRET_MANAGER_VERSION_ID="latest",
+        TRACKING_CONCURRENCY_LIMIT="5",
+        TRACKING_TIMEOUT_SECONDS="5",
+        MERCHANT_CACHE_TTL_SECONDS="300",
+        CUSTOMER_CACHE_TTL_SECONDS="3600",
+        ORDER_PROJECTION_MAX_AGE_SECONDS="21600",
+        FIRESTORE_LEGACY_KEY_LOOKUPS="true",
+        SECRETS_SNAPSHOT_PATH="",
+        SECRETS_SNAPSHOT_MAX_AGE_SECONDS="86400",
+        CIRCUIT_BREAKER_FAILURE_RATE="0.5",
+        CIRCUIT_BREAKER_SLOW_CALL_RATE="0.5",
+        CIRCUIT_BREAKER_MINIMUM_CALLS="20",
+        CIRCUIT_BREAKER_OPEN_SECONDS="30",
+        RESPONSE_COMPRESSION_MINIMUM_SIZE="1024",
     )